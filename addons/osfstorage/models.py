@@ -6,7 +6,7 @@ from django.contrib.contenttypes.models import ContentType
 from psycopg2._psycopg import AsIs
 
 from addons.base.models import BaseNodeSettings, BaseStorageAddon, BaseUserSettings
-from osf.utils.fields import EncryptedJSONField
+from osf.utils.fields import EncryptedJSONField, NonNaiveDateTimeField
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.exceptions import InvalidTagError, TagNotFoundError
 from framework.auth.core import Auth
@@ -39,6 +39,21 @@ class OsfStorageFileNode(BaseFileNode):
 
     @property
     def materialized_path(self):
+        """Path from the root folder, e.g. '/folder/file'. Stored on save; rows saved before paths
+        were stored are computed from the parent if it is loaded, or with a recursive query.
+        """
+        if not self._materialized_path:
+            if self.parent_id is None or OsfStorageFileNode.parent.is_cached(self):
+                self._materialized_path = self._build_materialized_path()
+            else:
+                self._materialized_path = self._query_materialized_path()
+        return self._materialized_path
+
+    def _build_materialized_path(self):
+        path = self.name if self.parent_id is None else self.parent.materialized_path + self.name
+        return path if self.is_file else path + '/'
+
+    def _query_materialized_path(self):
         sql = """
             WITH RECURSIVE materialized_path_cte(parent_id, GEN_PATH) AS (
               SELECT
@@ -222,12 +237,58 @@ class OsfStorageFileNode(BaseFileNode):
 
     def save(self):
         self._path = ''
-        self._materialized_path = ''
+        # Recomputed from the parent, so that moves and renames (which save every descendant) keep it current
+        self._materialized_path = self._build_materialized_path()
         return super().save()
 
 
 class OsfStorageFile(OsfStorageFileNode, File):
 
+    # Denormalized from the versions of the file for listings, see `update_version_fields`.
+    # Null until the file gets a version or is backfilled.
+    latest_version = models.ForeignKey('osf.FileVersion', null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    version_count = models.PositiveIntegerField(null=True, blank=True)
+    earliest_version_created = NonNaiveDateTimeField(null=True, blank=True)
+
+    @classmethod
+    def update_version_fields(cls, file_ids):
+        """Recompute latest_version, version_count and earliest_version_created of the given files
+        with one query. Files without versions are left unchanged.
+
+        :return: {file id: (latest_version_id, version_count, earliest_version_created)}
+        """
+        sql = """
+            UPDATE osf_basefilenode AS F
+            SET latest_version_id = V.latest_version_id,
+                version_count = V.version_count,
+                earliest_version_created = V.earliest_version_created
+            FROM (
+                SELECT
+                    T.basefilenode_id,
+                    (ARRAY_AGG(FV.id ORDER BY FV.created DESC, FV.id DESC))[1] AS latest_version_id,
+                    COUNT(*) AS version_count,
+                    MIN(FV.created) AS earliest_version_created
+                FROM osf_basefileversionsthrough AS T
+                JOIN osf_fileversion AS FV ON FV.id = T.fileversion_id
+                WHERE T.basefilenode_id = ANY(%s)
+                GROUP BY T.basefilenode_id
+            ) AS V
+            WHERE F.id = V.basefilenode_id
+            RETURNING F.id, F.latest_version_id, F.version_count, F.earliest_version_created;
+        """
+        if not file_ids:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(file_ids)])
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def add_version(self, version, name=None):
+        ret = super().add_version(version, name)
+        fields = self.update_version_fields([self.id]).get(self.id)
+        if fields:
+            self.latest_version_id, self.version_count, self.earliest_version_created = fields
+        return ret
+
     @property
     def _hashes(self):
         try:
@@ -476,6 +537,55 @@ class OsfStorageFolder(OsfStorageFileNode, Folder):
 
         return False
 
+    _DESCENDANT_PATHS_CTE = """
+        WITH RECURSIVE descendant_paths_cte(id, gen_path) AS (
+          SELECT
+            T.id,
+            %s :: TEXT AS gen_path
+          FROM %s AS T
+          WHERE T.id = %s
+          UNION ALL
+          SELECT
+            T.id,
+            (R.gen_path || T.name || CASE WHEN T.type = %s THEN '/' ELSE '' END) AS gen_path
+          FROM descendant_paths_cte AS R
+            JOIN %s AS T ON T.parent_id = R.id
+          WHERE T.type IN %s
+        )
+    """
+
+    def _descendant_paths_params(self):
+        return [
+            self.materialized_path,
+            AsIs(self._meta.db_table),
+            self.pk,
+            OsfStorageFolder._typedmodels_type,
+            AsIs(self._meta.db_table),
+            (OsfStorageFolder._typedmodels_type, OsfStorageFile._typedmodels_type),
+        ]
+
+    def get_materialized_paths(self):
+        """Return {id: materialized path} for this folder and all of its descendants, in one query."""
+        sql = self._DESCENDANT_PATHS_CTE + 'SELECT id, gen_path FROM descendant_paths_cte;'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self._descendant_paths_params())
+            return dict(cursor.fetchall())
+
+    def store_materialized_paths(self):
+        """Store the materialized path of every descendant that does not have one yet.
+
+        :return int: Number of rows updated
+        """
+        sql = self._DESCENDANT_PATHS_CTE + """
+            UPDATE %s AS T
+            SET _materialized_path = N.gen_path
+            FROM descendant_paths_cte AS N
+            WHERE T.id = N.id AND (T._materialized_path IS NULL OR T._materialized_path = '');
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self._descendant_paths_params() + [AsIs(self._meta.db_table)])
+            return cursor.rowcount
+
     @property
     def is_preprint_primary(self):
         if hasattr(self.target, 'primary_file') and self.target.primary_file:
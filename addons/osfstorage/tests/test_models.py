@@ -3,13 +3,16 @@ import unittest
 
 import pytest
 import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from importlib import import_module
 from django.conf import settings as django_conf_settings
 
+from api.share.utils import task__update_share_many
 from framework.auth import Auth
 from addons.osfstorage.models import OsfStorageFile, OsfStorageFileNode, OsfStorageFolder
-from osf.models import BaseFileNode
+from osf.models import BaseFileNode, GuidMetadataRecord
 from osf.exceptions import ValidationError
 from osf.utils.permissions import WRITE, ADMIN
 
@@ -198,6 +201,40 @@ class TestOsfstorageFileNode(StorageTestCase):
     def test_create_version(self):
         pass
 
+    def test_create_version_updates_version_fields(self):
+        file = self.node_settings.get_root().append_file('Versioned')
+        assert file.version_count is None
+
+        first = file.create_version(self.user, {
+            'service': 'cloud',
+            settings.WATERBUTLER_RESOURCE: 'osf',
+            'object': 'd077f2',
+        })
+        second = file.create_version(self.user, {
+            'service': 'cloud',
+            settings.WATERBUTLER_RESOURCE: 'osf',
+            'object': '06d80e',
+        })
+
+        file = OsfStorageFile.objects.get(id=file.id)
+        assert file.latest_version == second
+        assert file.version_count == 2
+        assert file.earliest_version_created == first.created
+
+    def test_update_version_fields(self):
+        file = self.node_settings.get_root().append_file('Backfilled')
+        versions = [factories.FileVersionFactory() for _ in range(3)]
+        for version in versions:
+            models.BaseFileVersionsThrough.objects.create(basefilenode=file, fileversion=version)
+        empty = self.node_settings.get_root().append_file('Empty')
+
+        updated = OsfStorageFile.update_version_fields([file.id, empty.id])
+
+        assert updated == {file.id: (versions[-1].id, 3, versions[0].created)}
+        file.reload()
+        assert file.latest_version == versions[-1]
+        assert OsfStorageFile.objects.get(id=empty.id).version_count is None
+
     def test_delete_folder(self):
         parent = self.node_settings.get_root().append_folder('Test')
         kids = []
@@ -302,6 +339,48 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
         assert '/Cloud/Carp' == child.materialized_path
 
+    def test_materialized_path_is_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        assert OsfStorageFileNode.objects.get(id=child.id)._materialized_path == '/Cloud/Carp'
+
+    def test_materialized_path_updated_on_move_and_rename(self):
+        root = self.node_settings.get_root()
+        folder = root.append_folder('Cloud')
+        child = folder.append_folder('Sub').append_file('Carp')
+        folder.move_under(root.append_folder('Sky'), name='Rain')
+        assert OsfStorageFileNode.load(child._id).materialized_path == '/Sky/Rain/Sub/Carp'
+
+    def test_materialized_path_computed_if_not_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        OsfStorageFileNode.objects.filter(target_object_id=self.project.id).update(_materialized_path='')
+        assert OsfStorageFileNode.load(child._id).materialized_path == '/Cloud/Carp'
+
+    def test_materialized_path_of_children_uses_loaded_parent(self):
+        folder = self.node_settings.get_root().append_folder('Cloud')
+        for name in ('Carp', 'Trout', 'Bass'):
+            folder.append_file(name)
+        OsfStorageFileNode.objects.filter(target_object_id=self.project.id).update(_materialized_path='')
+        folder = OsfStorageFolder.load(folder._id)
+        children = list(folder.children)
+        with CaptureQueriesContext(connection) as ctx:
+            paths = sorted(child.materialized_path for child in children)
+        assert len(ctx.captured_queries) == 1
+        assert paths == ['/Cloud/Bass', '/Cloud/Carp', '/Cloud/Trout']
+
+    def test_get_and_store_materialized_paths(self):
+        root = self.node_settings.get_root()
+        folder = root.append_folder('Cloud')
+        child = folder.append_file('Carp')
+        OsfStorageFileNode.objects.filter(target_object_id=self.project.id).update(_materialized_path='')
+        root = OsfStorageFolder.load(root._id)
+        assert root.get_materialized_paths() == {
+            root.id: '/',
+            folder.id: '/Cloud/',
+            child.id: '/Cloud/Carp',
+        }
+        assert root.store_materialized_paths() == 3
+        assert OsfStorageFileNode.objects.get(id=child.id)._materialized_path == '/Cloud/Carp'
+
     def test_copy(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
@@ -402,6 +481,96 @@ class TestOsfstorageFileNode(StorageTestCase):
         assert copied.parent == copy_to
         assert to_copy.parent == self.node_settings.get_root()
 
+    def make_tree(self, name, files=2):
+        folder = self.node_settings.get_root().append_folder(name)
+        subfolder = folder.append_folder('Sub')
+        for i in range(files):
+            for parent in (folder, subfolder):
+                child = parent.append_file(f'{name}-{i}')
+                for _ in range(2):
+                    child.add_version(factories.FileVersionFactory(region=self.node_settings.region), f'old-{i}')
+                record = GuidMetadataRecord.objects.for_guid(child.get_guid(create=True))
+                record.title = f'Title {i}'
+                record.save()
+        folder.append_file('Trashed').delete()
+        return folder
+
+    def test_copy_tree(self):
+        canada = RegionFactory()
+        new_project = ProjectFactory()
+        other_node_settings = new_project.get_addon('osfstorage')
+        other_node_settings.region = canada
+        other_node_settings.save()
+        to_copy = self.make_tree('Tree')
+
+        copied = to_copy.copy_under(other_node_settings.get_root())
+
+        assert copied.copied_from == to_copy
+        assert copied.materialized_path == '/Tree/'
+        [subfolder] = copied.children.filter(type='osf.osfstoragefolder')
+        assert subfolder.materialized_path == '/Tree/Sub/'
+        assert sorted(copied.children.values_list('name', flat=True)) == ['Sub', 'Tree-0', 'Tree-1']
+        for parent in (copied, subfolder):
+            for child in parent.children.filter(type='osf.osfstoragefile'):
+                source = child.copied_from
+                assert child.target == new_project
+                assert child.materialized_path == parent.materialized_path + child.name
+                versions = child.versions.order_by('created')
+                # The most recent version is cloned into the destination region
+                assert versions.count() == 2
+                assert versions.first() == source.versions.order_by('created').first()
+                assert versions.last().region == canada
+                assert versions.last() not in source.versions.all()
+                assert child.version_count == 2
+                assert child.latest_version == versions.last()
+                # Older versions keep their names; the newest one is named after the copy
+                i = child.name.rsplit('-', 1)[1]
+                assert versions.first().get_basefilenode_version(child).version_name == f'old-{i}'
+                assert versions.last().get_basefilenode_version(child).version_name == child.name
+                assert GuidMetadataRecord.objects.for_guid(child.get_guid()).title == GuidMetadataRecord.objects.for_guid(source.get_guid()).title
+
+    def test_copy_tree_same_region_keeps_versions(self):
+        to_copy = self.make_tree('Tree', files=1)
+        copied = to_copy.copy_under(self.node_settings.get_root(), name='Copy')
+
+        assert copied.name == 'Copy'
+        for child in copied.children.filter(type='osf.osfstoragefile'):
+            assert set(child.versions.all()) == set(child.copied_from.versions.all())
+
+    def test_copy_tree_query_count(self):
+        small = self.make_tree('Small', files=1)
+        large = self.make_tree('Large', files=5)
+        copy_to = self.node_settings.get_root().append_folder('Copies')
+
+        with CaptureQueriesContext(connection) as small_queries:
+            small.copy_under(copy_to)
+        with CaptureQueriesContext(connection) as large_queries:
+            large.copy_under(copy_to)
+        assert len(large_queries) == len(small_queries)
+
+    def test_copy_tree_indexes_copied_files(self):
+        to_copy = self.make_tree('Tree', files=1)
+        copy_to = self.node_settings.get_root().append_folder('Copies')
+
+        with mock.patch('website.search.search.search_engine') as mock_search, \
+                mock.patch('api.share.utils.enqueue_task') as mock_enqueue, \
+                mock.patch('api.share.utils.UPDATE_SHARE_MANY_BATCH_SIZE', 1):
+            copied = to_copy.copy_under(copy_to)
+
+        copied_files = OsfStorageFile.objects.filter(copied_from__parent__in=[to_copy, *to_copy.children.all()])
+        assert copied_files.count() == 2
+        mock_search.bulk_update_files.assert_called_once()
+        assert set(mock_search.bulk_update_files.call_args[0][0]) == set(copied_files)
+        batches = [
+            call[0][0].args[0] for call in mock_enqueue.call_args_list
+            if call[0][0].task == task__update_share_many.name
+        ]
+        assert [len(batch) for batch in batches] == [1, 1]
+        assert {guid for batch in batches for guid in batch} == {
+            copied_file.get_guid()._id for copied_file in copied_files
+        }
+        assert copied.children.count() == 2
+
     def test_move(self):
         to_move = self.node_settings.get_root().append_file('Carp')
         move_to = self.node_settings.get_root().append_folder('Cloud')
@@ -177,6 +177,39 @@ class TestGetMetadataHook(HookTestCase):
         assert res_date_modified == expected_date_modified
         assert res_date_created == expected_date_created
 
+    def test_children_paginated(self):
+        root = self.node_settings.get_root()
+        children = [root.append_file(f'file-{i}') for i in range(3)]
+        params = {'fid': root._id, 'user_id': self.user._id, 'page_size': 2}
+
+        res = self.send_hook('osfstorage_get_children', dict(params), {}, self.node)
+        assert [child['id'] for child in res.json['data']] == [child._id for child in children[:2]]
+        assert res.json['next']
+
+        res = self.send_hook('osfstorage_get_children', dict(params, cursor=res.json['next']), {}, self.node)
+        assert [child['id'] for child in res.json['data']] == [children[2]._id]
+        assert res.json['next'] is None
+
+    def test_children_metadata_without_version_fields(self):
+        record = self.node_settings.get_root().append_file('unpopulated')
+        versions = [factories.FileVersionFactory() for _ in range(2)]
+        for version in versions:
+            # Bypasses add_version, like files versioned before the fields were maintained
+            models.BaseFileVersionsThrough.objects.create(basefilenode=record, fileversion=version)
+        record.refresh_from_db()
+        assert record.version_count is None
+
+        res = self.send_hook(
+            'osfstorage_get_children',
+            {'fid': record.parent._id, 'user_id': self.user._id},
+            {},
+            self.node
+        )
+        [res_data] = res.json
+        assert res_data['version'] == 2
+        assert parse_datetime(res_data['modified']) == versions[-1].created
+        assert parse_datetime(res_data['created']) == versions[0].created
+
     def test_osf_storage_root(self):
         auth = Auth(self.project.creator)
         result = osf_storage_root(self.node_settings.config, self.node_settings, auth)
@@ -1,4 +1,5 @@
 from rest_framework import status as http_status
+import json
 import logging
 
 from django.core.exceptions import ValidationError
@@ -6,7 +7,7 @@ from django.db import IntegrityError
 from django.db import connection
 from django.db import transaction
 
-from flask import request
+from flask import request, Response, stream_with_context
 
 from framework.auth import Auth
 from framework.exceptions import HTTPError
@@ -183,17 +184,44 @@ def osfstorage_get_metadata(file_node, **kwargs):
     return file_node.serialize(version=version, include_full=True)
 
 
+CHILDREN_CHUNK_SIZE = 500
+
+
+def iter_json_rows(rows, next_cursor=None, paginated=False):
+    """Stream rows that are already JSON text as a list, or as a page with the cursor of the next page"""
+    yield '{"data": [' if paginated else '['
+    for i in range(0, len(rows), CHILDREN_CHUNK_SIZE):
+        yield (',' if i else '') + ','.join(row for row, in rows[i:i + CHILDREN_CHUNK_SIZE])
+    yield '], "next": {}}}'.format(json.dumps(next_cursor)) if paginated else ']'
+
+
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
 def osfstorage_get_children(file_node, **kwargs):
+    """List the children of a folder.
+
+    Without `page_size` every child is returned as a list. With it, children are returned ordered by
+    id as {"data": [...], "next": cursor}; pass `cursor` to get the following page, until `next` is null.
+    """
     from django.contrib.contenttypes.models import ContentType
+    try:
+        page_size = request.args.get('page_size', type=int)
+        cursor_id = int(request.args.get('cursor') or 0)
+    except ValueError:
+        raise make_error(http_status.HTTP_400_BAD_REQUEST, message_short='Invalid cursor')
+    paginated = page_size is not None
+    if paginated:
+        page_size = max(1, min(page_size, osf_storage_settings.MAX_CHILDREN_PAGE_SIZE))
+
     user_id = request.args.get('user_id')
     user_content_type_id = ContentType.objects.get_for_model(OSFUser).id
     user_pk = OSFUser.objects.filter(guids___id=user_id, guids___id__isnull=False).values_list('pk', flat=True).first()
     with connection.cursor() as cursor:
-        # Read the documentation on FileVersion's fields before reading this code
+        # Read the documentation on FileVersion's fields before reading this code.
+        # Version fields are read from the columns OsfStorageFile maintains, or from the versions
+        # of files that have not been populated yet (see populate_osfstorage_version_fields)
         cursor.execute("""
-            SELECT json_agg(CASE
+            SELECT F.id, CASE
                 WHEN F.type = 'osf.osfstoragefile' THEN
                     json_build_object(
                         'id', F._id
@@ -202,10 +230,17 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'kind', 'file'
                         , 'size', LATEST_VERSION.size
                         , 'downloads',  COALESCE(DOWNLOAD_COUNT, 0)
-                        , 'version', (SELECT COUNT(*) FROM osf_basefileversionsthrough WHERE osf_basefileversionsthrough.basefilenode_id = F.id)
+                        , 'version', COALESCE(F.version_count, (
+                            SELECT COUNT(*) FROM osf_basefileversionsthrough
+                            WHERE osf_basefileversionsthrough.basefilenode_id = F.id
+                        ))
                         , 'contentType', LATEST_VERSION.content_type
                         , 'modified', LATEST_VERSION.created
-                        , 'created', EARLIEST_VERSION.created
+                        , 'created', COALESCE(F.earliest_version_created, (
+                            SELECT MIN(osf_fileversion.created) FROM osf_fileversion
+                            JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
+                            WHERE osf_basefileversionsthrough.basefilenode_id = F.id
+                        ))
                         , 'checkout', CHECKOUT_GUID
                         , 'md5', LATEST_VERSION.metadata ->> 'md5'
                         , 'sha256', LATEST_VERSION.metadata ->> 'sha256'
@@ -218,23 +253,15 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'name', F.name
                         , 'kind', 'folder'
                     )
-                END
-            )
+                END::text
             FROM osf_basefilenode AS F
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
+            LEFT JOIN osf_fileversion AS LATEST_VERSION ON LATEST_VERSION.id = COALESCE(F.latest_version_id, (
+                SELECT osf_fileversion.id FROM osf_fileversion
                 JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
                 WHERE osf_basefileversionsthrough.basefilenode_id = F.id
                 ORDER BY created DESC
                 LIMIT 1
-            ) LATEST_VERSION ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefileversionsthrough ON osf_fileversion.id = osf_basefileversionsthrough.fileversion_id
-                WHERE osf_basefileversionsthrough.basefilenode_id = F.id
-                ORDER BY created ASC
-                LIMIT 1
-            ) EARLIEST_VERSION ON TRUE
+            ))
             LEFT JOIN LATERAL (
                 SELECT _id from osf_guid
                 WHERE object_id = F.checkout_id
@@ -264,7 +291,7 @@ def osfstorage_get_children(file_node, **kwargs):
                 THEN
                     CASE WHEN EXISTS(
                       SELECT (1) FROM osf_fileversionusermetadata
-                      WHERE osf_fileversionusermetadata.file_version_id = LATEST_VERSION.fileversion_id
+                      WHERE osf_fileversionusermetadata.file_version_id = LATEST_VERSION.id
                       AND osf_fileversionusermetadata.user_id = %s
                       LIMIT 1
                     )
@@ -279,6 +306,9 @@ def osfstorage_get_children(file_node, **kwargs):
             ) SEEN_LATEST_VERSION ON TRUE
             WHERE parent_id = %s
             AND (NOT F.type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
+            AND F.id > %s
+            ORDER BY F.id
+            LIMIT %s
         """, [
             user_content_type_id,
             file_node.target.guids.first().id,
@@ -286,9 +316,21 @@ def osfstorage_get_children(file_node, **kwargs):
             user_pk,
             user_id,
             user_id,
-            file_node.id
+            file_node.id,
+            cursor_id,
+            # One more than a page, to tell whether there is a next page
+            page_size + 1 if paginated else None,
         ])
-        return cursor.fetchone()[0] or []
+        rows = cursor.fetchall()
+
+    next_cursor = None
+    if paginated and len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = str(rows[-1][0])
+    return Response(
+        stream_with_context(iter_json_rows([row[1:] for row in rows], next_cursor, paginated)),
+        mimetype='application/json',
+    )
 
 
 @must_be_signed
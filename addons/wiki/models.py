@@ -1,5 +1,7 @@
 import datetime
 import functools
+import hashlib
+import json
 import logging
 
 import markdown
@@ -50,6 +52,9 @@ SHAREJS_DB_URL = f'mongodb://{settings.DB_HOST}:{settings.DB_PORT}/{SHAREJS_DB_N
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.fromtimestamp(1423760098, pytz.utc)
 
+# Bump to re-render the cached HTML of every version after changing how wiki pages are rendered
+WIKI_RENDER_VERSION = 1
+
 
 def validate_page_name(value):
     value = (value or '').strip()
@@ -92,6 +97,12 @@ def build_wiki_url(node, label, base, end):
     return f'/{node._id}/wiki/{label}/'
 
 
+def get_render_key(node):
+    """Digest of what the rendered HTML and text of a version depend on, besides its content"""
+    render_config = [WIKI_RENDER_VERSION, node._id, settings.WIKI_WHITELIST]
+    return hashlib.sha256(json.dumps(render_config, sort_keys=True, default=sorted).encode()).hexdigest()
+
+
 class WikiVersionNodeManager(models.Manager):
 
     def get_for_node(self, node, name=None, version=None, id=None):
@@ -122,12 +133,49 @@ class WikiVersion(ObjectIDMixin, BaseModel):
     content = models.TextField(default='', blank=True)
     identifier = models.IntegerField(default=1)
 
+    # Output of html() and raw_text(), valid while render_key matches get_render_key(node)
+    rendered_html = models.TextField(null=True, blank=True)
+    rendered_text = models.TextField(null=True, blank=True)
+    render_key = models.CharField(max_length=64, null=True, blank=True)
+
+    RENDER_FIELDS = ('rendered_html', 'rendered_text', 'render_key')
+
     @property
     def is_current(self):
         return not self.wiki_page.deleted and self.id == self.wiki_page.versions.order_by('-created').first().id
 
     def html(self, node):
         """The cleaned HTML of the page"""
+        return self._get_rendered(node, 'rendered_html', self._build_html)
+
+    def raw_text(self, node):
+        """ The raw text of the page, suitable for using in a test search"""
+        return self._get_rendered(node, 'rendered_text', self._build_raw_text)
+
+    def render(self, node):
+        """Render the HTML and raw text of the page for `node`, to be stored on save"""
+        self.rendered_html = self._build_html(node)
+        self.rendered_text = self._build_raw_text(node)
+        self.render_key = get_render_key(node)
+
+    def _get_rendered(self, node, field_name, build):
+        render_key = get_render_key(node)
+        if self.render_key != render_key:
+            # Rendered for another node, or with other sanitizer settings
+            self.rendered_html = self.rendered_text = None
+            self.render_key = render_key
+        rendered = getattr(self, field_name)
+        if rendered is None:
+            rendered = build(node)
+            setattr(self, field_name, rendered)
+            if self.pk:
+                # Not save(), which would reindex the node and check the content for spam again
+                WikiVersion.objects.filter(pk=self.pk).update(
+                    **{field: getattr(self, field) for field in self.RENDER_FIELDS}
+                )
+        return rendered
+
+    def _build_html(self, node):
         html_output = build_html_output(self.content, node=node)
         try:
             return sanitize_html(
@@ -141,9 +189,7 @@ class WikiVersion(ObjectIDMixin, BaseModel):
             logger.warning('Returning unlinkified content.')
             return render_content(self.content, node=node)
 
-    def raw_text(self, node):
-        """ The raw text of the page, suitable for using in a test search"""
-
+    def _build_raw_text(self, node):
         return sanitize(self.content, tags=[], strip=True)
 
     @property
@@ -172,6 +218,11 @@ class WikiVersion(ObjectIDMixin, BaseModel):
         return self.content
 
     def save(self, *args, **kwargs):
+        if self.wiki_page.node:
+            # Versions do not change once saved, so render them once here rather than on every view
+            self.render(self.wiki_page.node)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], *self.RENDER_FIELDS}
         rv = super().save(*args, **kwargs)
         if self.wiki_page.node:
             self.wiki_page.node.update_search()
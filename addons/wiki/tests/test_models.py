@@ -1,12 +1,18 @@
 import pytest
 import pytz
 import datetime
+from unittest import mock
+
+from django.core.management import call_command
+from framework.auth.core import Auth
+from addons.wiki import models as wiki_models
 from addons.wiki.exceptions import NameMaximumLengthError
 
 from addons.wiki.models import WikiPage, WikiVersion
 from addons.wiki.tests.factories import WikiFactory, WikiVersionFactory
 from osf_tests.factories import NodeFactory, UserFactory, ProjectFactory
 from tests.base import OsfTestCase, fake
+from website import settings
 
 pytestmark = pytest.mark.django_db
 
@@ -103,3 +109,54 @@ class TestWikiPage(OsfTestCase):
         latest_version = wiki.versions.order_by('-created')[0]
         assert latest_version.is_current
         assert wiki.get_version(5) == latest_version
+
+
+class TestWikiVersionRenderCache:
+
+    @pytest.fixture()
+    def node(self):
+        return NodeFactory()
+
+    @pytest.fixture()
+    def version(self, node):
+        page = WikiPage.objects.create_for_node(node, 'home', '# Title\n\n[[other page]] <script>x</script>', Auth(node.creator))
+        return page.get_version()
+
+    def test_rendered_on_save(self, node, version):
+        version = WikiVersion.objects.get(id=version.id)
+        assert version.render_key == wiki_models.get_render_key(node)
+        with mock.patch.object(wiki_models, 'build_html_output') as mock_build:
+            html = version.html(node)
+            raw_text = version.raw_text(node)
+        assert not mock_build.called
+        assert html == version._build_html(node)
+        assert f'/{node._id}/wiki/other page/' in html
+        assert '<script>' not in html
+        assert raw_text == version._build_raw_text(node)
+
+    def test_rerendered_for_new_sanitizer_settings(self, node, version):
+        whitelist = {**settings.WIKI_WHITELIST, 'tags': settings.WIKI_WHITELIST['tags'] - {'h1'}}
+        with mock.patch.object(settings, 'WIKI_WHITELIST', whitelist):
+            html = version.html(node)
+            assert '<h1>' not in html
+            stored = WikiVersion.objects.get(id=version.id)
+            assert stored.rendered_html == html
+            assert stored.render_key == wiki_models.get_render_key(node)
+        assert '<h1>' in WikiVersion.objects.get(id=version.id).html(node)
+
+    def test_rendered_for_other_node(self, node, version):
+        other_node = NodeFactory()
+        html = version.html(other_node)
+        assert f'/{other_node._id}/wiki/other page/' in html
+        assert version.render_key == wiki_models.get_render_key(other_node)
+
+    def test_prerender_wiki_versions(self, node, version):
+        WikiVersion.objects.filter(id=version.id).update(rendered_html=None, rendered_text=None, render_key=None)
+        call_command('prerender_wiki_versions', '--dry')
+        assert WikiVersion.objects.get(id=version.id).render_key is None
+
+        call_command('prerender_wiki_versions')
+        stored = WikiVersion.objects.get(id=version.id)
+        assert stored.render_key == wiki_models.get_render_key(node)
+        assert stored.rendered_html == stored._build_html(node)
+        assert stored.rendered_text == stored._build_raw_text(node)
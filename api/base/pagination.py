@@ -14,6 +14,8 @@ from api.base.settings import MAX_PAGE_SIZE
 from api.base.utils import absolute_reverse
 
 from osf.models import AbstractNode, Comment, Preprint, Guid, DraftRegistration
+from osf.models.mixins import ContributorMixin
+from osf.utils.permission_cache import prefetch_group_perms
 from website.search.elastic_search import DOC_TYPE_TO_MODEL
 
 
@@ -161,10 +163,22 @@ class JSONAPIPagination(pagination.PageNumberPagination):
                 self.display_page_controls = True
 
             self.request = request
-            return list(self.page)
+            page = list(self.page)
 
         else:
-            return super().paginate_queryset(queryset, request, view=None)
+            page = super().paginate_queryset(queryset, request, view=None)
+
+        if page:
+            self.prefetch_permissions(page, request)
+        return page
+
+    def prefetch_permissions(self, page, request):
+        """Load the requesting user's permissions on every contributor-bearing object of the page
+        in one query, so that per-object permission checks during serialization hit the request cache.
+        """
+        objects = [obj for obj in page if isinstance(obj, ContributorMixin)]
+        if objects:
+            prefetch_group_perms(request.user, objects)
 
 
 class MaxSizePagination(JSONAPIPagination):
@@ -212,6 +226,10 @@ class NodeContributorPagination(JSONAPIPagination):
 
     def get_resource(self, kwargs):
         resource_id = kwargs.get('node_id', None)
+        # Embedded requests already hold the parent node
+        for parents in getattr(self.request, 'parents', {}).values():
+            if resource_id in parents:
+                return parents[resource_id]
         return AbstractNode.load(resource_id)
 
     def get_paginated_response(self, data):
@@ -1398,6 +1398,10 @@ class JSONAPIListSerializer(ser.ListSerializer):
         return ret
 
 
+PlannedField = collections.namedtuple('PlannedField', ['field', 'is_relationship', 'is_link', 'is_embedded', 'is_hidden'])
+FieldPlan = collections.namedtuple('FieldPlan', ['type_', 'is_anonymous', 'fields'])
+
+
 class BaseAPISerializer(ser.Serializer):
     def parse_sparse_fields(self):
         request = self.context.get('request')
@@ -1465,34 +1469,32 @@ class JSONAPISerializer(BaseAPISerializer):
                 _validated_data[field] = data[field]
         return _validated_data
 
-    # overrides Serializer
-    def to_representation(self, obj, envelope='data'):
-        """Serialize to final representation.
+    def get_field_plan(self):
+        """Return the `FieldPlan` for the current request, building it on first use.
 
-        :param obj: Object to be serialized.
-        :param envelope: Key for resource object.
+        The plan only depends on the request (sparse fieldsets, anonymization, embeds), so it is
+        computed once per serializer and request shape and reused for every item of a list, unless
+        the serializer context sets `cache_field_plan` to False.
         """
-        ret = {}
         request = self.context.get('request')
         type_ = get_meta_type(self, request)
         assert type_ is not None, 'Must define Meta.type_ or Meta.get_type()'
-        self.parse_sparse_fields()
-
-        data = {
-            'id': '',
-            'type': type_,
-            'attributes': {},
-            'relationships': {},
-            'embeds': {},
-            'links': {},
-        }
-
         embeds = self.context.get('embed', {})
-        context_envelope = self.context.get('envelope', envelope)
-        if context_envelope == 'None':
-            context_envelope = None
-        enable_esi = self.context.get('enable_esi', False)
         is_anonymous = is_anonymized(self.context['request'])
+        sparse_fieldset = request.query_params.get(f'fields[{type_}]') if request else None
+        plan_key = (type_, sparse_fieldset, is_anonymous, frozenset(embeds.keys()))
+
+        if not self.context.get('cache_field_plan', True):
+            return self._build_field_plan(type_, embeds, is_anonymous)
+
+        plans = self.__dict__.setdefault('_field_plans', {})
+        if plan_key not in plans:
+            plans[plan_key] = self._build_field_plan(type_, embeds, is_anonymous)
+        return plans[plan_key]
+
+    def _build_field_plan(self, type_, embeds, is_anonymous):
+        self.parse_sparse_fields()
+
         to_be_removed = set()
         if is_anonymous and hasattr(self, 'non_anonymized_fields'):
             # Drop any fields that are not specified in the `non_anonymized_fields` variable.
@@ -1515,8 +1517,52 @@ class JSONAPISerializer(BaseAPISerializer):
                 ),
             )
 
+        planned_fields = []
         for field in fields:
             nested_field = utils.decompose_field(field)
+            is_link = getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False)
+            planned_fields.append(PlannedField(
+                field=field,
+                is_relationship=isinstance(nested_field, RelationshipField),
+                is_link=is_link,
+                # If embed=field_name is appended to the query string or 'always_embed' flag is True, directly embed the
+                # results in addition to adding a relationship link
+                is_embedded=bool(is_link and embeds and (field.field_name in embeds or getattr(field, 'always_embed', None))),
+                is_hidden=bool(
+                    is_link and is_anonymous and
+                    hasattr(field, 'view_name') and
+                    field.view_name in self.views_to_hide_if_anonymous,
+                ),
+            ))
+        return FieldPlan(type_=type_, is_anonymous=is_anonymous, fields=planned_fields)
+
+    # overrides Serializer
+    def to_representation(self, obj, envelope='data'):
+        """Serialize to final representation.
+
+        :param obj: Object to be serialized.
+        :param envelope: Key for resource object.
+        """
+        ret = {}
+        plan = self.get_field_plan()
+
+        data = {
+            'id': '',
+            'type': plan.type_,
+            'attributes': {},
+            'relationships': {},
+            'embeds': {},
+            'links': {},
+        }
+
+        context_envelope = self.context.get('envelope', envelope)
+        if context_envelope == 'None':
+            context_envelope = None
+        enable_esi = self.context.get('enable_esi', False)
+        is_anonymous = plan.is_anonymous
+
+        for planned in plan.fields:
+            field = planned.field
             try:
                 attribute = field.get_attribute(obj)
             except SkipField:
@@ -1524,7 +1570,7 @@ class JSONAPISerializer(BaseAPISerializer):
             if attribute is None:
                 # We skip `to_representation` for `None` values so that
                 # fields do not have to explicitly deal with that case.
-                if isinstance(nested_field, RelationshipField):
+                if planned.is_relationship:
                     # if this is a RelationshipField, serialize as a null relationship
                     data['relationships'][field.field_name] = {'data': None}
                 else:
@@ -1538,10 +1584,8 @@ class JSONAPISerializer(BaseAPISerializer):
                         representation = field.to_representation(attribute)
                 except SkipField:
                     continue
-                if getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False):
-                    # If embed=field_name is appended to the query string or 'always_embed' flag is True, directly embed the
-                    # results in addition to adding a relationship link
-                    if embeds and (field.field_name in embeds or getattr(field, 'always_embed', None)):
+                if planned.is_link:
+                    if planned.is_embedded:
                         if enable_esi:
                             try:
                                 result = field.to_esi_representation(attribute, envelope=envelope)
@@ -1558,15 +1602,8 @@ class JSONAPISerializer(BaseAPISerializer):
                             data['embeds'][field.field_name] = result
                         else:
                             data['embeds'][field.field_name] = {'error': 'This field is not embeddable.'}
-                    try:
-                        if not (
-                            is_anonymous and
-                            hasattr(field, 'view_name') and
-                                field.view_name in self.views_to_hide_if_anonymous
-                        ):
-                            data['relationships'][field.field_name] = representation
-                    except SkipField:
-                        continue
+                    if not planned.is_hidden:
+                        data['relationships'][field.field_name] = representation
                 elif field.field_name == 'id':
                     data['id'] = representation
                 elif field.field_name == 'links':
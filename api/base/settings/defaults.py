@@ -298,6 +298,10 @@ ADDONS_OAUTH = ADDONS_FOLDER_CONFIGURABLE + ['dataverse', 'github', 'bitbucket',
 
 BYPASS_THROTTLE_TOKEN = 'test-token'
 
+# Throttle backend for api.base.throttling.BaseThrottle: 'history' stores every request timestamp in a list
+# per client, 'counter' keeps a sliding window counter updated with atomic cache increments
+THROTTLE_BACKEND = 'history'
+
 OSF_SHELL_USER_IMPORTS = None
 
 # Settings for use in the admin
@@ -328,6 +332,16 @@ WAFFLE_CACHE_NAME = 'waffle_cache'
 STORAGE_USAGE_CACHE_NAME = 'storage_usage'
 STORAGE_USAGE_MAX_ENTRIES = 10000000
 
+# Buffer PageCounter increments in a cache and flush them periodically instead of locking the row per event
+PAGE_COUNTER_BUFFER_ENABLED = False
+PAGE_COUNTER_BUFFER_CACHE_NAME = 'redis'
+PAGE_COUNTER_FLUSH_INTERVAL = 60  # seconds
+
+# Buffer UserActivityCounter increments the same way, applying them with one UPDATE per user per flush
+USER_ACTIVITY_BUFFER_ENABLED = False
+USER_ACTIVITY_BUFFER_CACHE_NAME = 'redis'
+USER_ACTIVITY_FLUSH_INTERVAL = 60  # seconds
+
 
 CACHES = {
     'default': {
@@ -8,6 +8,9 @@ logger = logging.getLogger(__name__)
 
 
 class BaseThrottle(SimpleRateThrottle):
+    # 'history' keeps a list of request timestamps per client, 'counter' keeps two window counters.
+    # None uses settings.THROTTLE_BACKEND
+    backend = None
 
     def get_ident(self, request):
         if request.META.get('HTTP_X_THROTTLE_TOKEN'):
@@ -29,6 +32,10 @@ class BaseThrottle(SimpleRateThrottle):
         if self.key is None:
             return True
 
+        if self.get_backend() == 'counter':
+            self.now = self.timer()
+            return self.allow_counted_request()
+
         self.history = self.cache.get(self.key, [])
         self.now = self.timer()
 
@@ -40,6 +47,53 @@ class BaseThrottle(SimpleRateThrottle):
             return self.throttle_failure()
         return self.throttle_success()
 
+    def get_backend(self):
+        return self.backend or settings.THROTTLE_BACKEND
+
+    def get_window_keys(self):
+        window = int(self.now // self.duration)
+        return f'{self.key}:{window - 1}', f'{self.key}:{window}'
+
+    def allow_counted_request(self):
+        """
+        Sliding window counter: the number of requests made in the last `duration` seconds is estimated
+        from the counts of the current and the previous fixed windows, the previous one weighted by how
+        much of it the sliding window still covers. Every request costs one atomic increment and one read,
+        whatever the configured rate.
+        """
+        previous_key, current_key = self.get_window_keys()
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # The window expired between add and incr
+            self.cache.set(current_key, 1, self.duration * 2)
+            current = 1
+        previous = self.cache.get(previous_key, 0)
+
+        overlap = 1 - (self.now % self.duration) / self.duration
+        if previous * overlap + current > self.num_requests:
+            # Rejected requests are not counted, as with the history backend
+            self.cache.decr(current_key)
+            self.counts = (previous, current - 1)
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        """
+        Returns the recommended next request time in seconds.
+        """
+        if self.get_backend() != 'counter':
+            return super().wait()
+
+        previous, current = self.counts
+        elapsed = self.now % self.duration
+        if current + 1 > self.num_requests or not previous:
+            return self.duration - elapsed
+        # Wait until enough of the previous window has slid out to admit one more request
+        overlap = (self.num_requests - current - 1) / previous
+        return max((1 - overlap) * self.duration - elapsed, 0)
+
 
 class NonCookieAuthThrottle(BaseThrottle, AnonRateThrottle):
 
@@ -116,7 +116,12 @@ class JSONAPIBaseView(generics.GenericAPIView):
                 if not isinstance(view, ListModelMixin):
                     ret = ser.to_representation(item)
                 else:
-                    queryset = view.filter_queryset(view.get_queryset())
+                    batch = self._get_embed_batch(field_name, view, item)
+                    if batch is not None and view.get_resource() == item:
+                        # Permissions on the parent were checked by get_resource; reuse the batched results
+                        queryset = batch.get(item.pk, [])
+                    else:
+                        queryset = view.filter_queryset(view.get_queryset())
                     page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
 
                     ret = ser.to_representation(page or queryset)
@@ -137,6 +142,40 @@ class JSONAPIBaseView(generics.GenericAPIView):
 
         return partial
 
+    def _get_embed_batch(self, field_name, view, item):
+        """Resolve an embedded list for every item of the page being serialized at once.
+
+        Embedded list views opt in by setting `embed_batch_parent_model` and implementing
+        `get_embed_batch_queryset(parents)`, which must return a queryset covering all of
+        `parents`, annotated with `_embed_parent_id`. If the view sets `embed_batch_parent_attr`,
+        that attribute of each result is set to its (already loaded) parent.
+
+        :return dict: parent pk -> list of results, or `None` if the embed cannot be batched
+        """
+        parent_model = getattr(view, 'embed_batch_parent_model', None)
+        parents = getattr(self, '_embed_parents', None)
+        if not parents or parent_model is None or not isinstance(item, parent_model):
+            return None
+
+        cache = view.request._request._embed_cache
+        _cache_key = ('batch', type(view), field_name)
+        if _cache_key not in cache:
+            parents_by_pk = {parent.pk: parent for parent in parents if isinstance(parent, parent_model)}
+            parent_attr = getattr(view, 'embed_batch_parent_attr', None)
+            grouped = defaultdict(list)
+            for obj in view.filter_queryset(view.get_embed_batch_queryset(list(parents_by_pk.values()))):
+                if parent_attr:
+                    setattr(obj, parent_attr, parents_by_pk[obj._embed_parent_id])
+                grouped[obj._embed_parent_id].append(obj)
+            cache[_cache_key] = grouped
+        return cache[_cache_key]
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args and isinstance(args[0], list):
+            # Remember the page, so that embeds can be resolved for all of its items at once
+            self._embed_parents = args[0]
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_context(self):
         """Inject request into the serializer context. Additionally, inject partial functions
         (request, object -> embed items) if the query string contains embeds.  Allows
@@ -1,5 +1,4 @@
 from urllib.parse import urlparse
-from django.db import connection
 from django.db.models import Sum
 
 import requests
@@ -111,37 +110,55 @@ def ban_url(instance):
 
 
 @app.task(max_retries=5, default_retry_delay=10)
-def update_storage_usage_cache(target_id, target_guid, per_page=500000):
+def update_storage_usage_cache(target_id, target_guid, per_page=10000):
+    """Recount the storage usage of a node, storing it in its counter and the cache"""
     if not settings.ENABLE_STORAGE_USAGE_CACHE:
         return
-    sql = """
-        SELECT count(size), sum(size) from
-        (SELECT size FROM osf_basefileversionsthrough AS obfnv
-        LEFT JOIN osf_basefilenode file ON obfnv.basefilenode_id = file.id
-        LEFT JOIN osf_fileversion version ON obfnv.fileversion_id = version.id
-        LEFT JOIN django_content_type type on file.target_content_type_id = type.id
-        WHERE file.provider = 'osfstorage'
-        AND type.model = 'abstractnode'
-        AND file.deleted_on IS NULL
-        AND file.target_object_id=%s
-        ORDER BY version.id
-        LIMIT %s OFFSET %s) file_page
-    """
-    count = per_page
-    offset = 0
-    storage_usage_total = 0
-    with connection.cursor() as cursor:
-        while count:
-            cursor.execute(sql, [target_id, per_page, offset])
-            result = cursor.fetchall()
-            storage_usage_total += int(result[0][1]) if result[0][1] else 0
-            count = int(result[0][0]) if result[0][0] else 0
-            offset += count
+    NodeStorageUsage = apps.get_model('osf.NodeStorageUsage')
+    storage_usage_total = NodeStorageUsage.reconcile(target_id, per_page=per_page)
 
     key = cache_settings.STORAGE_USAGE_KEY.format(target_id=target_guid)
     storage_usage_cache.set(key, storage_usage_total, settings.STORAGE_USAGE_CACHE_TIMEOUT)
 
 
+def update_storage_usage_cache_many(targets, dry_run=False):
+    """Recount the storage usage of several nodes with a single aggregate query.
+
+    :param list targets: AbstractNodes
+    :return tuple: ({node id: total}, {node id: (stored total or None, total)} for nodes that drifted)
+    """
+    NodeStorageUsage = apps.get_model('osf.NodeStorageUsage')
+    totals, drifted = NodeStorageUsage.reconcile_many([target.id for target in targets], dry_run=dry_run)
+    if settings.ENABLE_STORAGE_USAGE_CACHE and not dry_run:
+        storage_usage_cache.set_many(
+            {cache_settings.STORAGE_USAGE_KEY.format(target_id=target._id): totals[target.id] for target in targets},
+            settings.STORAGE_USAGE_CACHE_TIMEOUT,
+        )
+    return totals, drifted
+
+
+def get_stored_storage_usage(target):
+    """Fill the cache from the node's usage counter; return the usage, or None if it has not been counted"""
+    NodeStorageUsage = apps.get_model('osf.NodeStorageUsage')
+    storage_usage_total = NodeStorageUsage.get_total(target.id)
+    if storage_usage_total is not None:
+        key = cache_settings.STORAGE_USAGE_KEY.format(target_id=target._id)
+        storage_usage_cache.set(key, storage_usage_total, settings.STORAGE_USAGE_CACHE_TIMEOUT)
+    return storage_usage_total
+
+
+def add_storage_usage(target, size):
+    """Add `size` bytes (negative when removing) to the usage of a node whose usage is known"""
+    NodeStorageUsage = apps.get_model('osf.NodeStorageUsage')
+    storage_usage_total = NodeStorageUsage.add(target.id, size)
+    if storage_usage_total is None:
+        # Counted into the cache before usage counters were stored, keep adjusting the cache
+        storage_usage_total = max(target.storage_usage + size, 0)
+
+    key = cache_settings.STORAGE_USAGE_KEY.format(target_id=target._id)
+    storage_usage_cache.set(key, storage_usage_total, settings.STORAGE_USAGE_CACHE_TIMEOUT)
+
+
 def update_storage_usage(target):
     Preprint = apps.get_model('osf.preprint')
 
@@ -170,7 +187,6 @@ def update_storage_usage_with_size(payload):
     if target_node.storage_limit_status is settings.StorageLimits.NOT_CALCULATED:
         return update_storage_usage(target_node)
 
-    current_usage = target_node.storage_usage
     target_file = BaseFileNode.load(target_file_id)
 
     if target_file and action in ['copy', 'delete', 'move']:
@@ -178,10 +194,10 @@ def update_storage_usage_with_size(payload):
         target_file_size = target_file.versions.aggregate(Sum('size'))['size__sum'] or target_file_size
 
     if action in ['create', 'update', 'copy'] and provider == 'osfstorage':
-        current_usage += target_file_size
+        add_storage_usage(target_node, target_file_size)
 
     elif action == 'delete' and provider == 'osfstorage':
-        current_usage = max(current_usage - target_file_size, 0)
+        add_storage_usage(target_node, -target_file_size)
 
     elif action in 'move':
         source_node = AbstractNode.load(payload['source']['nid'])  # Getting the 'from' node
@@ -193,18 +209,8 @@ def update_storage_usage_with_size(payload):
             if source_node.storage_limit_status is settings.StorageLimits.NOT_CALCULATED:
                 return update_storage_usage(source_node)
 
-            source_node_usage = source_node.storage_usage
-            source_node_usage = max(source_node_usage - target_file_size, 0)
-
-            key = cache_settings.STORAGE_USAGE_KEY.format(target_id=source_node._id)
-            storage_usage_cache.set(key, source_node_usage, settings.STORAGE_USAGE_CACHE_TIMEOUT)
-
-        current_usage += target_file_size
+            add_storage_usage(source_node, -target_file_size)
 
         if provider != 'osfstorage':
             return  # We don't want to update the destination node if the provider isn't osfstorage
-    else:
-        return
-
-    key = cache_settings.STORAGE_USAGE_KEY.format(target_id=target_node._id)
-    storage_usage_cache.set(key, current_usage, settings.STORAGE_USAGE_CACHE_TIMEOUT)
+        add_storage_usage(target_node, target_file_size)
@@ -1,3 +1,4 @@
+import functools
 import os
 import re
 from rest_framework import status as http_status
@@ -10,7 +11,7 @@ from citeproc.source.json import CiteProcJSON
 from framework.exceptions import HTTPError
 from framework.auth import utils
 from osf.models.citation import CitationStyle
-from website.settings import CITATION_STYLES_PATH, BASE_PATH, CUSTOM_CITATIONS
+from website.settings import CITATION_STYLES_PATH, CITATION_STYLE_CACHE_SIZE, BASE_PATH, CUSTOM_CITATIONS
 
 
 def clean_up_common_errors(cit):
@@ -42,28 +43,65 @@ def process_name(node, user):
     }
 
 
-def render_citation(node, style='apa'):
-    """Given a node, return a citation"""
-    reformat_styles = ['apa', 'chicago-author-date', 'modern-language-association']
-    csl = node.csl
-    data = [csl]
-
-    bib_source = CiteProcJSON(data)
-
+def _style_path(style):
     custom = CUSTOM_CITATIONS.get(style, False)
     path = os.path.join(BASE_PATH, 'static', custom) if custom else os.path.join(CITATION_STYLES_PATH, style)
+    # citeproc appends the extension to paths that do not exist
+    return path if os.path.exists(path) else f'{path}.csl'
+
 
+def _mtime(path):
     try:
-        bib_style = CitationStylesStyle(path, validate=False)
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=CITATION_STYLE_CACHE_SIZE)
+def _parse_style(path, mtime):
+    """Parse a CSL style file once per process; `mtime` is part of the key so updated styles are parsed again"""
+    return CitationStylesStyle(path, validate=False)
+
+
+def load_style(style):
+    """Return the parsed CSL style for `style`, or for its parent if `style` is a dependent style"""
+    path = _style_path(style)
+    try:
+        return _parse_style(path, _mtime(path))
     except ValueError:
         citation_style = CitationStyle.load(style)
         if citation_style is not None and citation_style.has_parent_style:
-            parent_style = citation_style.parent_style
-            parent_path = os.path.join(CITATION_STYLES_PATH, parent_style)
-            bib_style = CitationStylesStyle(parent_path, validate=False)
-        else:
-            raise ValueError(f'Unable to find a dependent or independent parent style related to {style}.csl')
+            parent_path = _style_path(citation_style.parent_style)
+            return _parse_style(parent_path, _mtime(parent_path))
+        raise ValueError(f'Unable to find a dependent or independent parent style related to {style}.csl')
+
+
+def render_citation(node, style='apa'):
+    """Given a node, return a citation"""
+    return format_citation(node, node.csl, load_style(style), style)
+
+
+def render_citations(nodes, style='apa'):
+    """Given nodes, return their citations in one style, parsing the style once"""
+    bib_style = load_style(style)
+    return [format_citation(node, node.csl, bib_style, style) for node in nodes]
+
+
+def render_citation_styles(node, styles):
+    """Given a node, return a dict of its citation in each of `styles`, building its CSL data once"""
+    csl = node.csl
+    return {style: format_citation(node, csl, load_style(style), style) for style in styles}
+
+
+def format_citation(node, csl, bib_style, style):
+    """Return the citation of `node` with CSL data `csl` in the parsed style `bib_style`
+
+    Each node gets its own bibliography: one shared by several nodes would sort them and
+    disambiguate their entries against each other.
+    """
+    reformat_styles = ['apa', 'chicago-author-date', 'modern-language-association']
 
+    bib_source = CiteProcJSON([csl])
     bibliography = CitationStylesBibliography(bib_style, bib_source, formatter.plain)
 
     citation = Citation([CitationItem(node._id)])
@@ -73,7 +111,7 @@ def render_citation(node, style='apa'):
     bib = bibliography.bibliography()
     cit = str(bib[0] if len(bib) else '')
 
-    title = csl['title'] if csl else node.csl['title']
+    title = csl['title']
     title = title.rstrip('.')
     if cit.count(title) == 1:
         i = cit.index(title)
@@ -93,7 +131,7 @@ def render_citation(node, style='apa'):
     if style == 'apa':
         cit = apa_reformat(node, cit)
     if style == 'chicago-author-date':
-        cit = chicago_reformat(node, cit)
+        cit = chicago_reformat(node, cit, csl=csl)
     if style == 'modern-language-association':
         cit = mla_reformat(node, cit)
 
@@ -179,9 +217,9 @@ def mla_reformat(node, cit):
 def remove_extra_period_after_right_quotation(cit):
     return cit.replace('”.', '”')  # watch out these double quotes are “ \xe2\x80\x9c not normal "s
 
-def chicago_reformat(node, cit):
+def chicago_reformat(node, cit, csl=None):
     cit = remove_extra_period_after_right_quotation(cit)
-    issued = node.csl.get('issued')
+    issued = (csl or node.csl).get('issued')
     new_csl = cit.split(str(issued['date-parts'][0][0]) if issued else 'n.d.', 1)
     contributors_list = list(node.visible_contributors)
     contributors_list_length = len(contributors_list)
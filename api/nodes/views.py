@@ -139,6 +139,7 @@ from framework.sentry import log_exception
 from osf.features import OSF_GROUPS
 from osf.models import (
     AbstractNode,
+    Contributor,
     OSFUser,
     Node,
     PrivateLink,
@@ -432,9 +433,18 @@ class NodeContributorsList(BaseContributorList, bulk_views.BulkUpdateJSONAPIView
     view_name = 'node-contributors'
     ordering = ('_order',)  # default ordering
 
+    embed_batch_parent_model = Node
+    embed_batch_parent_attr = 'node'
+
     def get_resource(self):
         return self.get_node()
 
+    # overrides JSONAPIBaseView
+    def get_embed_batch_queryset(self, parents):
+        return Contributor.objects.filter(node__in=parents).select_related('user').prefetch_related(
+            'user__guids',
+        ).annotate(_embed_parent_id=F('node_id'))
+
     # overrides ListBulkCreateJSONAPIView, BulkUpdateJSONAPIView, BulkDeleteJSONAPIView
     def get_serializer_class(self):
         """
@@ -1653,9 +1663,15 @@ class NodeInstitutionsList(JSONAPIBaseView, generics.ListAPIView, ListFilterMixi
 
     ordering = ('-id',)
 
+    embed_batch_parent_model = Node
+
     def get_resource(self):
         return self.get_node()
 
+    # overrides JSONAPIBaseView
+    def get_embed_batch_queryset(self, parents):
+        return Institution.objects.filter(nodes__in=parents).annotate(_embed_parent_id=F('nodes__id'))
+
     def get_queryset(self):
         resource = self.get_resource()
         return resource.affiliated_institutions.all() or []
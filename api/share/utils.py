@@ -2,6 +2,7 @@
 
 SHARE/Trove accepts metadata records as "indexcards" in turtle format: https://www.w3.org/TR/turtle/
 """
+from collections import defaultdict
 from functools import partial
 import logging
 import random
@@ -10,6 +11,7 @@ import uuid
 
 from celery.exceptions import Retry
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
 import requests
 
 from framework.celery_tasks import app as celery_app
@@ -17,12 +19,15 @@ from framework.celery_tasks.handlers import enqueue_task
 from framework.encryption import ensure_bytes
 from framework.sentry import log_exception
 from osf import models as osf_db
-from osf.metadata.tools import pls_gather_metadata_file
+from osf.metadata.tools import invalidate_metadata_cache, pls_gather_many, pls_gather_metadata_file
 from website import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Guids sent to SHARE by each task__update_share_many queued by update_share_many
+UPDATE_SHARE_MANY_BATCH_SIZE = 100
+
 
 def shtrove_ingest_url():
     return f'{settings.SHARE_URL}api/v3/ingest'
@@ -51,14 +56,45 @@ def is_qa_resource(resource):
 
 
 def update_share(resource):
-    if not settings.SHARE_ENABLED:
-        return
     if not hasattr(resource, 'guids'):
         logger.error(f'update_share called on non-guid resource: {resource}')
         return
+    # Whatever SHARE needs to hear about also changes the resource's metadata files
+    invalidate_metadata_cache(resource)
+    if not settings.SHARE_ENABLED:
+        return
     _enqueue_update_share(resource)
 
 
+def update_share_many(resources):
+    """Like update_share for each of `resources`, sending them to SHARE with one task per batch"""
+    resources = [resource for resource in resources if hasattr(resource, 'guids')]
+    for resource in resources:
+        invalidate_metadata_cache(resource)
+    if not settings.SHARE_ENABLED or not resources:
+        return
+    by_content_type = defaultdict(dict)
+    for resource in resources:
+        by_content_type[ContentType.objects.get_for_model(resource)][resource.pk] = resource
+    guids = {}
+    for content_type, by_pk in by_content_type.items():
+        guid_values = osf_db.Guid.objects.filter(
+            content_type=content_type,
+            object_id__in=list(by_pk),
+        ).order_by('created').values_list('object_id', '_id')
+        # As _enqueue_update_share, use the newest guid of each resource
+        for object_id, guid in guid_values:
+            guids[(content_type.id, object_id)] = (guid, by_pk[object_id])
+    if not guids:
+        return
+    guid_list = [guid for guid, _ in guids.values()]
+    for i in range(0, len(guid_list), UPDATE_SHARE_MANY_BATCH_SIZE):
+        enqueue_task(task__update_share_many.s(guid_list[i:i + UPDATE_SHARE_MANY_BATCH_SIZE]))
+    for guid, resource in guids.values():
+        if isinstance(resource, (osf_db.AbstractNode, osf_db.Preprint)):
+            enqueue_task(async_update_resource_share.s(guid))
+
+
 def _enqueue_update_share(osfresource):
     _osfguid_value = osfresource.guids.values_list('_id', flat=True).first()
     if not _osfguid_value:
@@ -97,12 +133,41 @@ def task__update_share(self, guid: str, is_backfill=False):
     return resp
 
 
-def pls_send_trove_indexcard(osf_item, *, is_backfill=False):
+@celery_app.task(acks_late=True)
+def task__update_share_many(guids: list, is_backfill=False):
+    """
+    Like task__update_share, for many guids at once, gathering their metadata together.
+    Items that could not be sent or that fail with a server error are retried one at a time
+    with task__update_share, so a failing item does not affect the others.
+    :param guids:
+    :return:
+    """
+    for guid, resp in _do_update_share_many(guids, is_backfill=is_backfill):
+        if resp is None:
+            _requeue_update_share(guid, is_backfill)
+            continue
+        try:
+            resp.raise_for_status()
+        except Exception as e:
+            if resp.status_code >= 500:
+                _requeue_update_share(guid, is_backfill)
+            else:
+                log_exception(e)
+
+
+def _requeue_update_share(guid, is_backfill):
+    task__update_share.apply_async(
+        kwargs={'guid': guid, 'is_backfill': is_backfill},
+        queue=settings.CeleryConfig.task_low_queue,
+    )
+
+
+def pls_send_trove_indexcard(osf_item, *, is_backfill=False, metadata_record=None):
     try:
         _iri = osf_item.get_semantic_iri()
     except (AttributeError, ValueError):
         raise ValueError(f'could not get iri for {osf_item}')
-    _metadata_record = pls_gather_metadata_file(osf_item, 'turtle')
+    _metadata_record = metadata_record or pls_gather_metadata_file(osf_item, 'turtle')
     _queryparams = {
         'focus_iri': _iri,
         'record_identifier': _shtrove_record_identifier(osf_item),
@@ -144,6 +209,52 @@ def _do_update_share(osfguid: str, *, is_backfill=False):
     return _response
 
 
+def _do_update_share_many(osfguids: list, *, is_backfill=False):
+    '''yield (osfguid, response) for each of the given osfguids, with a response of None for
+    those that raised an error before getting a response
+    '''
+    logger.debug('%s._do_update_share_many(%d guids, is_backfill=%s)', __name__, len(osfguids), is_backfill)
+    _guid_instances = apps.get_model('osf.Guid').load_many(osfguids)
+    _to_send = []
+    for _osfguid in osfguids:
+        _guid_instance = _guid_instances.get(_osfguid.lower())
+        if _guid_instance is None:
+            logger.warning(f'skipping unknown osfguid "{_osfguid}"')
+            continue
+        _response = None
+        try:
+            _resource = _guid_instance.referent
+            if _resource is None:
+                raise ValueError(f'osfguid "{_osfguid}" has no referent')
+            if _should_delete_indexcard(_resource):
+                _response = pls_delete_trove_indexcard(_resource)
+            else:
+                _to_send.append((_osfguid, _resource))
+                continue
+        except Exception as e:
+            log_exception(e)
+        yield _osfguid, _response
+    try:
+        _metadata_records = pls_gather_many([_resource for _, _resource in _to_send], 'turtle')
+    except Exception as e:
+        # gathering is not isolated per item; leave the whole batch to be retried one at a time
+        log_exception(e)
+        for _osfguid, _ in _to_send:
+            yield _osfguid, None
+        return
+    for (_osfguid, _resource), _metadata_record in zip(_to_send, _metadata_records):
+        _response = None
+        try:
+            _response = pls_send_trove_indexcard(
+                _resource,
+                is_backfill=is_backfill,
+                metadata_record=_metadata_record,
+            )
+        except Exception as e:
+            log_exception(e)
+        yield _osfguid, _response
+
+
 def _shtrove_record_identifier(osf_item):
     return osf_item.guids.values_list('_id', flat=True).first()
 
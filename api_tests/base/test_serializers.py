@@ -1,4 +1,5 @@
 from rest_framework import status as http_status
+from unittest import mock
 import importlib
 import pkgutil
 
@@ -239,6 +240,44 @@ class TestNullLinks(ApiTestCase):
         assert 'null_link_field' not in rep['relationships']
 
 
+class TestFieldPlan(ApiTestCase):
+
+    def test_field_plan_is_reused_across_objects(self):
+        req = make_drf_request_with_version(version='2.0')
+        serializer = FakeSerializer(context={'request': req})
+        with mock.patch.object(FakeSerializer, '_build_field_plan', wraps=serializer._build_field_plan) as build:
+            first = serializer.to_representation(FakeModel())
+            second = serializer.to_representation(FakeModel())
+        assert build.call_count == 1
+        assert first == second
+        assert 'null_link_field' not in first['data']['relationships']
+
+    def test_field_plan_cache_can_be_disabled(self):
+        req = make_drf_request_with_version(version='2.0')
+        serializer = FakeSerializer(context={'request': req, 'cache_field_plan': False})
+        with mock.patch.object(FakeSerializer, '_build_field_plan', wraps=serializer._build_field_plan) as build:
+            first = serializer.to_representation(FakeModel())
+            second = serializer.to_representation(FakeModel())
+        assert build.call_count == 2
+        assert first == second
+
+    def test_field_plan_routes_fields(self):
+        req = make_drf_request_with_version(version='2.0')
+        plan = FakeSerializer(context={'request': req}).get_field_plan()
+        planned = {planned.field.field_name: planned for planned in plan.fields}
+        assert plan.type_ == 'foos'
+        assert planned['valued_link_field'].is_link
+        assert planned['valued_link_field'].is_relationship
+        assert not planned['valued_link_field'].is_embedded
+        assert not planned['links'].is_link
+
+    def test_field_plan_respects_sparse_fieldsets(self):
+        res = self.app.get(
+            '/{}nodes/{}/?fields[nodes]=title'.format(API_BASE, factories.ProjectFactory(is_public=True)._id),
+        )
+        assert set(res.json['data']['attributes'].keys()) == {'title'}
+
+
 class TestApiBaseSerializers(ApiTestCase):
 
     def setUp(self):
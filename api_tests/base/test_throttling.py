@@ -1,6 +1,10 @@
 from unittest import mock
 
+import pytest
+from django.core.cache import cache
+
 from api.base.settings.defaults import API_BASE
+from api.base import throttling
 
 from tests.base import ApiTestCase
 from osf_tests.factories import AuthUserFactory, ProjectFactory
@@ -139,3 +143,60 @@ class TestAddContributorEmailThrottle(ApiTestCase):
         assert mock_anon_allow.call_count == 2
         assert mock_user_allow.call_count == 1
         assert mock_contrib_allow.call_count == 1
+
+
+class TestCounterThrottleBackend:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+        yield
+        cache.clear()
+
+    @pytest.fixture()
+    def request_for(self):
+        def make(user_id=1):
+            return mock.Mock(user=mock.Mock(pk=user_id, is_authenticated=True), META={})
+        return make
+
+    def make_throttle(self, now):
+        throttle = throttling.TestUserRateThrottle()  # 2/hour
+        throttle.backend = 'counter'
+        throttle.timer = lambda: now
+        return throttle
+
+    def test_counter_throttles_at_rate(self, request_for):
+        now = 3600 * 1000
+        assert self.make_throttle(now).allow_request(request_for(), None)
+        assert self.make_throttle(now + 1).allow_request(request_for(), None)
+        throttle = self.make_throttle(now + 2)
+        assert not throttle.allow_request(request_for(), None)
+        assert throttle.wait() == 3600 - 2
+        # Other users are counted separately
+        assert self.make_throttle(now + 2).allow_request(request_for(user_id=2), None)
+
+    def test_rejected_requests_are_not_counted(self, request_for):
+        now = 3600 * 1000
+        for offset in range(5):
+            self.make_throttle(now + offset).allow_request(request_for(), None)
+        throttle = self.make_throttle(now + 5)
+        assert not throttle.allow_request(request_for(), None)
+        _, current_key = throttle.get_window_keys()
+        assert cache.get(current_key) == 2
+
+    def test_previous_window_is_weighted_by_overlap(self, request_for):
+        now = 3600 * 1000
+        self.make_throttle(now).allow_request(request_for(), None)
+        self.make_throttle(now).allow_request(request_for(), None)
+        # Early in the next window both earlier requests still fall within the last hour
+        throttle = self.make_throttle(now + 3600 + 60)
+        assert not throttle.allow_request(request_for(), None)
+        assert throttle.wait() == pytest.approx(1800 - 60)
+        # Halfway through, one of them has slid out
+        assert self.make_throttle(now + 3600 + 1800).allow_request(request_for(), None)
+
+    def test_history_backend_is_default(self, request_for):
+        throttle = throttling.TestUserRateThrottle()
+        assert throttle.get_backend() == 'history'
+        assert throttle.allow_request(request_for(), None)
+        assert len(throttle.history) == 1
@@ -5,7 +5,8 @@ from api.base.settings.defaults import API_BASE
 from framework.auth.core import Auth
 from osf_tests.factories import (
     ProjectFactory,
-    AuthUserFactory
+    AuthUserFactory,
+    InstitutionFactory,
 )
 from osf.utils.permissions import WRITE
 from rest_framework import exceptions
@@ -155,3 +156,52 @@ class TestNodeEmbeds:
         res = app.get(url, auth=write_contrib_one.auth)
         assert res.status_code == 200
         assert res.json['data']['embeds']['contributors']['meta']['total_bibliographic'] == 3
+
+
+@pytest.mark.django_db
+class TestNodeListEmbeds:
+
+    @pytest.fixture()
+    def institution(self):
+        return InstitutionFactory()
+
+    @pytest.fixture()
+    def nodes(self, user, institution):
+        nodes = []
+        for _ in range(4):
+            node = ProjectFactory(is_public=True, creator=user)
+            node.add_contributor(AuthUserFactory(), WRITE, auth=Auth(user), save=True)
+            node.affiliated_institutions.add(institution)
+            nodes.append(node)
+        return nodes
+
+    def test_list_embeds_match_detail_embeds(self, app, user, nodes, institution):
+        url = f'/{API_BASE}users/{user._id}/nodes/?embed=contributors&embed=affiliated_institutions'
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        assert len(res.json['data']) == len(nodes)
+        for data in res.json['data']:
+            detail = app.get(
+                f'/{API_BASE}nodes/{data["id"]}/?embed=contributors&embed=affiliated_institutions',
+                auth=user.auth,
+            ).json['data']
+            assert data['embeds']['contributors'] == detail['embeds']['contributors']
+            assert data['embeds']['affiliated_institutions'] == detail['embeds']['affiliated_institutions']
+            assert data['embeds']['contributors']['links']['meta']['total_bibliographic'] == 2
+            assert [inst['id'] for inst in data['embeds']['affiliated_institutions']['data']] == [institution._id]
+
+    def test_list_embeds_are_batched(self, app, user, nodes, django_assert_max_num_queries):
+        url = f'/{API_BASE}users/{user._id}/nodes/?embed=contributors&embed=affiliated_institutions'
+        with django_assert_max_num_queries(200) as captured:
+            res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        contributor_batches = [
+            query for query in captured.captured_queries
+            if '"osf_contributor"."node_id" IN' in query['sql']
+        ]
+        institution_batches = [
+            query for query in captured.captured_queries
+            if 'osf_institution' in query['sql'] and '"osf_abstractnode_affiliated_institutions"."abstractnode_id" IN' in query['sql']
+        ]
+        assert len(contributor_batches) == 1
+        assert len(institution_batches) == 1
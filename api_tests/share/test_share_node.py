@@ -20,8 +20,9 @@ from website import settings
 from website.project.tasks import on_node_updated
 
 from framework.auth.core import Auth
+from api.share import utils as share_utils
 from api.share.utils import shtrove_ingest_url, sharev2_push_url
-from ._utils import expect_ingest_request
+from ._utils import assert_ingest_request, expect_ingest_request
 
 
 @pytest.mark.django_db
@@ -208,3 +209,23 @@ class TestNodeShare:
         mock_share_responses.replace(responses.POST, sharev2_push_url(), status=400)
         with expect_ingest_request(mock_share_responses, node._id):
             on_node_updated(node._id, user._id, False, {'is_public'})
+
+    def test_update_share_many_retries_failed_items_alone(self, mock_share_responses, node):
+        other_node = ProjectFactory(is_public=True)
+        real_send = share_utils.pls_send_trove_indexcard
+
+        def send_or_raise(osf_item, **kwargs):
+            if osf_item == node:
+                raise ConnectionError('boom')
+            return real_send(osf_item, **kwargs)
+
+        mock_share_responses._calls.reset()
+        with patch('api.share.utils.pls_send_trove_indexcard', side_effect=send_or_raise):
+            with patch.object(share_utils.task__update_share, 'apply_async') as mock_retry:
+                share_utils.task__update_share_many([node._id, other_node._id])
+        [call] = mock_share_responses.calls
+        assert_ingest_request(call.request, other_node._id)
+        mock_retry.assert_called_once_with(
+            kwargs={'guid': node._id, 'is_backfill': False},
+            queue=settings.CeleryConfig.task_low_queue,
+        )
@@ -57,6 +57,10 @@ def override_settings():
     website_settings.SENDGRID_API_KEY = None
     # or try to contact a SHARE
     website_settings.SHARE_ENABLED = False
+    # or cache CAS responses that tests mock per test
+    website_settings.CAS_TOKEN_CACHE_ENABLED = False
+    # or serve metadata files built before a test changed their item
+    website_settings.METADATA_CACHE_ENABLED = False
     # Set this here instead of in SILENT_LOGGERS, in case developers
     # call setLevel in local.py
     logging.getLogger('website.mails.mails').setLevel(logging.CRITICAL)
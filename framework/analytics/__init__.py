@@ -13,6 +13,30 @@ def increment_user_activity_counters(user_id, action, date_string):
     return UserActivityCounter.increment(user_id, action, date_string)
 
 
+@run_postcommit(once_per_request=False, celery=False)
+def buffer_user_activity(user_id, action, date_string):
+    from osf.models import UserActivityCounter
+    return UserActivityCounter.buffer_increment(user_id, action, date_string)
+
+
+def record_user_activity(user_id, action, date_string):
+    """Count an action by a user, buffered if USER_ACTIVITY_BUFFER_ENABLED, else in a celery task"""
+    from api.base import settings
+    if settings.USER_ACTIVITY_BUFFER_ENABLED:
+        return buffer_user_activity(user_id, action, date_string)
+    return increment_user_activity_counters(user_id, action, date_string)
+
+
+@app.task(ignore_results=True)
+def flush_user_activity_counters():
+    """Apply buffered user activity increments, see UserActivityCounter.buffer_increment"""
+    from api.base import settings
+    from osf.models import UserActivityCounter
+    if not settings.USER_ACTIVITY_BUFFER_ENABLED:
+        return 0
+    return UserActivityCounter.flush_buffer()
+
+
 def get_total_activity_count(user_id):
     from osf.models import UserActivityCounter
     return UserActivityCounter.get_total_activity_count(user_id)
@@ -30,6 +54,16 @@ def update_counter(resource, file, version, action, node_info=None, session_key=
     return PageCounter.update_counter(resource, file, version=version, action=action, node_info=node_info, session_key=session_key)
 
 
+@app.task(ignore_results=True)
+def flush_page_counters():
+    """Apply buffered page counter increments, see PageCounter.buffer_counter"""
+    from api.base import settings
+    from osf.models import PageCounter
+    if not settings.PAGE_COUNTER_BUFFER_ENABLED:
+        return 0
+    return PageCounter.flush_buffer()
+
+
 def get_basic_counters(resource, file, version, action):
     from osf.models import PageCounter
     return PageCounter.get_basic_counters(resource, file, version=version, action=action)
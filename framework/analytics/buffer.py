@@ -0,0 +1,162 @@
+"""Write-behind buffering of analytics counters.
+
+Increments are accumulated in a django cache, bucketed by time window, and applied to the
+database in batches by a periodic task instead of locking and rewriting a row per event.
+
+Within a window each counted member (e.g. a page) is registered once in a numbered slot,
+so a flush can enumerate the members of a window with plain `get_many` calls; no backend
+specific commands are needed, and the locmem cache works in tests. Windows are only
+flushed once they are closed (with one window of grace for slow writers), and each flush
+runs under a cache lock so that concurrent flushes do not apply the same deltas twice.
+"""
+import hashlib
+import logging
+import time
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Keys left behind by a failed flush expire after this many seconds
+DEFAULT_TIMEOUT = 60 * 60 * 24
+# How many closed windows to look back on the first flush
+MAX_BACKLOG_WINDOWS = 60
+
+
+class CounterBuffer:
+
+    def __init__(self, name, cache_name, interval, timeout=DEFAULT_TIMEOUT, clock=None):
+        """
+        :param str name: Key prefix for this buffer
+        :param str cache_name: Alias of the django cache that holds the buffer
+        :param int interval: Length of a flush window, in seconds
+        :param int timeout: Expiry of buffered keys, in seconds
+        :param callable clock: Returns the current time in seconds, `time.time` by default
+        """
+        self.name = name
+        self.cache_name = cache_name
+        self.interval = interval
+        self.timeout = timeout
+        self.clock = clock
+
+    @property
+    def cache(self):
+        return caches[self.cache_name]
+
+    def current_window(self):
+        now = self.clock() if self.clock else time.time()
+        return int(now // self.interval)
+
+    def _key(self, window, *parts):
+        return ':'.join([self.name, str(window), *[str(part) for part in parts]])
+
+    def _incr(self, key, delta=1):
+        # `add` is a no-op if the key exists, which keeps `incr` atomic on shared backends
+        self.cache.add(key, 0, self.timeout)
+        return self.cache.incr(key, delta)
+
+    def incr(self, member, deltas, descriptor=None):
+        """Add `deltas` to the buffered counters of `member` in the current window.
+
+        :param str member: Identifier of the counted object
+        :param dict deltas: field name -> increment
+        :param descriptor: Picklable data needed to apply the deltas, stored once per window
+        """
+        window = self.current_window()
+        if self.cache.add(self._key(window, 'member', member), descriptor, self.timeout):
+            slot = self._incr(self._key(window, 'seq'))
+            self.cache.set(self._key(window, 'slot', slot), member, self.timeout)
+        for field, delta in deltas.items():
+            if delta:
+                self._incr(self._key(window, 'field', member, field), delta)
+
+    def first_visit(self, *parts, timeout=None):
+        """Record a visit and return whether it is the first one within `timeout`.
+
+        Visits are kept as one small, expiring key per visitor, keyed by a hash of `parts`.
+        """
+        digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+        return self.cache.add(f'{self.name}:visit:{digest}', 1, timeout or self.timeout)
+
+    def _unflushed_windows(self):
+        current = self.current_window()
+        flushed_through = self.cache.get(f'{self.name}:flushed_through')
+        if flushed_through is None:
+            flushed_through = current - MAX_BACKLOG_WINDOWS
+        return range(flushed_through + 1, current + 1)
+
+    def pending(self, member, fields):
+        """Return the buffered (not yet flushed) totals of `member`, as a dict field -> value."""
+        keys = {
+            self._key(window, 'field', member, field): field
+            for window in self._unflushed_windows()
+            for field in fields
+        }
+        totals = dict.fromkeys(fields, 0)
+        for key, value in self.cache.get_many(list(keys)).items():
+            totals[keys[key]] += value
+        return totals
+
+    def pending_count(self):
+        """Return the number of members buffered in unflushed windows, counting a member once per window."""
+        keys = [self._key(window, 'seq') for window in self._unflushed_windows()]
+        return sum(self.cache.get_many(keys).values())
+
+    def read_window(self, window, fields):
+        """Return {member: (descriptor, {field: delta})} for everything buffered in `window`."""
+        count = self.cache.get(self._key(window, 'seq')) or 0
+        if not count:
+            return {}
+        slot_keys = [self._key(window, 'slot', slot) for slot in range(1, count + 1)]
+        members = list(self.cache.get_many(slot_keys).values())
+        descriptors = self.cache.get_many([self._key(window, 'member', member) for member in members])
+        field_keys = {
+            self._key(window, 'field', member, field): (member, field)
+            for member in members
+            for field in fields
+        }
+        values = self.cache.get_many(list(field_keys))
+        ret = {}
+        for member in members:
+            ret[member] = (descriptors.get(self._key(window, 'member', member)), dict.fromkeys(fields, 0))
+        for key, value in values.items():
+            member, field = field_keys[key]
+            ret[member][1][field] = value
+        return ret
+
+    def _delete_window(self, window, members, fields):
+        count = self.cache.get(self._key(window, 'seq')) or 0
+        keys = [self._key(window, 'seq')]
+        keys.extend(self._key(window, 'slot', slot) for slot in range(1, count + 1))
+        keys.extend(self._key(window, 'member', member) for member in members)
+        keys.extend(self._key(window, 'field', member, field) for member in members for field in fields)
+        self.cache.delete_many(keys)
+
+    def flush(self, fields, apply):
+        """Hand each closed, unflushed window to `apply`, oldest first.
+
+        :param list fields: Field names used by this buffer
+        :param callable apply: Called with {member: (descriptor, {field: delta})}; must apply all
+            of the deltas or raise, in which case the window is retried on the next flush
+        :return int: Number of members applied
+        """
+        lock_key = f'{self.name}:flush_lock'
+        if not self.cache.add(lock_key, 1, self.interval * 10):
+            logger.info(f'Flush of {self.name} already in progress, skipping')
+            return 0
+        applied = 0
+        try:
+            # Leave the previous window open for writers that computed it just before it closed
+            last_closed = self.current_window() - 2
+            for window in self._unflushed_windows():
+                if window > last_closed:
+                    break
+                deltas = self.read_window(window, fields)
+                if deltas:
+                    apply(deltas)
+                    applied += len(deltas)
+                self.cache.set(f'{self.name}:flushed_through', window, None)
+                self._delete_window(window, deltas.keys(), fields)
+        finally:
+            self.cache.delete(lock_key)
+        return applied
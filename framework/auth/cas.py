@@ -1,13 +1,17 @@
 from furl import furl
 from urllib.parse import unquote_plus
 
+from django.core.cache import caches
 from django.utils import timezone
 from rest_framework import status as http_status
+import hashlib
 import json
+import logging
 from urllib.parse import quote
 
 from lxml import etree
 import requests
+from requests.adapters import HTTPAdapter
 
 from framework.auth import authenticate, external_first_login_authenticate
 from framework.auth.core import get_user, generate_verification_key
@@ -17,6 +21,24 @@ from framework.flask import redirect
 from framework.exceptions import HTTPError
 from website import settings
 
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_GENERATION_KEY = 'cas:token:generation'
+
+_session = None
+
+
+def get_session():
+    """Return a requests session that keeps connections to CAS open across requests."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.CAS_CONNECTION_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session = session
+    return _session
+
 
 class CasError(HTTPError):
     """General CAS-related error."""
@@ -49,11 +71,13 @@ class CasTokenError(CasError):
 class CasResponse:
     """A wrapper for an HTTP response returned from CAS."""
 
-    def __init__(self, authenticated=False, status=None, user=None, attributes=None):
+    def __init__(self, authenticated=False, status=None, user=None, attributes=None, expires_in=None):
         self.authenticated = authenticated
         self.status = status
         self.user = user
         self.attributes = attributes or {}
+        # Seconds until the access token expires, if CAS reports it
+        self.expires_in = expires_in
 
 
 class CasClient:
@@ -113,7 +137,7 @@ class CasClient:
         url.args['service'] = service_url
 
         print_cas_log(f'Validating service ticket ["{ticket}"]', LogLevel.INFO)
-        resp = requests.get(url.url)
+        resp = get_session().get(url.url)
         if resp.status_code == 200:
             print_cas_log(
                 f'Service ticket validation response: ticket=[{ticket}], status=[{resp.status_code}]',
@@ -140,12 +164,58 @@ class CasClient:
         headers = {
             'Authorization': f'Bearer {access_token}',
         }
-        resp = requests.get(url, headers=headers)
+        resp = get_session().get(url, headers=headers)
         if resp.status_code == 200:
             return self._parse_profile(resp.content, access_token)
         else:
             self._handle_error(resp)
 
+    def cached_profile(self, access_token):
+        """
+        Same as `profile`, cached by a hash of the access token if `CAS_TOKEN_CACHE_ENABLED`.
+        Valid tokens are cached until they expire or for `CAS_TOKEN_CACHE_TIMEOUT`, whichever is
+        sooner; tokens rejected by CAS are remembered for `CAS_TOKEN_NEGATIVE_CACHE_TIMEOUT`.
+
+        :param str access_token: CAS access_token.
+        :rtype: CasResponse
+        :raises: CasError if an unexpected response is returned.
+        """
+        if not settings.CAS_TOKEN_CACHE_ENABLED:
+            return self.profile(access_token)
+
+        key = get_token_cache_key(access_token)
+        cached = _token_cache_call('get', key)
+        if isinstance(cached, CasResponse):
+            cached.attributes['accessToken'] = access_token
+            return cached
+        if cached is not None:
+            code, message, content = cached
+            raise CasHTTPError(code=code, message=message, headers={}, content=content)
+
+        try:
+            resp = self.profile(access_token)
+        except CasHTTPError as err:
+            # Only client errors mean the token is invalid; do not cache an unavailable CAS server
+            if 400 <= err.code < 500:
+                cached = (err.code, err.args[0] if err.args else None, err.content)
+                _token_cache_call('set', key, cached, settings.CAS_TOKEN_NEGATIVE_CACHE_TIMEOUT)
+            raise
+
+        timeout = settings.CAS_TOKEN_CACHE_TIMEOUT
+        if resp.expires_in is not None:
+            timeout = min(timeout, resp.expires_in)
+        if timeout > 0:
+            # Never store the raw token, only what CAS said about it
+            cached = CasResponse(
+                authenticated=resp.authenticated,
+                status=resp.status,
+                user=resp.user,
+                attributes={name: value for name, value in resp.attributes.items() if name != 'accessToken'},
+                expires_in=resp.expires_in,
+            )
+            _token_cache_call('set', key, cached, timeout)
+        return resp
+
     def _handle_error(self, response, message='Unexpected response from CAS server'):
         """Handle an error response from CAS."""
         raise CasHTTPError(
@@ -183,6 +253,8 @@ class CasClient:
             resp.attributes.update(data['attributes'])
         resp.attributes['accessToken'] = access_token
         resp.attributes['accessTokenScope'] = set(data.get('scope', []))
+        if data.get('expires_in') is not None:
+            resp.expires_in = int(data['expires_in'])
         return resp
 
     def revoke_application_tokens(self, client_id, client_secret):
@@ -193,7 +265,13 @@ class CasClient:
         """Revoke a tokens based on payload"""
         url = self.get_auth_token_revocation_url()
 
-        resp = requests.post(url, data=payload)
+        if 'token' in payload:
+            invalidate_token_cache(payload['token'])
+        else:
+            # Tokens are cached by hash alone, so revoking an application's tokens drops them all
+            invalidate_token_cache()
+
+        resp = get_session().post(url, data=payload)
         if resp.status_code == 204:
             return True
         else:
@@ -223,6 +301,32 @@ def get_client():
     return CasClient(settings.CAS_SERVER_URL)
 
 
+def _token_cache_call(method, *args):
+    # The cache only saves round trips to CAS; authenticate without it if it is unavailable
+    try:
+        return getattr(caches[settings.CAS_TOKEN_CACHE_NAME], method)(*args)
+    except Exception as err:
+        logger.warning(f'CAS token cache {method} failed: {err}')
+        return None
+
+
+def get_token_cache_key(access_token):
+    generation = _token_cache_call('get', TOKEN_CACHE_GENERATION_KEY) or 0
+    return 'cas:token:{}:{}'.format(generation, hashlib.sha256(access_token.encode()).hexdigest())
+
+
+def invalidate_token_cache(access_token=None):
+    """Drop the cached CAS response for `access_token`, or for every token if none is given."""
+    if not settings.CAS_TOKEN_CACHE_ENABLED:
+        return
+    if access_token is not None:
+        _token_cache_call('delete', get_token_cache_key(access_token))
+        return
+    # Cached keys embed the generation, so bumping it orphans all of them until they expire
+    _token_cache_call('add', TOKEN_CACHE_GENERATION_KEY, 0, None)
+    _token_cache_call('incr', TOKEN_CACHE_GENERATION_KEY)
+
+
 def get_login_url(*args, **kwargs):
     """
     Convenience function for getting a login URL for a service.
@@ -2,11 +2,13 @@ import functools
 import hashlib
 import logging
 import threading
+import time
 
 import binascii
 from collections import OrderedDict
 import os
 
+import gevent
 from celery.canvas import Signature
 from celery.local import PromiseProxy
 from gevent.pool import Pool
@@ -17,6 +19,84 @@ from website import settings
 _local = threading.local()
 logger = logging.getLogger(__name__)
 
+
+class PostcommitMetrics:
+    """Process-wide counters for postcommit work: per-task latency, queue depth and timeouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.tasks = {}
+            self.requests = 0
+            self.timeouts = 0
+            self.max_queue_depth = 0
+            self.celery_published = 0
+
+    def record_task(self, name, seconds, failed=False):
+        with self._lock:
+            stats = self.tasks.setdefault(name, {'count': 0, 'failed': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['failed'] += int(failed)
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def record_request(self, queue_depth, celery_published, timed_out):
+        with self._lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self.celery_published += celery_published
+            self.timeouts += int(timed_out)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'timeouts': self.timeouts,
+                'max_queue_depth': self.max_queue_depth,
+                'celery_published': self.celery_published,
+                'tasks': {name: dict(stats) for name, stats in self.tasks.items()},
+            }
+
+
+postcommit_metrics = PostcommitMetrics()
+
+def get_postcommit_pool():
+    """Return the postcommit pool of the current gevent hub, shared by every request of a gevent
+    worker and one per thread otherwise. It lives on the hub, so it goes away with it.
+    """
+    hub = gevent.get_hub()
+    pool = getattr(hub, 'postcommit_pool', None)
+    if pool is None:
+        pool = hub.postcommit_pool = Pool(settings.POSTCOMMIT_POOL_SIZE)
+    return pool
+
+
+def _task_name(func):
+    func = getattr(func, 'func', func)  # functools.partial
+    return f'{getattr(func, "__module__", None)}.{getattr(func, "__name__", repr(func))}'
+
+
+def _run_timed(func):
+    start = time.monotonic()
+    failed = True
+    try:
+        result = func()
+        failed = False
+        return result
+    finally:
+        postcommit_metrics.record_task(_task_name(func), time.monotonic() - start, failed=failed)
+
+
+def publish_celery_tasks(signatures):
+    """Publish celery signatures over a single broker connection."""
+    from framework.celery_tasks import app
+    with app.producer_or_acquire() as producer:
+        for signature in signatures:
+            signature.apply_async(producer=producer)
+
 def postcommit_queue():
     if not hasattr(_local, 'postcommit_queue'):
         _local.postcommit_queue = OrderedDict()
@@ -36,19 +116,35 @@ def postcommit_after_request(response, base_status_error_code=500):
         _local.postcommit_queue = OrderedDict()
         _local.postcommit_celery_queue = OrderedDict()
         return response
+    queue_depth = 0
+    celery_published = 0
+    timed_out = False
     try:
         if postcommit_queue():
-            number_of_threads = 30  # one db connection per greenlet, let's share
-            pool = Pool(number_of_threads)
+            queue_depth += len(postcommit_queue())
+            # The pool is bounded (one db connection per greenlet) and reused across requests
+            pool = get_postcommit_pool()
+            greenlets = []
+            overflow = 0
             for func in postcommit_queue().values():
-                pool.spawn(func)
-            pool.join(timeout=5.0, raise_error=True)  # 5 second timeout and reraise exceptions
+                if pool.free_count():
+                    greenlets.append(pool.spawn(_run_timed, func))
+                else:
+                    # Pool.spawn blocks until a slot frees up; don't hold the response for other requests' tasks
+                    greenlets.append(gevent.spawn(_run_timed, func))
+                    overflow += 1
+            if overflow:
+                logger.warning(f'Postcommit pool is full; ran {overflow} postcommit tasks outside of it')
+            done = gevent.joinall(greenlets, timeout=settings.POSTCOMMIT_TIMEOUT, raise_error=True)
+            if len(done) < len(greenlets):
+                timed_out = True
+                logger.warning(f'{len(greenlets) - len(done)} postcommit tasks did not finish within {settings.POSTCOMMIT_TIMEOUT} seconds')
 
         if postcommit_celery_queue():
+            queue_depth += len(postcommit_celery_queue())
             if settings.USE_CELERY:
-                for task_dict in postcommit_celery_queue().values():
-                    task = Signature.from_dict(task_dict)
-                    task.apply_async()
+                publish_celery_tasks([Signature.from_dict(task_dict) for task_dict in postcommit_celery_queue().values()])
+                celery_published = len(postcommit_celery_queue())
             else:
                 for task in postcommit_celery_queue().values():
                     task()
@@ -56,6 +152,9 @@ def postcommit_after_request(response, base_status_error_code=500):
     except AttributeError as ex:
         if not settings.DEBUG_MODE:
             logger.error(f'Post commit task queue not initialized: {ex}')
+    finally:
+        if queue_depth:
+            postcommit_metrics.record_request(queue_depth, celery_published, timed_out)
     return response
 
 def get_task_from_postcommit_queue(name, predicate, celery=True):
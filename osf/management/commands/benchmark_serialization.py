@@ -0,0 +1,69 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.base.settings.defaults import API_BASE
+from osf.models import AbstractNode, OSFUser
+
+logger = logging.getLogger(__name__)
+
+
+def load_list_view(user, url):
+    """Set up the list view of `url` for a request by `user`; return (view, first page of objects)."""
+    request = APIRequestFactory().get(url)
+    force_authenticate(request, user=user)
+    match = resolve(url)
+    view = match.func.cls(**match.func.initkwargs)
+    view.args, view.kwargs = match.args, match.kwargs
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+    view.initial(view.request)
+    page = list(view.paginate_queryset(view.filter_queryset(view.get_queryset())))
+    return view, page
+
+
+def time_serialization(view, page, rounds, cache_field_plan):
+    """Serialize `page` with the view's serializer `rounds` times; return seconds per object."""
+    context = {**view.get_serializer_context(), 'cache_field_plan': cache_field_plan}
+    elapsed = 0
+    for _ in range(rounds):
+        serializer = view.get_serializer(page, many=True, context=context)
+        start = time.perf_counter()
+        serializer.data
+        elapsed += time.perf_counter() - start
+    return elapsed / (rounds * len(page)) if page else 0
+
+
+class Command(BaseCommand):
+    """Measure per-object serialization cost of node and file list responses,
+    with and without cached serializer field plans.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('user', type=str, help='Guid of the user making the requests')
+        parser.add_argument('node', type=str, help='Guid of a node whose osfstorage root folder has files')
+        parser.add_argument('--rounds', type=int, default=10, help='Serializations per measurement')
+        parser.add_argument('--page-size', type=int, default=100, help='Objects per page')
+
+    def handle(self, *args, **options):
+        user = OSFUser.load(options['user'])
+        node = AbstractNode.load(options['node'])
+        page_size = options['page_size']
+        urls = {
+            'nodes': f'/{API_BASE}users/{user._id}/nodes/?page[size]={page_size}',
+            'files': f'/{API_BASE}nodes/{node._id}/files/osfstorage/?page[size]={page_size}',
+        }
+        for name, url in urls.items():
+            view, page = load_list_view(user, url)
+            # Warm up caches (content types, waffle flags, ...) before measuring
+            time_serialization(view, page, 1, cache_field_plan=True)
+            before = time_serialization(view, page, options['rounds'], cache_field_plan=False)
+            after = time_serialization(view, page, options['rounds'], cache_field_plan=True)
+            logger.info(
+                f'{name}: {len(page)} objects, {before * 1000:.3f} ms/object before, {after * 1000:.3f} ms/object after '
+                f'({(1 - after / before) * 100 if before else 0:.1f}% faster)'
+            )
@@ -0,0 +1,72 @@
+import logging
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from api.base.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATES = ['10/minute', '100/minute', '1000/minute', '10000/minute']
+
+
+def make_throttle(backend, rate, cache):
+    """Build a throttle with `rate` that counts every request against one client."""
+    throttle_class = type('BenchmarkThrottle', (BaseThrottle,), {
+        'rate': rate,
+        'backend': backend,
+        'cache': cache,
+        'get_cache_key': lambda self, request, view: f'benchmark_throttle_{backend}_{rate}',
+    })
+    return throttle_class()
+
+
+def time_throttle(backend, rate, cache, requests):
+    """Return the mean seconds per allow_request once the client is at its rate limit.
+
+    Requests arrive at exactly the configured rate, so the history backend keeps a full
+    history of `num_requests` timestamps and the counter backend keeps full windows.
+    """
+    throttle = make_throttle(backend, rate, cache)
+    request = mock.Mock(META={})
+    interval = throttle.duration / throttle.num_requests
+    clock = [time.time()]
+    throttle.timer = lambda: clock[0]
+
+    def tick():
+        clock[0] += interval
+        throttle.allow_request(request, None)
+
+    # Fill the history (or the windows) before timing
+    for _ in range(throttle.num_requests):
+        tick()
+    start = time.perf_counter()
+    for _ in range(requests):
+        tick()
+    elapsed = time.perf_counter() - start
+    cache.delete_many([throttle.key, *throttle.get_window_keys()])
+    return elapsed / requests
+
+
+class Command(BaseCommand):
+    """Compare the per-request cost of the history and counter throttle backends at several rates.
+    The history backend grows with the rate; the counter backend should stay constant.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--requests', type=int, default=1000, help='Number of timed requests per rate')
+        parser.add_argument('--cache', type=str, default='default', help='Cache alias to throttle against')
+        parser.add_argument('--rate', action='append', dest='rates', help='Throttle rate, may be repeated')
+
+    def handle(self, *args, **options):
+        cache = caches[options['cache']]
+        for rate in options['rates'] or DEFAULT_RATES:
+            history = time_throttle('history', rate, cache, options['requests'])
+            counter = time_throttle('counter', rate, cache, options['requests'])
+            logger.info(
+                f'{rate}: {history * 1e6:.0f}us/request with history, '
+                f'{counter * 1e6:.0f}us/request with counter ({history / counter:.1f}x)'
+            )
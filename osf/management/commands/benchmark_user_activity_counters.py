@@ -0,0 +1,85 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from framework.analytics.buffer import CounterBuffer
+from osf.models import UserActivityCounter
+from osf.models import analytics as analytics_models
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ['project_created', 'file_added', 'wiki_updated', 'comment_added']
+
+
+class Rollback(Exception):
+    pass
+
+
+def make_events(events, users):
+    date_string = timezone.now().isoformat()
+    # UserActivityCounter._id holds at most five characters
+    user_ids = [f'b{i:04x}' for i in range(users)]
+    return [
+        (user_ids[i % users], ACTIONS[i % len(ACTIONS)], date_string)
+        for i in range(events)
+    ]
+
+
+def time_rolled_back(func):
+    """Run `func` in a transaction that is rolled back; return the elapsed seconds."""
+    start = time.perf_counter()
+    try:
+        with transaction.atomic():
+            func()
+            elapsed = time.perf_counter() - start
+            raise Rollback
+    except Rollback:
+        pass
+    return elapsed
+
+
+class Command(BaseCommand):
+    """Compare the throughput of per-event UserActivityCounter increments against
+    buffered increments applied with a single flush. Nothing is written to the database.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--events', type=int, default=1000, help='Number of activity events')
+        parser.add_argument('--users', type=int, default=10, help='Number of distinct users')
+        parser.add_argument('--cache', type=str, default='default', help='Cache alias to buffer into')
+
+    def handle(self, *args, **options):
+        events = make_events(options['events'], options['users'])
+
+        def increment_each():
+            for user_id, action, date_string in events:
+                UserActivityCounter.increment(user_id, action, date_string)
+
+        now = [time.time()]
+        buffer = CounterBuffer(
+            'useractivity_benchmark',
+            options['cache'],
+            analytics_models.user_activity_buffer.interval,
+            clock=lambda: now[0],
+        )
+
+        def buffer_and_flush():
+            for user_id, action, date_string in events:
+                UserActivityCounter.buffer_increment(user_id, action, date_string, buffer=buffer)
+            # Close the buffered window so that the flush applies it
+            now[0] += buffer.interval * 3
+            UserActivityCounter.flush_buffer(buffer=buffer)
+
+        before = time_rolled_back(increment_each)
+        after = time_rolled_back(buffer_and_flush)
+
+        count = len(events)
+        logger.info(
+            f'{count} events for {options["users"]} users: '
+            f'{count / before:.0f} events/s incremented per event, '
+            f'{count / after:.0f} events/s buffered and flushed ({before / after:.1f}x)'
+        )
@@ -14,19 +14,24 @@ logger = logging.getLogger(__name__)
 
 
 @celery_app.task(name='management.commands.daily_reporters_go')
-def daily_reporters_go(also_send_to_keen=False, report_date=None, reporter_filter=None):
+def daily_reporters_go(also_send_to_keen=False, report_date=None, reporter_filter=None, end_date=None):
     init_app()  # OSF-specific setup
 
     if report_date is None:  # default to yesterday
         report_date = (timezone.now() - datetime.timedelta(days=1)).date()
+    # backfill every date from report_date to end_date, inclusive
+    report_dates = [
+        report_date + datetime.timedelta(days=days)
+        for days in range(((end_date or report_date) - report_date).days + 1)
+    ]
 
     errors = {}
     for reporter_class in DAILY_REPORTERS:
         if reporter_filter and (reporter_filter.lower() not in reporter_class.__name__.lower()):
             continue
         try:
-            reporter_class().run_and_record_for_date(
-                report_date=report_date,
+            reporter_class().run_and_record_for_dates(
+                report_dates=report_dates,
                 also_send_to_keen=also_send_to_keen,
             )
         except Exception as e:
@@ -54,6 +59,11 @@ class Command(BaseCommand):
             type=date_fromisoformat,  # in python 3.7+, could pass datetime.date.fromisoformat
             help='run for a specific date (default: yesterday)',
         )
+        parser.add_argument(
+            '--end-date',
+            type=date_fromisoformat,
+            help='also run for every date after --date up to this one',
+        )
         parser.add_argument(
             '--filter',
             type=str,
@@ -62,6 +72,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         errors = daily_reporters_go(
             report_date=options.get('date'),
+            end_date=options.get('end_date'),
             also_send_to_keen=options['keen'],
             reporter_filter=options.get('filter'),
         )
@@ -0,0 +1,52 @@
+# This is a management command, rather than a migration, because it only changes database content
+# and can be resumed: OsfStorage files and folders compute their materialized path until it is stored.
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from addons.osfstorage.models import OsfStorageFolder
+
+logger = logging.getLogger(__name__)
+
+
+def populate_materialized_paths(batch_size, dry_run=False):
+    roots = OsfStorageFolder.objects.filter(is_root=True).order_by('id')
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(roots.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            updated = sum(root.store_materialized_paths() for root in batch)
+            if dry_run:
+                transaction.set_rollback(True)
+        last_id = batch[-1].id
+        total += updated
+        logger.info(f'Stored {updated} materialized paths under root folders up to id {last_id}')
+    logger.info(f'{"[DRY RUN] " if dry_run else ""}Stored {total} materialized paths')
+    return total
+
+
+class Command(BaseCommand):
+    """
+    Store `_materialized_path` for OsfStorage files and folders saved before paths were stored.
+    """
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Run the backfill and roll back changes to db',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of root folders per transaction',
+        )
+
+    def handle(self, *args, **options):
+        populate_materialized_paths(options['batch_size'], dry_run=options['dry_run'])
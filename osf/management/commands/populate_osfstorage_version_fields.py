@@ -0,0 +1,53 @@
+# This is a management command, rather than a migration, because it only changes database content
+# and can be resumed: listings fall back to the versions of files whose fields are not populated.
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from addons.osfstorage.models import OsfStorageFile
+
+logger = logging.getLogger(__name__)
+
+
+def populate_version_fields(batch_size, dry_run=False):
+    files = OsfStorageFile.objects.filter(version_count__isnull=True).order_by('id')
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(files.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            updated = len(OsfStorageFile.update_version_fields(batch))
+            if dry_run:
+                transaction.set_rollback(True)
+        last_id = batch[-1]
+        total += updated
+        logger.info(f'Populated the version fields of {updated} files up to id {last_id}')
+    logger.info(f'{"[DRY RUN] " if dry_run else ""}Populated the version fields of {total} files')
+    return total
+
+
+class Command(BaseCommand):
+    """
+    Store `latest_version`, `version_count` and `earliest_version_created` for OsfStorage files
+    versioned before these fields were maintained.
+    """
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Run the backfill and roll back changes to db',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of files per transaction',
+        )
+
+    def handle(self, *args, **options):
+        populate_version_fields(options['batch_size'], dry_run=options['dry_run'])
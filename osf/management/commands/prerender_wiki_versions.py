@@ -0,0 +1,59 @@
+# This is a management command, rather than a migration, because it only changes database content
+# and can be resumed: versions that are not rendered yet are rendered when first viewed.
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from addons.wiki.models import WikiVersion, get_render_key
+
+logger = logging.getLogger(__name__)
+
+
+def prerender_wiki_versions(batch_size, dry_run=False):
+    versions = WikiVersion.objects.filter(
+        wiki_page__node__isnull=False,
+    ).select_related('wiki_page__node').prefetch_related('wiki_page__node__guids').order_by('id')
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(versions.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        # Versions rendered with the current sanitizer settings are up to date
+        stale = [version for version in batch if version.render_key != get_render_key(version.wiki_page.node)]
+        for version in stale:
+            version.render(version.wiki_page.node)
+        with transaction.atomic():
+            WikiVersion.objects.bulk_update(stale, WikiVersion.RENDER_FIELDS)
+            if dry_run:
+                transaction.set_rollback(True)
+        total += len(stale)
+        logger.info(f'Rendered {len(stale)} wiki versions up to id {last_id}')
+    logger.info(f'{"[DRY RUN] " if dry_run else ""}Rendered {total} wiki versions')
+    return total
+
+
+class Command(BaseCommand):
+    """
+    Store the rendered HTML and raw text of wiki versions saved before they were rendered on save,
+    or rendered with other sanitizer settings.
+    """
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Run the backfill and roll back changes to db',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of wiki versions per transaction',
+        )
+
+    def handle(self, *args, **options):
+        prerender_wiki_versions(options['batch_size'], dry_run=options['dry_run'])
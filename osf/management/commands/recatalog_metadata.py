@@ -5,7 +5,7 @@ import logging
 from django.core.management.base import BaseCommand
 from addons.osfstorage.models import OsfStorageFile
 from osf.models import AbstractProvider, Registration, Preprint, Node, OSFUser
-from api.share.utils import task__update_share
+from api.share.utils import task__update_share_many
 from website.settings import CeleryConfig
 
 
@@ -34,15 +34,19 @@ def recatalog_chunk(queryset, start_id, chunk_size):
         first_id = item_chunk[0].id
         last_id = item_chunk[-1].id
 
+        guids = []
         for item in item_chunk:
             guid = item.guids.values_list('_id', flat=True).first()
             if guid:
-                task__update_share.apply_async(
-                    kwargs={'guid': guid, 'is_backfill': True},
-                    queue=CeleryConfig.task_low_queue,  # "low priority" queue
-                )
+                guids.append(guid)
             else:
                 logger.debug('skipping item without guid: %s', item)
+        if guids:
+            # one task per chunk, so the chunk's metadata is gathered together
+            task__update_share_many.apply_async(
+                kwargs={'guids': guids, 'is_backfill': True},
+                queue=CeleryConfig.task_low_queue,  # "low priority" queue
+            )
 
         logger.info(f'Queued metadata recataloguing for {len(item_chunk)} {queryset.model.__name__}ses (ids in range [{first_id},{last_id}])')
     else:
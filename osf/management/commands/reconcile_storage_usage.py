@@ -0,0 +1,60 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from api.caching.tasks import update_storage_usage_cache_many
+from framework.celery_tasks import app as celery_app
+from osf.models import AbstractNode, NodeStorageUsage
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='management.commands.reconcile_storage_usage')
+def reconcile_storage_usage(dry_run=False, batch_size=500):
+    """Recount the storage usage of every node with a usage counter and repair the counters that drifted.
+
+    Counters are walked in batches ordered by node id, so memory use does not grow with the number
+    of nodes, and each batch is recounted with one aggregate query.
+    """
+    counted_node_ids = NodeStorageUsage.objects.order_by('node_id').values_list('node_id', flat=True)
+    last_id = 0
+    checked = 0
+    drift_count = 0
+    while True:
+        node_ids = list(counted_node_ids.filter(node_id__gt=last_id)[:batch_size])
+        if not node_ids:
+            break
+        last_id = node_ids[-1]
+        nodes = AbstractNode.objects.filter(id__in=node_ids).only('id', 'type').prefetch_related('guids')
+        _, drifted = update_storage_usage_cache_many(list(nodes), dry_run=dry_run)
+        for node_id, (stored, total) in drifted.items():
+            logger.warning(f'Storage usage of node {node_id} drifted: stored {stored}, counted {total}')
+        checked += len(node_ids)
+        drift_count += len(drifted)
+
+    logger.info(
+        f'{"[DRY RUN] " if dry_run else ""}Checked {checked} storage usage counters, '
+        f'{drift_count} {"drifted" if dry_run else "repaired"}'
+    )
+    return drift_count
+
+
+class Command(BaseCommand):
+    help = '''Verifies stored node storage usage against file versions and repairs drift'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Only report drifted counters',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of nodes recounted per query',
+        )
+
+    def handle(self, *args, **options):
+        reconcile_storage_usage(dry_run=options['dry_run'], batch_size=options['batch_size'])
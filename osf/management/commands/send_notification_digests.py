@@ -0,0 +1,36 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from website.notifications import constants
+from website.notifications.tasks import _send_global_and_node_emails, _send_reviews_moderator_emails
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Send pending notification digests, as the send_users_email task does, and report throughput.
+    With --dry, emails are rendered but neither sent nor removed.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--send-type', choices=list(constants.NOTIFICATION_TYPES), default='email_digest')
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Render the emails without sending them or removing the digests',
+        )
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of digests per batch')
+        parser.add_argument('--workers', type=int, default=None, help='Number of threads sending emails')
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'dry_run': options['dry_run'],
+            'batch_size': options['batch_size'],
+            'workers': options['workers'],
+        }
+        for name, send in [('node', _send_global_and_node_emails), ('moderator', _send_reviews_moderator_emails)]:
+            stats = send(options['send_type'], **kwargs)
+            logger.info(f'{"[DRY RUN] " if options["dry_run"] else ""}{name} digests: {stats.summary()}')
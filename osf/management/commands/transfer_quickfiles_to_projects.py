@@ -14,7 +14,7 @@ from osf.models import (
     AbstractNode,
     Guid,
 )
-from osf.models.base import generate_guid
+from osf.models.base import generate_guids
 from osf.models.quickfiles import get_quickfiles_project_title
 from osf.models.queued_mail import QueuedMail
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
@@ -47,11 +47,8 @@ def remove_quickfiles():
     ).delete()
     logger.info(f'Deleted guids: {_}')
 
-    # generate unique guids prior to record creation to avoid collisions, set object ensures all guids are unique
-    guids = set()
-    while len(guids) < target_count:
-        guids.add(generate_guid())
-    guids = list(guids)
+    # generate unique guids prior to record creation to avoid collisions
+    guids = generate_guids(target_count)
     logger.info(f'Generated {len(guids)} Guids')
 
     guids = [
@@ -1,6 +1,6 @@
-from .basket import Basket
+from .basket import Basket, pls_gather_many
 from .focus import Focus
-from .gatherer import gatherer as er
+from .gatherer import gatherer as er, batch_gatherer as er_many
 
 
-__all__ = ('Basket', 'Focus', 'er')
+__all__ = ('Basket', 'Focus', 'er', 'er_many', 'pls_gather_many')
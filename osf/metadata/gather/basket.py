@@ -7,7 +7,7 @@ import rdflib
 
 from osf.metadata import rdfutils
 from .focus import Focus
-from .gatherer import get_gatherers, Gatherer
+from .gatherer import get_batch_gatherer, get_gatherers, Gatherer
 
 
 class Basket:
@@ -15,6 +15,7 @@ class Basket:
     gathered_metadata: rdflib.Graph  # heap of metadata already gathered.
     _gathertasks_done: set           # memory of gatherings already done.
     _known_focus_dict: dict
+    _prefetched: dict                # triples from batch gatherers, by (gatherer, focus)
 
     def __init__(self, focus: Focus):
         assert isinstance(focus, Focus)
@@ -24,6 +25,7 @@ class Basket:
     def reset(self):
         self._gathertasks_done = set()
         self._known_focus_dict = {}
+        self._prefetched = {}
         self.gathered_metadata = rdfutils.contextualized_graph()
         self._add_focus_reference(self.focus)
 
@@ -99,33 +101,51 @@ class Basket:
             raise ValueError(f'expected `iri_or_focus` to be Focus or URIRef (got {iri_or_focus})')
 
     def _do_gather(self, focus, predicate_map):
-        if not isinstance(predicate_map, dict):
-            # allow iterable of predicates with no deeper paths
-            predicate_map = {
-                predicate_iri: None
-                for predicate_iri in predicate_map
-            }
+        predicate_map = _as_predicate_map(predicate_map)
         for gatherer in get_gatherers(focus.rdftype, predicate_map.keys()):
-            for (subj, pred, obj) in self._do_a_gathertask(gatherer, focus):
-                if isinstance(obj, Focus):
-                    self._add_focus_reference(obj)
-                    self.gathered_metadata.add((subj, pred, obj.iri))
-                    if subj == focus.iri:
-                        next_steps = predicate_map.get(pred, None)
-                        if next_steps:
-                            self._do_gather(
-                                focus=obj,
-                                predicate_map=next_steps,
-                            )
-                else:
-                    self.gathered_metadata.add((subj, pred, obj))
+            for triple in self._do_a_gathertask(gatherer, focus):
+                next_step = self._add_gathered_triple(focus, predicate_map, triple)
+                if next_step:
+                    self._do_gather(*next_step)
+
+    def _do_gather_step(self, focus, predicate_map) -> list:
+        '''like _do_gather, but return the (focus, predicate_map) steps to take next
+        instead of taking them
+        '''
+        predicate_map = _as_predicate_map(predicate_map)
+        next_steps = []
+        for gatherer in get_gatherers(focus.rdftype, predicate_map.keys()):
+            for triple in self._do_a_gathertask(gatherer, focus):
+                next_step = self._add_gathered_triple(focus, predicate_map, triple)
+                if next_step:
+                    next_steps.append(next_step)
+        return next_steps
+
+    def _add_gathered_triple(self, focus, predicate_map, triple):
+        '''add a gathered triple to the basket, returning the (focus, predicate_map) step
+        it leads to, if any
+        '''
+        (subj, pred, obj) = triple
+        if isinstance(obj, Focus):
+            self._add_focus_reference(obj)
+            self.gathered_metadata.add((subj, pred, obj.iri))
+            if subj == focus.iri:
+                next_steps = predicate_map.get(pred, None)
+                if next_steps:
+                    return (obj, next_steps)
+        else:
+            self.gathered_metadata.add((subj, pred, obj))
+        return None
 
     def _do_a_gathertask(self, gatherer: Gatherer, focus: Focus):
         '''invoke gatherer with the given focus, but only if it hasn't already been done
+
+        (uses triples already gathered by the gatherer's batch variant, if any)
         '''
         if (gatherer, focus) not in self._gathertasks_done:
             self._gathertasks_done.add((gatherer, focus))  # eager
-            yield from gatherer(focus)
+            prefetched = self._prefetched.pop((gatherer, focus), None)
+            yield from (gatherer(focus) if prefetched is None else prefetched)
 
     def _add_focus_reference(self, focus: Focus):
         (
@@ -135,3 +155,57 @@ class Basket:
         )
         for triple in focus.reference_triples():
             self.gathered_metadata.add(triple)
+
+
+def pls_gather_many(gatherings):
+    '''like Basket.pls_gather, for many baskets at once
+
+    @gatherings: iterable of (basket, predicate_map) pairs
+
+    gathers breadth-first, one depth of the predicate maps at a time: gatherers
+    with a batch variant (see `gather.er_many`) run once for every focus at that
+    depth in every basket, the rest run for one focus at a time
+    '''
+    steps = [
+        (basket, basket.focus, predicate_map)
+        for basket, predicate_map in gatherings
+    ]
+    while steps:
+        _prefetch_batch_gathertasks(steps)
+        steps = [
+            (basket, next_focus, next_predicate_map)
+            for basket, focus, predicate_map in steps
+            for next_focus, next_predicate_map in basket._do_gather_step(focus, predicate_map)
+        ]
+
+
+def _prefetch_batch_gathertasks(steps):
+    # {gatherer: {focus: [basket, ...]}}, for gathertasks with a batch variant not yet done
+    baskets_by_gatherer = {}
+    for basket, focus, predicate_map in steps:
+        for gatherer in get_gatherers(focus.rdftype, _as_predicate_map(predicate_map).keys()):
+            if (gatherer, focus) in basket._gathertasks_done or not get_batch_gatherer(gatherer):
+                continue
+            (
+                baskets_by_gatherer
+                .setdefault(gatherer, {})
+                .setdefault(focus, [])
+                .append(basket)
+            )
+    for gatherer, baskets_by_focus in baskets_by_gatherer.items():
+        gathered = {focus: [] for focus in baskets_by_focus}
+        for focus, triple in get_batch_gatherer(gatherer)(list(baskets_by_focus)):
+            gathered[focus].append(triple)
+        for focus, baskets in baskets_by_focus.items():
+            for basket in baskets:
+                basket._prefetched[(gatherer, focus)] = gathered[focus]
+
+
+def _as_predicate_map(predicate_map) -> dict:
+    if isinstance(predicate_map, dict):
+        return predicate_map
+    # allow iterable of predicates with no deeper paths
+    return {
+        predicate_iri: None
+        for predicate_iri in predicate_map
+    }
@@ -12,6 +12,8 @@ from .focus import Focus
 
 
 Gatherer = typing.Callable[[Focus], typing.Iterable[tuple]]
+# a batch variant of a gatherer takes many focuses and yields (focus, triple) pairs
+BatchGatherer = typing.Callable[[list[Focus]], typing.Iterable[tuple[Focus, tuple]]]
 # module-private registry of gatherers by their iris of interest,
 # built by the @gatherer decorator (via add_gatherer)
 GathererRegistry = dict[             # outer dict maps
@@ -22,6 +24,9 @@ GathererRegistry = dict[             # outer dict maps
     ],
 ]
 __gatherer_registry: GathererRegistry = {}
+# module-private registry of batch variants by the gatherer they stand in for,
+# built by the @batch_gatherer decorator
+__batch_gatherer_registry: dict[Gatherer, BatchGatherer] = {}
 
 
 def gatherer(*predicate_iris, focustype_iris=None):
@@ -70,6 +75,32 @@ def get_gatherers(focustype_iri, predicate_iris):
     return gatherer_set
 
 
+def batch_gatherer(gatherer: Gatherer):
+    """decorator to register a batch variant of a registered gatherer
+
+    the batch variant gets a list of focuses and yields (focus, triple) pairs,
+    with the triples the gatherer would have yielded for each focus.
+    `gather.pls_gather_many` uses it to gather for many focuses in one go.
+
+    for example:
+        ```
+        @gather.er_many(gather_language)
+        def gather_language_many(focuses: list[gather.Focus]):
+            for focus in focuses:
+                yield (focus, (DCTERMS.language, getattr(focus.dbmodel, 'language')))
+        ```
+    """
+    def _decorator(inner_batch_gatherer: BatchGatherer):
+        tidy_batch_gatherer = _make_batch_gatherer_tidy(inner_batch_gatherer)
+        __batch_gatherer_registry[gatherer] = tidy_batch_gatherer
+        return tidy_batch_gatherer
+    return _decorator
+
+
+def get_batch_gatherer(gatherer: Gatherer) -> BatchGatherer | None:
+    return __batch_gatherer_registry.get(gatherer)
+
+
 class QuietlySkippleTriple(Exception):
     pass
 
@@ -85,6 +116,17 @@ def _make_gatherer_tidy(inner_gatherer: Gatherer) -> Gatherer:
     return tidy_gatherer
 
 
+def _make_batch_gatherer_tidy(inner_batch_gatherer: BatchGatherer) -> BatchGatherer:
+    @functools.wraps(inner_batch_gatherer)
+    def tidy_batch_gatherer(focuses: list[Focus]):
+        for focus, triple in inner_batch_gatherer(focuses):
+            try:
+                yield (focus, _tidy_gathered_triple(triple, focus))
+            except QuietlySkippleTriple:
+                pass
+    return tidy_batch_gatherer
+
+
 def _tidy_gathered_triple(triple, focus) -> tuple:
     """
     fill in the (perhaps partial) triple, given its focus,
@@ -47,6 +47,15 @@ def pls_get_magic_metadata_basket(osf_item) -> gather.Basket:
     return gather.Basket(focus)
 
 
+def pls_get_magic_metadata_baskets(osf_items) -> list[gather.Basket]:
+    '''like pls_get_magic_metadata_basket, for many things at once (see gather.pls_gather_many)
+
+    @osf_items: iterable of osf model instances (instances of osf.models.base.GuidMixin or
+                files with osfguids)
+    '''
+    return [gather.Basket(focus) for focus in OsfFocus.many(osf_items)]
+
+
 def osfmap_for_type(rdftype_iri: str):
     try:
         return OSFMAP[rdftype_iri]
@@ -265,19 +274,45 @@ DATACITE_RESOURCE_TYPE_BY_OSF_TYPE = {
 ##### BEGIN osf-specific utils #####
 
 class OsfFocus(gather.Focus):
-    def __init__(self, osf_item):
+    def __init__(self, osf_item, *, osfguid=None, guid_metadata_record=None):
         if isinstance(osf_item, str):
             osf_item = osfdb.base.coerce_guid(osf_item).referent
         super().__init__(
-            iri=osf_iri(osf_item),
+            iri=osf_iri(osfguid or osf_item),
             rdftype=get_rdf_type(osf_item),
         )
         self.dbmodel = osf_item
+        if guid_metadata_record is not None:
+            self.guid_metadata_record = guid_metadata_record
+            return
         try:
             self.guid_metadata_record = osfdb.GuidMetadataRecord.objects.for_guid(osf_item)
         except osfdb.base.InvalidGuid:
             pass  # is ok for a focus to be something non-osfguidy
 
+    @classmethod
+    def many(cls, osf_items) -> list['OsfFocus']:
+        '''focuses for many osf model instances (with osfguids), with their osfguids
+        and metadata records loaded in bulk instead of one item at a time
+        '''
+        osf_items = list(osf_items)
+        if not osf_items:
+            return []
+        osfguids = osfdb.base.coerce_guids(osf_items)
+        records = {
+            record.guid_id: record
+            for record in osfdb.GuidMetadataRecord.objects.filter(guid__in=osfguids)
+        }
+        return [
+            cls(
+                osf_item,
+                osfguid=osfguid,
+                # like GuidMetadataRecord.objects.for_guid, an unsaved record if there is none
+                guid_metadata_record=records.get(osfguid.id) or osfdb.GuidMetadataRecord(guid=osfguid),
+            )
+            for osf_item, osfguid in zip(osf_items, osfguids)
+        ]
+
 
 def is_root(osf_node):
     return (osf_node.root_id == osf_node.id)
@@ -324,6 +359,14 @@ def osfguid_from_iri(iri):
     raise ValueError(f'expected iri starting with "{OSFIO}" (got "{iri}")')
 
 
+def _gather_each(gatherer, focuses):
+    '''run a gatherer one focus at a time, for the focuses its batch variant does not handle
+    '''
+    for focus in focuses:
+        for triple in gatherer(focus):
+            yield (focus, triple)
+
+
 ##### END osf-specific utils #####
 
 
@@ -643,6 +686,36 @@ def gather_files(focus):
             yield (DCTERMS.requires, file_focus)
 
 
+@gather.er_many(gather_files)
+def gather_files_many(focuses):
+    # one query per target model for the files, and bulk-loaded file focuses
+    focuses_by_content_type = {}
+    for focus in focuses:
+        content_type = ContentType.objects.get_for_model(focus.dbmodel)
+        focuses_by_content_type.setdefault(content_type, {})[focus.dbmodel.id] = focus
+    files_by_focus = {}
+    for content_type, focus_by_id in focuses_by_content_type.items():
+        files_with_osfguids = (
+            osfdb.BaseFileNode.active
+            .filter(
+                target_object_id__in=focus_by_id.keys(),
+                target_content_type=content_type,
+            )
+            .annotate(num_osfguids=db.models.Count('guids'))
+            .filter(num_osfguids__gt=0)
+        )
+        for file in files_with_osfguids:
+            files_by_focus.setdefault(focus_by_id[file.target_object_id], []).append(file)
+    files = [file for focus_files in files_by_focus.values() for file in focus_files]
+    file_focuses = dict(zip((file.id for file in files), OsfFocus.many(files)))
+    for focus, focus_files in files_by_focus.items():
+        primary_file_id = getattr(focus.dbmodel, 'primary_file_id', None)
+        for file in focus_files:
+            yield (focus, (OSF.contains, file_focuses[file.id]))
+            if (primary_file_id is not None) and file.id == primary_file_id:
+                yield (focus, (DCTERMS.requires, file_focuses[file.id]))
+
+
 @gather.er(DCTERMS.hasPart, DCTERMS.isPartOf)
 def gather_parts(focus):
     if isinstance(focus.dbmodel, osfdb.AbstractNode):
@@ -819,6 +892,45 @@ def gather_agents(focus):
     # TODO: preserve order via rdflib.Seq
 
 
+@gather.er_many(gather_agents)
+def gather_agents_many(focuses):
+    # visible contributors of nodes and preprints, with one query per model
+    users_by_focus = {}
+    contributor_querysets = (
+        (osfdb.AbstractNode, osfdb.Contributor, 'node_id'),
+        (osfdb.Preprint, osfdb.PreprintContributor, 'preprint_id'),
+    )
+    for model, contributor_model, fk_name in contributor_querysets:
+        focus_by_id = {
+            focus.dbmodel.id: focus
+            for focus in focuses
+            if isinstance(focus.dbmodel, model)
+        }
+        contributors = (
+            contributor_model.objects
+            .filter(**{f'{fk_name}__in': focus_by_id.keys()}, visible=True)
+            .select_related('user')
+            .order_by(fk_name, '_order')
+        )
+        for contributor in contributors:
+            focus = focus_by_id[getattr(contributor, fk_name)]
+            users_by_focus.setdefault(focus, []).append(contributor.user)
+    users = {
+        user.id: user
+        for focus_users in users_by_focus.values()
+        for user in focus_users
+    }
+    user_focuses = dict(zip(users, OsfFocus.many(users.values())))
+    for focus, focus_users in users_by_focus.items():
+        for user in focus_users:
+            yield (focus, (DCTERMS.creator, user_focuses[user.id]))
+    yield from _gather_each(gather_agents, [
+        focus
+        for focus in focuses
+        if not isinstance(focus.dbmodel, (osfdb.AbstractNode, osfdb.Preprint))
+    ])
+
+
 @gather.er(OSF.affiliation)
 def gather_affiliated_institutions(focus):
     if hasattr(focus.dbmodel, 'get_affiliated_institutions'):   # like OSFUser
@@ -828,13 +940,47 @@ def gather_affiliated_institutions(focus):
     else:
         institution_qs = ()
     for osf_institution in institution_qs:
-        institution_iri = rdflib.URIRef(osf_institution.get_semantic_iri())
-        yield (OSF.affiliation, institution_iri)
-        yield (institution_iri, RDF.type, DCTERMS.Agent)
-        yield (institution_iri, RDF.type, FOAF.Organization)
-        yield (institution_iri, FOAF.name, osf_institution.name)
-        yield (institution_iri, DCTERMS.identifier, osf_institution.ror_uri)
-        yield (institution_iri, DCTERMS.identifier, osf_institution.identifier_domain)
+        yield from _affiliation_triples(osf_institution)
+
+
+@gather.er_many(gather_affiliated_institutions)
+def gather_affiliated_institutions_many(focuses):
+    # one query per model; users are affiliated through InstitutionAffiliation,
+    # other models through their `affiliated_institutions` many-to-many
+    focuses_by_model = {}
+    for focus in focuses:
+        if isinstance(focus.dbmodel, osfdb.OSFUser) or hasattr(focus.dbmodel, 'affiliated_institutions'):
+            focuses_by_model.setdefault(type(focus.dbmodel)._meta.concrete_model, []).append(focus)
+        else:
+            yield from _gather_each(gather_affiliated_institutions, [focus])
+    for model, model_focuses in focuses_by_model.items():
+        focus_by_id = {focus.dbmodel.id: focus for focus in model_focuses}
+        if issubclass(model, osfdb.OSFUser):
+            through_model, fk_name = osfdb.InstitutionAffiliation, 'user_id'
+        else:
+            through_model = model.affiliated_institutions.through
+            fk_name = f'{model.affiliated_institutions.field.m2m_field_name()}_id'
+        affiliations = (
+            through_model.objects
+            .filter(**{f'{fk_name}__in': focus_by_id.keys()})
+            # as the default Institution manager does
+            .filter(institution__deactivated__isnull=True)
+            .select_related('institution')
+        )
+        for affiliation in affiliations:
+            focus = focus_by_id[getattr(affiliation, fk_name)]
+            for triple in _affiliation_triples(affiliation.institution):
+                yield (focus, triple)
+
+
+def _affiliation_triples(osf_institution):
+    institution_iri = rdflib.URIRef(osf_institution.get_semantic_iri())
+    yield (OSF.affiliation, institution_iri)
+    yield (institution_iri, RDF.type, DCTERMS.Agent)
+    yield (institution_iri, RDF.type, FOAF.Organization)
+    yield (institution_iri, FOAF.name, osf_institution.name)
+    yield (institution_iri, DCTERMS.identifier, osf_institution.ror_uri)
+    yield (institution_iri, DCTERMS.identifier, osf_institution.identifier_domain)
 
 
 @gather.er(OSF.funder, OSF.hasFunding)
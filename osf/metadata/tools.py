@@ -1,10 +1,28 @@
 '''for when you don't care about rdf or gatherbaskets, just want metadata about a thing.
 '''
+import hashlib
+import json
+import logging
 import typing
+import uuid
 
-from osf.models.base import coerce_guid
-from osf.metadata.osf_gathering import pls_get_magic_metadata_basket
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.db import models
+
+from osf.models.base import Guid, coerce_guid, coerce_guids
+from osf.models.identifiers import Identifier
+from osf.metadata import gather
+from osf.metadata.osf_gathering import (
+    osfmap_for_type,
+    pls_get_magic_metadata_basket,
+    pls_get_magic_metadata_baskets,
+)
 from osf.metadata.serializers import get_metadata_serializer
+from website import settings as website_settings
+
+
+logger = logging.getLogger(__name__)
 
 
 class SerializedMetadataFile(typing.NamedTuple):
@@ -29,15 +47,120 @@ def pls_gather_metadata_as_dict(osf_item, format_key, serializer_config=None):
 def pls_gather_metadata_file(osf_item, format_key, serializer_config=None) -> SerializedMetadataFile:
     '''for when you want metadata in a file (for saving or downloading)
 
+    with METADATA_CACHE_ENABLED, files are cached under a key made from the guid, the format,
+    the serializer config and a version stamp of the item (see `_metadata_cache_key`)
+
     @osf_item: the thing (osf model instance or 5-ish character guid string)
     @format_key: str (must be known by osf.metadata.serializers)
     @serializer_config: optional dict (use only when you know the serializer will understand)
     '''
     osfguid = coerce_guid(osf_item, create_if_needed=True)
+    cache_key = None
+    if website_settings.METADATA_CACHE_ENABLED:
+        cache_key = _metadata_cache_key(osfguid, format_key, serializer_config)
+        cached = _metadata_cache_call('get', cache_key)
+        if cached is not None:
+            return SerializedMetadataFile(*cached)
     basket = pls_get_magic_metadata_basket(osfguid.referent)
     serializer = get_metadata_serializer(format_key, basket, serializer_config)
-    return SerializedMetadataFile(
+    metadata_file = SerializedMetadataFile(
         mediatype=serializer.mediatype,
         filename=serializer.filename_for_itemid(osfguid._id),
         serialized_metadata=serializer.serialize(),
     )
+    if cache_key is not None:
+        _metadata_cache_call('set', cache_key, tuple(metadata_file), website_settings.METADATA_CACHE_TIMEOUT)
+    return metadata_file
+
+
+def pls_gather_many(osf_items, format_key, serializer_config=None) -> list[SerializedMetadataFile]:
+    '''for when you want metadata files for many things (e.g. to backfill SHARE)
+
+    gathers for all the things together, so gatherers with a batch variant
+    (see gather.er_many) query once per batch instead of once per thing.
+    bypasses the cache used by pls_gather_metadata_file.
+
+    @osf_items: iterable of things (osf model instances or 5-ish character guid strings)
+    @format_key: str (must be known by osf.metadata.serializers)
+    @serializer_config: optional dict (use only when you know the serializer will understand)
+    @returns: list of SerializedMetadataFile, in the order of osf_items
+    '''
+    osf_items = list(osf_items)
+    osfguids = coerce_guids(osf_items)
+    baskets = pls_get_magic_metadata_baskets(
+        osf_item if isinstance(osf_item, models.Model) and not isinstance(osf_item, Guid) else osfguid.referent
+        for osf_item, osfguid in zip(osf_items, osfguids)
+    )
+    gather.pls_gather_many(
+        (basket, osfmap_for_type(basket.focus.rdftype))
+        for basket in baskets
+    )
+    metadata_files = []
+    for osfguid, basket in zip(osfguids, baskets):
+        serializer = get_metadata_serializer(format_key, basket, serializer_config)
+        metadata_files.append(SerializedMetadataFile(
+            mediatype=serializer.mediatype,
+            filename=serializer.filename_for_itemid(osfguid._id),
+            serialized_metadata=serializer.serialize(),
+        ))
+    return metadata_files
+
+
+def invalidate_metadata_cache(osf_item):
+    '''drop the cached metadata files of a thing, for changes its version stamp cannot see
+    (e.g. to contributors, affiliations or files)
+
+    @osf_item: the thing (osf model instance or Guid)
+    '''
+    if not website_settings.METADATA_CACHE_ENABLED or osf_item.pk is None:
+        return
+    if isinstance(osf_item, Guid):
+        content_type_id, object_id = osf_item.content_type_id, osf_item.object_id
+    else:
+        content_type_id, object_id = ContentType.objects.get_for_model(osf_item).id, osf_item.pk
+    # cached keys embed the generation, so replacing it orphans all of them until they expire;
+    # the generation outlives every entry written under the one it replaces
+    _metadata_cache_call(
+        'set',
+        _generation_key(content_type_id, object_id),
+        uuid.uuid4().hex,
+        website_settings.METADATA_CACHE_TIMEOUT,
+    )
+
+
+def _metadata_cache_call(method, *args):
+    # the cache only saves gathering; build the file without it if it is unavailable
+    try:
+        return getattr(caches[website_settings.METADATA_CACHE_NAME], method)(*args)
+    except Exception as err:
+        logger.warning(f'metadata cache {method} failed: {err}')
+        return None
+
+
+def _generation_key(content_type_id, object_id):
+    return f'metadata:generation:{content_type_id}:{object_id}'
+
+
+def _metadata_cache_key(osfguid, format_key, serializer_config):
+    # the version stamp: when the item, its GuidMetadataRecord and its identifiers were last
+    # modified, and the generation bumped by `invalidate_metadata_cache`
+    metadata_modified, identifier_modified = Guid.objects.filter(id=osfguid.id).annotate(
+        identifier_modified=models.Subquery(
+            Identifier.objects.filter(
+                content_type=models.OuterRef('content_type'),
+                object_id=models.OuterRef('object_id'),
+            ).order_by('-modified').values('modified')[:1]
+        ),
+    ).values_list('metadata_record__modified', 'identifier_modified').get()
+    generation = _metadata_cache_call('get', _generation_key(osfguid.content_type_id, osfguid.object_id))
+    stamp = [
+        osfguid._id,
+        format_key,
+        serializer_config,
+        getattr(osfguid.referent, 'modified', None),
+        metadata_modified,
+        identifier_modified,
+        generation,
+    ]
+    digest = hashlib.sha256(json.dumps(stamp, sort_keys=True, default=str).encode()).hexdigest()
+    return f'metadata:file:{digest}'
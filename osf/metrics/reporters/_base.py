@@ -42,13 +42,26 @@ class DailyReporter:
         """
         raise NotImplementedError(f'{self.__name__} should probably implement keen_events_from_report')
 
+    def report_many(self, report_dates):
+        """build reports for each of the given dates
+
+        return an iterable of DailyReport (unsaved); reporters that can count
+        several dates at once override this to backfill in fewer queries
+        """
+        for report_date in report_dates:
+            yield from self.report(report_date)
+
     def run_and_record_for_date(self, report_date, *, also_send_to_keen=False):
-        reports = self.report(report_date)
+        self.run_and_record_for_dates([report_date], also_send_to_keen=also_send_to_keen)
+
+    def run_and_record_for_dates(self, report_dates, *, also_send_to_keen=False):
+        reports = []
 
         # expecting each reporter to spit out only a handful of reports per day;
         # not bothering with bulk-create
-        for report in reports:
+        for report in self.report_many(report_dates):
             report.save()
+            reports.append(report)
 
         if also_send_to_keen:
             self.send_to_keen(reports)
@@ -1,6 +1,6 @@
 import logging
 
-from django.db.models import Q
+from django.db.models import Count, Q
 
 from osf.metrics.reports import (
     InstitutionSummaryReport,
@@ -8,91 +8,83 @@ from osf.metrics.reports import (
     NodeRunningTotals,
     RegistrationRunningTotals,
 )
-from osf.models import Institution
+from osf.models import AbstractNode, Institution, InstitutionAffiliation
 from ._base import DailyReporter
+from ._running_totals import (
+    IS_ROOT,
+    NODE_TOTALS,
+    REGISTRATION_TOTALS,
+    REGISTRATION_TYPE,
+    chunk_dates,
+    count_running_totals,
+)
 
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+IS_NODE = ~Q(type=REGISTRATION_TYPE)
+IS_REGISTRATION = Q(type=REGISTRATION_TYPE)
+
+INSTITUTION_NODE_TOTALS = {
+    field: total for field, total in NODE_TOTALS.items()
+    if field not in ('total_excluding_spam', 'total_daily_excluding_spam')
+}
+INSTITUTION_REGISTRATION_TOTALS = {
+    field: total for field, total in REGISTRATION_TOTALS.items()
+    if field not in ('withdrawn', 'withdrawn_daily')
+}
+
+SECTIONS = {
+    'nodes': (IS_NODE, INSTITUTION_NODE_TOTALS),
+    # Projects are the roots, without their children
+    'projects': (IS_NODE & IS_ROOT, INSTITUTION_NODE_TOTALS),
+    'registered_nodes': (IS_REGISTRATION, INSTITUTION_REGISTRATION_TOTALS),
+    'registered_projects': (IS_REGISTRATION & IS_ROOT, INSTITUTION_REGISTRATION_TOTALS),
+}
+
+
+def count_institution_users(report_dates):
+    """Return {(report date, institution id): {'total': ..., 'total_daily': ...}} of affiliated users"""
+    aggregates = {'total': Count('user', distinct=True, filter=Q(user__is_active=True))}
+    for i, report_date in enumerate(report_dates):
+        aggregates[f'daily_{i}'] = Count('user', distinct=True, filter=Q(user__date_confirmed__date=report_date))
+    rows = InstitutionAffiliation.objects.order_by().values('institution_id').annotate(**aggregates)
+
+    users = {}
+    for row in rows:
+        for i, report_date in enumerate(report_dates):
+            users[(report_date, row['institution_id'])] = {
+                'total': row['total'],
+                'total_daily': row[f'daily_{i}'],
+            }
+    return users
+
 
 class InstitutionSummaryReporter(DailyReporter):
     def report(self, date):
-        institutions = Institution.objects.all()
-        reports = []
-
-        daily_query = Q(created__date=date)
-        public_query = Q(is_public=True)
-        private_query = Q(is_public=False)
-
-        # `embargoed` used private status to determine embargoes, but old registrations could be private and unapproved registrations can also be private
-        # `embargoed_v2` uses future embargo end dates on root
-        embargo_v2_query = Q(root__embargo__end_date__date__gt=date)
-
-        for institution in institutions:
-            node_qs = institution.nodes.filter(
-                deleted__isnull=True,
-                created__date__lte=date,
-            ).exclude(type='osf.registration')
-            registration_qs = institution.nodes.filter(
-                deleted__isnull=True,
-                created__date__lte=date,
-                type='osf.registration',
-            )
-
-            report = InstitutionSummaryReport(
-                report_date=date,
-                institution_id=institution._id,
-                institution_name=institution.name,
-                users=RunningTotal(
-                    total=institution.get_institution_users().filter(is_active=True).count(),
-                    total_daily=institution.get_institution_users().filter(date_confirmed__date=date).count(),
-                ),
-                nodes=NodeRunningTotals(
-                    total=node_qs.count(),
-                    public=node_qs.filter(public_query).count(),
-                    private=node_qs.filter(private_query).count(),
-
-                    total_daily=node_qs.filter(daily_query).count(),
-                    public_daily=node_qs.filter(public_query & daily_query).count(),
-                    private_daily=node_qs.filter(private_query & daily_query).count(),
-                ),
-                # Projects use get_roots to remove children
-                projects=NodeRunningTotals(
-                    total=node_qs.get_roots().count(),
-                    public=node_qs.filter(public_query).get_roots().count(),
-                    private=node_qs.filter(private_query).get_roots().count(),
-
-                    total_daily=node_qs.filter(daily_query).get_roots().count(),
-                    public_daily=node_qs.filter(public_query & daily_query).get_roots().count(),
-                    private_daily=node_qs.filter(private_query & daily_query).get_roots().count(),
-                ),
-                registered_nodes=RegistrationRunningTotals(
-                    total=registration_qs.count(),
-                    public=registration_qs.filter(public_query).count(),
-                    embargoed=registration_qs.filter(private_query).count(),
-                    embargoed_v2=registration_qs.filter(private_query & embargo_v2_query).count(),
-
-                    total_daily=registration_qs.filter(daily_query).count(),
-                    public_daily=registration_qs.filter(public_query & daily_query).count(),
-                    embargoed_daily=registration_qs.filter(private_query & daily_query).count(),
-                    embargoed_v2_daily=registration_qs.filter(private_query & daily_query & embargo_v2_query).count(),
-                ),
-                registered_projects=RegistrationRunningTotals(
-                    total=registration_qs.get_roots().count(),
-                    public=registration_qs.filter(public_query).get_roots().count(),
-                    embargoed=registration_qs.filter(private_query).get_roots().count(),
-                    embargoed_v2=registration_qs.filter(private_query & embargo_v2_query).get_roots().count(),
-
-                    total_daily=registration_qs.filter(daily_query).get_roots().count(),
-                    public_daily=registration_qs.filter(public_query & daily_query).get_roots().count(),
-                    embargoed_daily=registration_qs.filter(private_query & daily_query).get_roots().count(),
-                    embargoed_v2_daily=registration_qs.filter(private_query & daily_query & embargo_v2_query).get_roots().count(),
-                ),
-            )
-
-            reports.append(report)
-        return reports
+        return list(self.report_many([date]))
+
+    def report_many(self, report_dates):
+        institutions = list(Institution.objects.all())
+        node_qs = AbstractNode.objects.filter(deleted__isnull=True, affiliated_institutions__isnull=False)
+
+        for dates in chunk_dates(report_dates):
+            totals = count_running_totals(node_qs, dates, SECTIONS, group_by='affiliated_institutions')
+            users = count_institution_users(dates)
+            for date in dates:
+                for institution in institutions:
+                    counts = totals[(date, institution.id)]
+                    yield InstitutionSummaryReport(
+                        report_date=date,
+                        institution_id=institution._id,
+                        institution_name=institution.name,
+                        users=RunningTotal(**users.get((date, institution.id), {'total': 0, 'total_daily': 0})),
+                        nodes=NodeRunningTotals(**counts['nodes']),
+                        projects=NodeRunningTotals(**counts['projects']),
+                        registered_nodes=RegistrationRunningTotals(**counts['registered_nodes']),
+                        registered_projects=RegistrationRunningTotals(**counts['registered_projects']),
+                    )
 
     def keen_events_from_report(self, report):
         event = {
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+import osf.models.base
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0022_alter_abstractnode_subjects_alter_abstractnode_tags_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeStorageUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('total', models.BigIntegerField(default=0)),
+                ('node', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='storage_usage_counter', to='osf.abstractnode')),
+            ],
+            bases=(models.Model, osf.models.base.QuerySetExplainMixin),
+        ),
+    ]
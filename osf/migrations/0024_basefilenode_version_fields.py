@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import osf.utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0023_nodestorageusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basefilenode',
+            name='earliest_version_created',
+            field=osf.utils.fields.NonNaiveDateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='latest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.fileversion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='version_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
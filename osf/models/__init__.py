@@ -58,6 +58,7 @@ from .metaschema import (
 )
 from .node import AbstractNode, Node
 from .node_relation import NodeRelation
+from .node_storage_usage import NodeStorageUsage
 from .nodelog import NodeLog
 from .notable_domain import NotableDomain, DomainReference
 from .notifications import NotificationDigest, NotificationSubscription
@@ -1,11 +1,13 @@
 import logging
+from datetime import timedelta
 from importlib import import_module
 from dateutil import parser
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.db.models import Sum
 from django.db.models.expressions import RawSQL
 from django.utils import timezone
 from api.base import settings
+from framework.analytics.buffer import CounterBuffer
 
 from .base import BaseModel, Guid
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
@@ -55,6 +57,87 @@ class UserActivityCounter(BaseModel):
             uac.save()
         return True
 
+    @classmethod
+    def buffer_increment(cls, user_id, action, date_string, buffer=None):
+        """Count an action in the write-behind buffer; `flush_buffer` applies it to the database later."""
+        date = parser.parse(date_string).strftime('%Y/%m/%d')
+        (buffer or user_activity_buffer).incr(
+            f'{user_id}|{action}|{date}',
+            {'count': 1},
+            descriptor=(user_id, action, date),
+        )
+
+    @classmethod
+    def flush_buffer(cls, buffer=None):
+        """Apply buffered increments with a single UPDATE per user.
+
+        :param CounterBuffer buffer: Buffer to flush instead of `user_activity_buffer`
+        """
+        return (buffer or user_activity_buffer).flush(['count'], cls._apply_buffered)
+
+    @classmethod
+    def _apply_buffered(cls, buffered):
+        # user_id -> action -> date -> count
+        increments = {}
+        for (user_id, action, date), deltas in buffered.values():
+            if deltas['count']:
+                by_date = increments.setdefault(user_id, {}).setdefault(action, {})
+                by_date[date] = by_date.get(date, 0) + deltas['count']
+
+        with transaction.atomic():
+            cls.objects.bulk_create([cls(_id=user_id) for user_id in increments], ignore_conflicts=True)
+            with connection.cursor() as cursor:
+                # Lock rows in a stable order so concurrent writers cannot deadlock
+                for user_id in sorted(increments):
+                    cursor.execute(*cls._increment_sql(user_id, increments[user_id]))
+
+    @classmethod
+    def _increment_sql(cls, user_id, actions):
+        """Build an UPDATE that merges `actions` ({action: {date: count}}) into the user's row.
+
+        Every expression reads the row as it was before the UPDATE, so each path is merged
+        with `||` instead of chaining `jsonb_set` calls.
+        """
+        action_sql, action_params = [], []
+        date_totals = {}
+        for action, by_date in actions.items():
+            date_sql, date_params = [], []
+            for date, count in by_date.items():
+                date_sql.append("%s, COALESCE((action->%s->'date'->>%s)::int, 0) + %s")
+                date_params.extend([date, action, date, count])
+                date_totals[date] = date_totals.get(date, 0) + count
+            action_sql.append(
+                "%s, COALESCE(action->%s, '{{}}'::jsonb) || jsonb_build_object("
+                "'total', COALESCE((action->%s->>'total')::int, 0) + %s, "
+                "'date', COALESCE(action->%s->'date', '{{}}'::jsonb) || jsonb_build_object({date_sql}))".format(
+                    date_sql=', '.join(date_sql),
+                )
+            )
+            action_params.extend([action, action, action, sum(by_date.values()), action] + date_params)
+
+        date_sql, date_params = [], []
+        for date, count in date_totals.items():
+            date_sql.append(
+                "%s, COALESCE(date->%s, '{}'::jsonb) || "
+                "jsonb_build_object('total', COALESCE((date->%s->>'total')::int, 0) + %s)"
+            )
+            date_params.extend([date, date, date, count])
+
+        sql = (
+            'UPDATE {table} SET '
+            'total = total + %s, '
+            'modified = %s, '
+            'action = action || jsonb_build_object({action_sql}), '
+            'date = date || jsonb_build_object({date_sql}) '
+            'WHERE _id = %s'
+        ).format(
+            table=cls._meta.db_table,
+            action_sql=', '.join(action_sql),
+            date_sql=', '.join(date_sql),
+        )
+        params = [sum(date_totals.values()), timezone.now()] + action_params + date_params + [user_id]
+        return sql, params
+
 
 class PageCounter(BaseModel):
     primary_identifier_name = '_id'
@@ -97,13 +180,28 @@ class PageCounter(BaseModel):
             '$', '_'
         )
 
+    @staticmethod
+    def get_page(resource, file, version, action):
+        if version is not None:
+            return f'{action}:{resource._id}:{file._id}:{version}'
+        return f'{action}:{resource._id}:{file._id}'
+
+    @staticmethod
+    def _is_contributor_visit(page, node_info, auth_user_id):
+        # if a download counter is being updated, only count it towards the totals
+        # if the user who is downloading isn't a contributor to the project
+        page_type = page.split(':')[0]
+        return bool(
+            page_type in ('download', 'view') and node_info and auth_user_id and
+            node_info['contributors'].filter(guids___id__isnull=False, guids___id=auth_user_id).exists()
+        )
+
     @classmethod
     def update_counter(cls, resource, file, version, action, node_info, session_key):
-        if version is not None:
-            page = f'{action}:{resource._id}:{file._id}:{version}'
-        else:
-            page = f'{action}:{resource._id}:{file._id}'
+        if settings.PAGE_COUNTER_BUFFER_ENABLED:
+            return cls.buffer_counter(resource, file, version, action, node_info, session_key)
 
+        page = cls.get_page(resource, file, version, action)
         cleaned_page = cls.clean_page(page)
         date = timezone.now()
         date_string = date.strftime('%Y/%m/%d')
@@ -158,14 +256,10 @@ class PageCounter(BaseModel):
             else:
                 model_instance.date[date_string] = dict(total=1)
 
-            # if a download counter is being updated, only perform the update
-            # if the user who is downloading isn't a contributor to the project
-            page_type = cleaned_page.split(':')[0]
-            if page_type in ('download', 'view') and node_info:
-                if auth_user_id and node_info['contributors'].filter(guids___id__isnull=False, guids___id=auth_user_id).exists():
-                    model_instance.save()
-                    user_session.save()
-                    return
+            if cls._is_contributor_visit(cleaned_page, node_info, auth_user_id):
+                model_instance.save()
+                user_session.save()
+                return
 
             visited = user_session.get('visited', [])
             if page not in visited:
@@ -181,10 +275,102 @@ class PageCounter(BaseModel):
 
             model_instance.save()
 
+    @classmethod
+    def buffer_counter(cls, resource, file, version, action, node_info, session_key):
+        """Count a visit in the write-behind buffer; `flush_buffer` applies it to the database later.
+
+        Unique visitors are tracked with expiring per-visitor cache keys rather than lists in the session.
+        """
+        page = cls.get_page(resource, file, version, action)
+        cleaned_page = cls.clean_page(page)
+        date_string = timezone.now().strftime('%Y/%m/%d')
+
+        auth_user_id = SessionStore(session_key=session_key).get('auth_user_id', None) if session_key else None
+        visitor = auth_user_id or session_key
+        first_today = visitor is None or page_counter_buffer.first_visit(date_string, cleaned_page, visitor)
+        deltas = {'day_total': 1, 'day_unique': int(first_today)}
+        if not cls._is_contributor_visit(cleaned_page, node_info, auth_user_id):
+            deltas['total'] = 1
+            deltas['unique'] = int(
+                visitor is None or page_counter_buffer.first_visit(page, visitor, timeout=settings.SESSION_COOKIE_AGE)
+            )
+
+        page_counter_buffer.incr(
+            f'{cleaned_page}|{date_string}',
+            deltas,
+            descriptor={
+                '_id': cleaned_page,
+                'resource_id': resource.id,
+                'file_id': file.id,
+                'action': action,
+                'version': version,
+                'date': date_string,
+            },
+        )
+
+    @classmethod
+    def flush_buffer(cls):
+        """Apply buffered counts to PageCounters, one row lock per counter per flush window."""
+        return page_counter_buffer.flush(BUFFER_FIELDS, cls._apply_buffered)
+
+    @classmethod
+    def _apply_buffered(cls, buffered):
+        by_page = {}
+        for descriptor, deltas in buffered.values():
+            by_page.setdefault(descriptor['_id'], []).append((descriptor, deltas))
+
+        with transaction.atomic():
+            # Lock rows in a stable order so concurrent writers cannot deadlock
+            for cleaned_page in sorted(by_page):
+                descriptor = by_page[cleaned_page][0][0]
+                model_instance, created = cls.objects.select_for_update().get_or_create(
+                    _id=cleaned_page,
+                    resource_id=descriptor['resource_id'],
+                    file_id=descriptor['file_id'],
+                    action=descriptor['action'],
+                    version=descriptor['version'],
+                )
+                for descriptor, deltas in by_page[cleaned_page]:
+                    day = model_instance.date.setdefault(descriptor['date'], {})
+                    day['total'] = day.get('total', 0) + deltas['day_total']
+                    day['unique'] = day.get('unique', 0) + deltas['day_unique']
+                    model_instance.total += deltas['total']
+                    model_instance.unique += deltas['unique']
+                model_instance.save()
+
     @classmethod
     def get_basic_counters(cls, resource, file, version, action):
         try:
             counter = cls.objects.get(resource=resource, file=file, version=version, action=action)
-            return (counter.unique, counter.total)
+            unique, total = counter.unique, counter.total
         except cls.DoesNotExist:
-            return (None, None)
+            unique, total = None, None
+
+        if settings.PAGE_COUNTER_BUFFER_ENABLED:
+            # Read through the buffer, so that counts do not lag behind by a flush interval
+            cleaned_page = cls.clean_page(cls.get_page(resource, file, version, action))
+            today = timezone.now()
+            pending_unique = pending_total = 0
+            for date in (today - timedelta(days=1), today):
+                pending = page_counter_buffer.pending(f'{cleaned_page}|{date.strftime("%Y/%m/%d")}', ['unique', 'total'])
+                pending_unique += pending['unique']
+                pending_total += pending['total']
+            if pending_unique or pending_total:
+                unique, total = (unique or 0) + pending_unique, (total or 0) + pending_total
+
+        return (unique, total)
+
+
+BUFFER_FIELDS = ['total', 'unique', 'day_total', 'day_unique']
+
+user_activity_buffer = CounterBuffer(
+    'useractivity',
+    settings.USER_ACTIVITY_BUFFER_CACHE_NAME,
+    settings.USER_ACTIVITY_FLUSH_INTERVAL,
+)
+
+page_counter_buffer = CounterBuffer(
+    'pagecounter',
+    settings.PAGE_COUNTER_BUFFER_CACHE_NAME,
+    settings.PAGE_COUNTER_FLUSH_INTERVAL,
+)
@@ -8,13 +8,13 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models, transaction
 from django.utils import timezone
 from django.utils.functional import cached_property
-from guardian.shortcuts import assign_perm, get_perms, remove_perm, get_group_perms
+from guardian.shortcuts import assign_perm, get_perms, remove_perm
 
 from api.providers.workflows import Workflows, PUBLIC_STATES
 from framework import status
 from framework.auth import Auth
 from framework.auth.core import get_user
-from framework.analytics import increment_user_activity_counters
+from framework.analytics import record_user_activity
 from framework.exceptions import PermissionsError
 from osf.exceptions import (
     InvalidTriggerError,
@@ -41,6 +41,7 @@ from osf.utils.machines import (
 )
 
 from osf.utils.permissions import ADMIN, REVIEW_GROUPS, READ, WRITE
+from osf.utils.permission_cache import get_cached_group_perms, invalidate_group_perms
 from osf.utils.registrations import flatten_registration_metadata, expand_registration_responses
 from osf.utils.workflows import (
     DefaultStates,
@@ -141,7 +142,7 @@ class Loggable(models.Model):
         if save:
             self.save()
         if user and not getattr(self, 'is_collection', None):
-            increment_user_activity_counters(user._primary_key, action, self.last_logged.isoformat())
+            record_user_activity(user._primary_key, action, self.last_logged.isoformat())
 
     class Meta:
         abstract = True
@@ -1552,6 +1553,7 @@ class ContributorMixin(models.Model):
             if self.belongs_to_permission_group(old, group_name):
                 self.get_group(group_name).user_set.remove(old)
                 self.get_group(group_name).user_set.add(new)
+        invalidate_group_perms(self)
         return True
 
     def copy_unclaimed_records(self, resource):
@@ -1871,9 +1873,9 @@ class ContributorMixin(models.Model):
         if not user or user.is_anonymous:
             return False
         perm = f'{permission}_{object_type}'
-        # Using get_group_perms to get permissions that are inferred through
+        # Using group perms to get permissions that are inferred through
         # group membership - not inherited from superuser status
-        has_permission = perm in get_group_perms(user, self)
+        has_permission = perm in get_cached_group_perms(user, self)
         if object_type == 'node':
             if not has_permission and permission == READ and check_parent:
                 return self.is_admin_parent(user)
@@ -1891,6 +1893,7 @@ class ContributorMixin(models.Model):
         if not self.belongs_to_permission_group(user, permission):
             permission_group = self.get_group(permission)
             permission_group.user_set.add(user)
+            invalidate_group_perms(self)
         else:
             raise ValueError(f'User already has permission {permission}')
         if save:
@@ -1902,7 +1905,7 @@ class ContributorMixin(models.Model):
             return []
         # If base_perms not on model, will error
         perms = self.base_perms
-        user_perms = sorted(set(get_group_perms(user, self)).intersection(perms), key=perms.index)
+        user_perms = sorted(set(get_cached_group_perms(user, self)).intersection(perms), key=perms.index)
         return [perm.split('_')[0] for perm in user_perms]
 
     def set_permissions(self, user, permissions, validate=True, save=False):
@@ -1924,6 +1927,7 @@ class ContributorMixin(models.Model):
                 raise self.state_error('Must have at least one registered admin contributor')
         self.clear_permissions(user)
         self.add_permission(user, permissions)
+        invalidate_group_perms(self)
         if save:
             self.save()
 
@@ -1946,6 +1950,7 @@ class ContributorMixin(models.Model):
         if self.belongs_to_permission_group(user, permission):
             permission_group = self.get_group(permission)
             permission_group.user_set.remove(user)
+            invalidate_group_perms(self)
         else:
             raise ValueError(f'User does not have permission {permission}')
         if save:
@@ -1,4 +1,3 @@
-import functools
 import itertools
 import logging
 import re
@@ -77,7 +76,7 @@ from osf.utils.permissions import (
 from website.util.metrics import OsfSourceTags, CampaignSourceTags
 from website.util import api_url_for, api_v2_url, web_url_for
 from .base import BaseModel, GuidMixin, GuidMixinQuerySet
-from api.caching.tasks import update_storage_usage
+from api.caching.tasks import get_stored_storage_usage, update_storage_usage
 from api.caching import settings as cache_settings
 from api.caching.utils import storage_usage_cache
 from api.share.utils import update_share
@@ -189,6 +188,9 @@ class AbstractNodeManager(TypedModelManager):
     def get_roots(self):
         return self.get_queryset().get_roots()
 
+    def with_primary_guid(self):
+        return self.get_queryset().with_primary_guid()
+
     def get_children(self, root, active=False, include_root=False):
         return self.get_queryset().get_children(root, active=active, include_root=include_root)
 
@@ -309,6 +311,28 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     ) SELECT {fields} FROM "{nodelicenserecord}"
     WHERE id = (SELECT node_license_id FROM ascendants WHERE node_license_id IS NOT NULL) LIMIT 1;""")
 
+    # LICENSE_QUERY for many nodes at once, returning (node id, inherited license record id) rows
+    BULK_LICENSE_QUERY = re.sub(r'\s+', ' ', """WITH RECURSIVE ascendants AS (
+            SELECT
+                R.child_id AS node_id,
+                N.node_license_id,
+                R.parent_id
+            FROM "{noderelation}" AS R
+                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
+            WHERE R.is_node_link IS FALSE
+                AND R.child_id = ANY(%s)
+        UNION ALL
+            SELECT
+                D.node_id,
+                N.node_license_id,
+                R.parent_id
+            FROM ascendants AS D
+                JOIN "{noderelation}" AS R ON D.parent_id = R.child_id
+                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
+            WHERE R.is_node_link IS FALSE
+            AND D.node_license_id IS NULL
+    ) SELECT node_id, node_license_id FROM ascendants WHERE node_license_id IS NOT NULL;""")
+
     # Dictionary field mapping user id to a list of nodes in node.nodes which the user has subscriptions for
     # {<User.id>: [<Node._id>, <Node2._id>, ...] }
     # TODO: Can this be a reference instead of data?
@@ -712,8 +736,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             update_share(_node)
         from website import search
         try:
-            serialize = functools.partial(search.search.update_node, index=index, bulk=True, async_update=False)
-            search.search.bulk_update_nodes(serialize, nodes, index=index)
+            search.search.bulk_update_node_search(nodes, index=index)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception(e)
@@ -1008,6 +1031,23 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                 return NodeLicenseRecord.from_db(self._state.db, None, res)
         return None
 
+    @classmethod
+    def get_licenses(cls, nodes):
+        """Return {node id: NodeLicenseRecord or None} for `nodes`, as `license` would, in at most two queries"""
+        license_ids = {node.id: node.node_license_id for node in nodes}
+        inheriting = [node_id for node_id, license_id in license_ids.items() if not license_id]
+        if inheriting:
+            with connection.cursor() as cursor:
+                cursor.execute(cls.BULK_LICENSE_QUERY.format(
+                    abstractnode=AbstractNode._meta.db_table,
+                    noderelation=NodeRelation._meta.db_table,
+                ), [inheriting])
+                license_ids.update(cursor.fetchall())
+        records = NodeLicenseRecord.objects.select_related('node_license').in_bulk(
+            [license_id for license_id in set(license_ids.values()) if license_id]
+        )
+        return {node_id: records.get(license_id) for node_id, license_id in license_ids.items()}
+
     @property
     def all_tags(self):
         """Return a queryset containing all of this node's tags (incl. system tags)."""
@@ -2368,6 +2408,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         key = cache_settings.STORAGE_USAGE_KEY.format(target_id=self._id)
 
         storage_usage_total = storage_usage_cache.get(key)
+        if storage_usage_total is not None:
+            return storage_usage_total
+        storage_usage_total = get_stored_storage_usage(self)  # sets cache
         if storage_usage_total is not None:
             return storage_usage_total
         else:
@@ -0,0 +1,156 @@
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+
+from .base import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Sum the versions of one page of a node's OSF Storage files, keyed on file id so that
+# each page is an index range scan instead of an ever growing OFFSET
+STORAGE_USAGE_PAGE_SQL = """
+    SELECT max(file_page.id), count(*), sum(file_page.size)
+    FROM (
+        SELECT file.id, (
+            SELECT sum(version.size)
+            FROM osf_basefileversionsthrough AS obfnv
+            JOIN osf_fileversion AS version ON obfnv.fileversion_id = version.id
+            WHERE obfnv.basefilenode_id = file.id
+        ) AS size
+        FROM osf_basefilenode AS file
+        WHERE file.provider = 'osfstorage'
+        AND file.target_content_type_id = %s
+        AND file.target_object_id = %s
+        AND file.deleted_on IS NULL
+        AND file.id > %s
+        ORDER BY file.id
+        LIMIT %s
+    ) AS file_page
+"""
+
+STORAGE_USAGE_MANY_SQL = """
+    SELECT file.target_object_id, sum(version.size)
+    FROM osf_basefilenode AS file
+    JOIN osf_basefileversionsthrough AS obfnv ON obfnv.basefilenode_id = file.id
+    JOIN osf_fileversion AS version ON obfnv.fileversion_id = version.id
+    WHERE file.provider = 'osfstorage'
+    AND file.target_content_type_id = %s
+    AND file.target_object_id IN %s
+    AND file.deleted_on IS NULL
+    GROUP BY file.target_object_id
+"""
+
+
+class NodeStorageUsage(BaseModel):
+    """Bytes stored in OSF Storage by a node.
+
+    Kept current from WaterButler file events by `add`, which is what fills the cached
+    `AbstractNode.storage_usage`. `reconcile` recomputes the total from file versions to
+    create the counter or repair drift.
+    """
+    node = models.OneToOneField('AbstractNode', related_name='storage_usage_counter', on_delete=models.CASCADE)
+    total = models.BigIntegerField(default=0)
+
+    @classmethod
+    def get_total(cls, node_id):
+        """Return the stored usage of a node, or None if it has not been counted yet."""
+        return cls.objects.filter(node_id=node_id).values_list('total', flat=True).first()
+
+    @classmethod
+    def add(cls, node_id, delta):
+        """Add `delta` bytes to the usage of a node.
+
+        :return: The new total, or None if the node has not been counted yet
+        """
+        with transaction.atomic():
+            counter = cls.objects.select_for_update().filter(node_id=node_id).first()
+            if counter is None:
+                return None
+            counter.total = max(counter.total + delta, 0)
+            counter.save(update_fields=['total', 'modified'])
+        return counter.total
+
+    @staticmethod
+    def _node_content_type_id():
+        from osf.models import AbstractNode
+        return ContentType.objects.get_for_model(AbstractNode).id
+
+    @classmethod
+    def compute(cls, node_id, per_page=10000):
+        """Sum the sizes of a node's OSF Storage file versions, `per_page` files at a time."""
+        content_type_id = cls._node_content_type_id()
+        last_id = 0
+        total = 0
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(STORAGE_USAGE_PAGE_SQL, [content_type_id, node_id, last_id, per_page])
+                last_id, count, size = cursor.fetchone()
+                if not count:
+                    break
+                total += int(size or 0)
+        return total
+
+    @classmethod
+    def compute_many(cls, node_ids):
+        """Sum the sizes of the OSF Storage file versions of several nodes in one query.
+
+        :return dict: node id -> bytes
+        """
+        totals = dict.fromkeys(node_ids, 0)
+        if not totals:
+            return totals
+        with connection.cursor() as cursor:
+            cursor.execute(STORAGE_USAGE_MANY_SQL, [cls._node_content_type_id(), tuple(totals)])
+            totals.update((node_id, int(size or 0)) for node_id, size in cursor.fetchall())
+        return totals
+
+    @classmethod
+    def reconcile(cls, node_id, per_page=10000):
+        """Recompute the usage of a node and store it, creating the counter if needed.
+
+        The counter is locked while computing, so concurrent `add` calls are applied after the
+        new total rather than lost.
+
+        :return int: The recomputed total
+        """
+        with transaction.atomic():
+            counter, created = cls.objects.select_for_update().get_or_create(node_id=node_id)
+            total = cls.compute(node_id, per_page=per_page)
+            if created or counter.total != total:
+                if not created:
+                    logger.warning(f'Stored storage usage of node {node_id} was {counter.total}, recomputed {total}')
+                counter.total = total
+                counter.save(update_fields=['total', 'modified'])
+        return total
+
+    @classmethod
+    def reconcile_many(cls, node_ids, dry_run=False):
+        """Recompute the usage of several nodes with one aggregate query and store it.
+
+        :param bool dry_run: Only report drift, do not write anything
+        :return tuple: ({node id: total}, {node id: (stored total or None, total)} for nodes that drifted)
+        """
+        with transaction.atomic():
+            counters = {
+                counter.node_id: counter
+                for counter in cls.objects.select_for_update().filter(node_id__in=node_ids).order_by('node_id')
+            }
+            totals = cls.compute_many(node_ids)
+            drifted = {}
+            for node_id, total in totals.items():
+                counter = counters.get(node_id)
+                if counter is None or counter.total != total:
+                    drifted[node_id] = (counter and counter.total, total)
+            if not dry_run:
+                changed = []
+                for node_id, (_, total) in drifted.items():
+                    if node_id in counters:
+                        counters[node_id].total = total
+                        changed.append(counters[node_id])
+                cls.objects.bulk_update(changed, ['total'])
+                cls.objects.bulk_create(
+                    [cls(node_id=node_id, total=totals[node_id]) for node_id in drifted if node_id not in counters],
+                    ignore_conflicts=True,
+                )
+        return totals, drifted
@@ -20,6 +20,7 @@ from .user import OSFUser
 from .osf_grouplog import OSFGroupLog
 from .validators import validate_email
 from osf.utils.permissions import ADMIN, READ_NODE, WRITE, MANAGER, MEMBER, MANAGE, reduce_permissions
+from osf.utils.permission_cache import invalidate_group_perms
 from osf.utils import sanitize
 from website.project import signals as project_signals
 from website.osf_groups import signals as group_signals
@@ -165,6 +166,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
             return False
 
         self.member_group.user_set.add(user)
+        invalidate_group_perms()
         if self.is_manager(user):
             self._enforce_one_manager(user)
             self.manager_group.user_set.remove(user)
@@ -207,6 +209,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
             self.add_role_updated_log(user, MANAGER, auth)
         self.manager_group.user_set.add(user)
         self.member_group.user_set.add(user)
+        invalidate_group_perms()
         self.update_search()
 
         if adding_member:
@@ -265,6 +268,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
             if self.get_group(group_name).user_set.filter(id=old.id).exists():
                 self.get_group(group_name).user_set.remove(old)
                 self.get_group(group_name).user_set.add(new)
+        invalidate_group_perms()
 
         self.update_search()
         return True
@@ -283,6 +287,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
         self._enforce_one_manager(user)
         self.manager_group.user_set.remove(user)
         self.member_group.user_set.remove(user)
+        invalidate_group_perms()
 
         self.add_log(
             OSFGroupLog.MEMBER_REMOVED,
@@ -342,6 +347,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
         permissions = self._get_node_group_perms(node, permission)
         for perm in permissions:
             assign_perm(perm, self.member_group, node)
+        invalidate_group_perms(node)
 
         params = {
             'group': self._id,
@@ -375,6 +381,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
             remove_perm(perm, self.member_group, node)
         for perm in permissions:
             assign_perm(perm, self.member_group, node)
+        invalidate_group_perms(node)
         params = {
             'group': self._id,
             'node': node._id,
@@ -397,6 +404,7 @@ class OSFGroup(GuardianMixin, Loggable, ObjectIDMixin, BaseModel):
             return False
         for perm in node.groups[ADMIN]:
             remove_perm(perm, self.member_group, node)
+        invalidate_group_perms(node)
         params = {
             'group': self._id,
             'node': node._id,
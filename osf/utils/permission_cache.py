@@ -0,0 +1,112 @@
+"""
+A request-scoped cache of guardian group permissions.
+
+Checking a user's permissions on an object goes through guardian's `get_group_perms`,
+which costs a query per (user, object) pair. List views and embedded responses repeat
+the same checks many times per request, so the results are memoized on the current
+request, and a whole page of objects can be loaded for a user in a single query.
+
+Outside of a Django or Flask request nothing is cached, so celery tasks, scripts and
+management commands always see the current state of the database.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from guardian.shortcuts import get_group_perms
+from guardian.utils import get_group_obj_perms_model
+
+from osf.utils.requests import DummyRequest, get_current_request
+
+CACHE_ATTR = '_permission_cache'
+
+
+def _get_cache():
+    """Return the permission cache for the current request, or `None` if there is no request."""
+    req = get_current_request()
+    if isinstance(req, DummyRequest):
+        return None
+    # DRF wraps the django request; store the cache on the underlying request, like the embed cache
+    req = getattr(req, '_request', req)
+    cache = getattr(req, CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        try:
+            setattr(req, CACHE_ATTR, cache)
+        except AttributeError:
+            return None
+    return cache
+
+
+def _cache_key(user, obj):
+    return (user.id, obj._meta.label_lower, obj.pk)
+
+
+def get_cached_group_perms(user, obj):
+    """Return the set of permission codenames `user` has on `obj` through group membership.
+
+    Equivalent to `guardian.shortcuts.get_group_perms`, memoized for the current request.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return set(get_group_perms(user, obj))
+    key = _cache_key(user, obj)
+    if key not in cache:
+        cache[key] = frozenset(get_group_perms(user, obj))
+    return cache[key]
+
+
+def prefetch_group_perms(user, objects):
+    """Load the group permissions of `user` for every object in `objects` with one query per model.
+
+    Results are stored in the request cache so that subsequent `has_permission` and
+    `get_permissions` calls on these objects do not hit the database.
+
+    :param OSFUser user: User whose permissions to load
+    :param iterable objects: Model instances, typically a page of a list view
+    """
+    cache = _get_cache()
+    if cache is None or not user or user.is_anonymous:
+        return
+
+    by_model = defaultdict(dict)
+    for obj in objects:
+        if obj is None or obj.pk is None:
+            continue
+        if _cache_key(user, obj) not in cache:
+            by_model[type(obj)][obj.pk] = obj
+
+    for model, objs_by_pk in by_model.items():
+        group_model = get_group_obj_perms_model(model)
+        queryset = group_model.objects.filter(group__user=user)
+        if group_model.objects.is_generic():
+            content_type = ContentType.objects.get_for_model(model)
+            queryset = queryset.filter(
+                content_type=content_type,
+                object_pk__in=[str(pk) for pk in objs_by_pk],
+            )
+            pk_field, to_pk = 'object_pk', model._meta.pk.to_python
+        else:
+            queryset = queryset.filter(content_object_id__in=list(objs_by_pk))
+            pk_field, to_pk = 'content_object_id', lambda pk: pk
+
+        perms = defaultdict(set)
+        for pk, codename in queryset.values_list(pk_field, 'permission__codename'):
+            perms[to_pk(pk)].add(codename)
+        for pk, obj in objs_by_pk.items():
+            cache[_cache_key(user, obj)] = frozenset(perms[pk])
+
+
+def invalidate_group_perms(obj=None):
+    """Drop cached permissions for `obj`, or the whole request cache if `obj` is not given.
+
+    Must be called whenever group membership or group object permissions change.
+    """
+    cache = _get_cache()
+    if not cache:
+        return
+    if obj is None:
+        cache.clear()
+        return
+    label = obj._meta.label_lower
+    for key in [key for key in cache if key[1] == label and key[2] == obj.pk]:
+        del cache[key]
@@ -20,7 +20,7 @@ class TestRecatalogMetadata:
 
     @pytest.fixture
     def mock_update_share_task(self):
-        with mock.patch('osf.management.commands.recatalog_metadata.task__update_share') as _shmock:
+        with mock.patch('osf.management.commands.recatalog_metadata.task__update_share_many') as _shmock:
             yield _shmock
 
     @pytest.fixture
@@ -166,7 +166,7 @@ class TestRecatalogMetadata:
             '--chunk-size=3',
             '--chunk-count=1',
         )
-        assert mock_update_share_task.apply_async.mock_calls == expected_apply_async_calls(registrations[1:4])
+        assert mock_update_share_task.apply_async.mock_calls == expected_apply_async_calls(registrations[1:4], chunk_size=3)
 
         mock_update_share_task.reset_mock()
 
@@ -179,7 +179,7 @@ class TestRecatalogMetadata:
             '--chunk-size=2',
             '--chunk-count=2',
         )
-        assert mock_update_share_task.apply_async.mock_calls == expected_apply_async_calls(registrations[2:6])
+        assert mock_update_share_task.apply_async.mock_calls == expected_apply_async_calls(registrations[2:6], chunk_size=2)
 
         mock_update_share_task.reset_mock()
 
@@ -190,8 +190,9 @@ class TestRecatalogMetadata:
         )
         _expected_osfids = set(_iter_osfids(items_with_custom_datacite_type))
         _actual_osfids = {
-            _call[-1]['kwargs']['guid']
+            _osfid
             for _call in mock_update_share_task.apply_async.mock_calls
+            for _osfid in _call[-1]['kwargs']['guids']
         }
         assert _expected_osfids == _actual_osfids
 
@@ -199,16 +200,17 @@ class TestRecatalogMetadata:
 ###
 # local utils
 
-def expected_apply_async_calls(items):
+def expected_apply_async_calls(items, chunk_size=500):
+    _osfids = list(_iter_osfids(items))
     return [
         mock.call(
             kwargs={
-                'guid': _osfid,
+                'guids': _osfids[_i:_i + chunk_size],
                 'is_backfill': True,
             },
             queue='low',
         )
-        for _osfid in _iter_osfids(items)
+        for _i in range(0, len(_osfids), chunk_size)
     ]
 
 
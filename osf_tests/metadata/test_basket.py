@@ -80,3 +80,47 @@ def test_goodbasket():
     basket.reset()
     assert len(basket.gathered_metadata) == 1
     assert len(basket._gathertasks_done) == 0
+
+
+def test_gather_many():
+    MANY = rdflib.Namespace('https://many.example/')
+    focuses = [gather.Focus(MANY[f'item{i}'], MANY.Type) for i in range(3)]
+    part_focus = gather.Focus(MANY.part, MANY.Type)
+
+    def gather_zork(focus):
+        yield (MANY.zork, focus.iri)
+
+    def gather_part(focus):
+        yield (MANY.part, part_focus)
+
+    mock_zork = mock.Mock(side_effect=gather_zork)
+    mock_zork_many = mock.Mock(side_effect=lambda focuses: (
+        (focus, (MANY.zork, focus.iri))
+        for focus in focuses
+    ))
+    mock_part = mock.Mock(side_effect=gather_part)
+    zork_gatherer = gather.er(MANY.zork)(mock_zork)
+    gather.er_many(zork_gatherer)(mock_zork_many)
+    gather.er(MANY.part)(mock_part)
+
+    baskets = [gather.Basket(focus) for focus in focuses]
+    gather.pls_gather_many(
+        (basket, {MANY.part: {MANY.zork: None}})
+        for basket in baskets
+    )
+    # one batch for the parts of every basket, none for the focuses (no zork asked of them)
+    mock_zork_many.assert_called_once_with([part_focus])
+    mock_zork.assert_not_called()
+    assert mock_part.call_count == 3
+    for basket in baskets:
+        assert set(basket[MANY.part]) == {MANY.part}
+        assert set(basket[MANY.part / MANY.zork]) == {MANY.part}
+    mock_zork.assert_not_called()
+
+    # batch variants run for all the focuses at once
+    baskets = [gather.Basket(focus) for focus in focuses]
+    gather.pls_gather_many((basket, [MANY.zork]) for basket in baskets)
+    mock_zork_many.assert_called_with(focuses)
+    mock_zork.assert_not_called()
+    for focus, basket in zip(focuses, baskets):
+        assert set(basket[MANY.zork]) == {focus.iri}
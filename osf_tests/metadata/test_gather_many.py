@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rdflib.compare import isomorphic
+
+from osf.metadata import gather
+from osf.metadata.osf_gathering import (
+    osfmap_for_type,
+    pls_get_magic_metadata_basket,
+    pls_get_magic_metadata_baskets,
+)
+from osf.metadata.tools import pls_gather_many, pls_gather_metadata_file
+from osf_tests import factories
+
+
+def gather_each(osf_items):
+    baskets = [pls_get_magic_metadata_basket(osf_item) for osf_item in osf_items]
+    for basket in baskets:
+        basket.pls_gather(osfmap_for_type(basket.focus.rdftype))
+    return baskets
+
+
+def gather_together(osf_items):
+    baskets = pls_get_magic_metadata_baskets(osf_items)
+    gather.pls_gather_many(
+        (basket, osfmap_for_type(basket.focus.rdftype))
+        for basket in baskets
+    )
+    return baskets
+
+
+def make_items():
+    user = factories.AuthUserFactory()
+    institution = factories.InstitutionFactory()
+    user.add_or_update_affiliated_institution(institution)
+    project = factories.ProjectFactory(creator=user, is_public=True)
+    project.affiliated_institutions.add(institution)
+    project.add_contributor(factories.UserFactory(), visible=True, save=True)
+    preprint = factories.PreprintFactory(creator=user)
+    registration = factories.RegistrationFactory(creator=user, is_public=True)
+    return [project, preprint, registration, user, preprint.primary_file]
+
+
+@pytest.mark.django_db
+class TestGatherMany:
+
+    def test_same_metadata_as_one_at_a_time(self):
+        osf_items = make_items()
+        osf_items[-1].get_guid(create=True)
+        for each_basket, together_basket in zip(gather_each(osf_items), gather_together(osf_items)):
+            assert each_basket.focus == together_basket.focus
+            assert isomorphic(each_basket.gathered_metadata, together_basket.gathered_metadata)
+
+    def test_pls_gather_many(self):
+        osf_items = make_items()[:3]
+        assert pls_gather_many([osf_items[0]._id, *osf_items[1:]], 'turtle') == [
+            pls_gather_metadata_file(osf_item, 'turtle')
+            for osf_item in osf_items
+        ]
+
+    def test_fewer_queries_than_one_at_a_time(self):
+        projects = [factories.ProjectFactory(is_public=True) for _ in range(4)]
+        with CaptureQueriesContext(connection) as each_queries:
+            gather_each(projects)
+        with CaptureQueriesContext(connection) as together_queries:
+            gather_together(projects)
+        assert len(together_queries) < len(each_queries)
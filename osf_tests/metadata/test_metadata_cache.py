@@ -0,0 +1,90 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from api.share.utils import update_share
+from osf.metadata import tools
+from osf.models import GuidMetadataRecord, Identifier
+from osf_tests import factories
+from website import settings
+
+
+@pytest.fixture()
+def metadata_cache():
+    with mock.patch.object(settings, 'METADATA_CACHE_ENABLED', True), \
+            mock.patch.object(settings, 'METADATA_CACHE_NAME', 'default'):
+        yield
+    caches['default'].clear()
+
+
+@pytest.fixture()
+def project():
+    return factories.ProjectFactory(title='Cached project', is_public=True)
+
+
+@pytest.fixture()
+def gather_basket():
+    with mock.patch.object(tools, 'pls_get_magic_metadata_basket', wraps=tools.pls_get_magic_metadata_basket) as mock_gather:
+        yield mock_gather
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('metadata_cache')
+class TestMetadataCache:
+
+    def test_unchanged_item_is_gathered_once(self, project, gather_basket):
+        first = tools.pls_gather_metadata_file(project, 'turtle')
+        second = tools.pls_gather_metadata_file(project, 'turtle')
+        assert second == first
+        assert gather_basket.call_count == 1
+
+    def test_formats_and_configs_are_cached_apart(self, project, gather_basket):
+        turtle = tools.pls_gather_metadata_file(project, 'turtle')
+        datacite = tools.pls_gather_metadata_file(project, 'datacite-xml', {'doi_value': '10.1234/a'})
+        other_doi = tools.pls_gather_metadata_file(project, 'datacite-xml', {'doi_value': '10.1234/b'})
+        assert gather_basket.call_count == 3
+        assert turtle.mediatype != datacite.mediatype
+        assert b'10.1234/b' in other_doi.serialized_metadata
+
+    def test_saving_item_changes_version(self, project, gather_basket):
+        tools.pls_gather_metadata_file(project, 'turtle')
+        project.title = 'Renamed project'
+        project.save()
+        result = tools.pls_gather_metadata_file(project, 'turtle')
+        assert gather_basket.call_count == 2
+        assert 'Renamed project' in result.serialized_metadata
+
+    def test_metadata_record_changes_version(self, project, gather_basket):
+        tools.pls_gather_metadata_file(project, 'turtle')
+        record = GuidMetadataRecord.objects.for_guid(project._id)
+        record.language = 'en'
+        record.save()
+        tools.pls_gather_metadata_file(project, 'turtle')
+        assert gather_basket.call_count == 2
+
+    def test_identifier_changes_version(self, project, gather_basket):
+        tools.pls_gather_metadata_file(project, 'turtle')
+        Identifier.objects.create(referent=project, category='doi', value='10.1234/cached')
+        result = tools.pls_gather_metadata_file(project, 'turtle')
+        assert gather_basket.call_count == 2
+        assert '10.1234/cached' in result.serialized_metadata
+
+    def test_invalidate(self, project, gather_basket):
+        tools.pls_gather_metadata_file(project, 'turtle')
+        tools.invalidate_metadata_cache(project)
+        tools.pls_gather_metadata_file(project, 'turtle')
+        assert gather_basket.call_count == 2
+
+    def test_update_share_invalidates(self, project, gather_basket):
+        tools.pls_gather_metadata_file(project, 'turtle')
+        update_share(project)
+        tools.pls_gather_metadata_file(project, 'turtle')
+        assert gather_basket.call_count == 2
+
+    def test_cache_unavailable(self, project, gather_basket):
+        with mock.patch.object(tools, 'caches', {}):
+            first = tools.pls_gather_metadata_file(project, 'turtle')
+            second = tools.pls_gather_metadata_file(project, 'turtle')
+        assert first == second
+        assert gather_basket.call_count == 2
@@ -0,0 +1,107 @@
+import datetime
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from osf.management.commands.daily_reporters_go import daily_reporters_go
+from osf.metrics.reporters import InstitutionSummaryReporter, NodeCountReporter
+from osf.models import Node, Registration
+from osf.models.spam import SpamStatus
+from osf_tests.factories import (
+    AuthUserFactory,
+    InstitutionFactory,
+    NodeFactory,
+    ProjectFactory,
+    RegistrationFactory,
+)
+
+
+def report_dict(report):
+    return {key: value for key, value in report.to_dict().items() if key != 'report_date'}
+
+
+@pytest.fixture()
+def today():
+    return timezone.now().date()
+
+
+@pytest.fixture()
+def institution():
+    return InstitutionFactory()
+
+
+@pytest.fixture()
+def nodes(institution):
+    user = AuthUserFactory()
+    project = ProjectFactory(creator=user, is_public=True)
+    component = NodeFactory(creator=user, parent=project)
+    ProjectFactory(creator=user, spam_status=SpamStatus.SPAM)
+    registration = RegistrationFactory(creator=user, project=project, is_public=True)
+    for node in (project, component, registration):
+        node.affiliated_institutions.add(institution)
+    return project, component, registration
+
+
+@pytest.mark.django_db
+class TestNodeCountReporter:
+
+    def test_matches_separate_counts(self, nodes, today):
+        [report] = NodeCountReporter().report(today)
+        node_qs = Node.objects.filter(deleted__isnull=True, created__date__lte=today)
+        registration_qs = Registration.objects.filter(deleted__isnull=True, created__date__lte=today)
+        assert report.nodes.total == node_qs.count()
+        assert report.nodes.total_excluding_spam == node_qs.exclude(spam_status__in=[SpamStatus.SPAM, SpamStatus.FLAGGED]).count()
+        assert report.nodes.public_daily == node_qs.filter(is_public=True, created__date=today).count()
+        assert report.projects.total == node_qs.get_roots().count()
+        assert report.projects.private == node_qs.filter(is_public=False).get_roots().count()
+        assert report.registered_nodes.total == registration_qs.count()
+        assert report.registered_projects.public == registration_qs.filter(is_public=True).get_roots().count()
+        assert report.registered_projects.withdrawn == 0
+
+    def test_nothing_before_creation(self, nodes, today):
+        [report] = NodeCountReporter().report(today - datetime.timedelta(days=1))
+        assert report.nodes.total == 0
+        assert report.registered_projects.total == 0
+
+    def test_report_many(self, nodes, today):
+        dates = [today - datetime.timedelta(days=days) for days in range(10, -1, -1)]
+        reporter = NodeCountReporter()
+        reports = list(reporter.report_many(dates))
+        assert [report.report_date for report in reports] == dates
+        for date, report in zip(dates, reports):
+            [single] = reporter.report(date)
+            assert report_dict(report) == report_dict(single)
+
+
+@pytest.mark.django_db
+class TestInstitutionSummaryReporter:
+
+    def test_grouped_by_institution(self, nodes, institution, today):
+        other_institution = InstitutionFactory()
+        reports = {
+            report.institution_id: report
+            for report in InstitutionSummaryReporter().report(today)
+        }
+        report = reports[institution._id]
+        assert report.nodes.total == 2
+        assert report.nodes.public == 1
+        assert report.projects.total == 1
+        assert report.registered_nodes.total == 1
+        assert report.registered_projects.public == 1
+        assert report.nodes.total_excluding_spam is None
+
+        other_report = reports[other_institution._id]
+        assert other_report.nodes.total == 0
+        assert other_report.users.total == 0
+
+
+@pytest.mark.django_db
+def test_daily_reporters_go_backfills_dates(today):
+    start = today - datetime.timedelta(days=2)
+    with mock.patch.object(NodeCountReporter, 'run_and_record_for_dates') as mock_run:
+        daily_reporters_go(report_date=start, end_date=today, reporter_filter='nodecount')
+    mock_run.assert_called_once_with(
+        report_dates=[start, start + datetime.timedelta(days=1), today],
+        also_send_to_keen=False,
+    )
@@ -3,15 +3,19 @@ Unit tests for analytics logic in framework/analytics/__init__.py
 """
 
 import pytest
+from unittest import mock
+from django.core.cache import caches
 from django.utils import timezone
 from django.conf import settings as django_conf_settings
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from importlib import import_module
 
 from addons.osfstorage.models import OsfStorageFile
 from framework import analytics
-from osf.models import PageCounter, OSFGroup
+from framework.analytics.buffer import CounterBuffer
+from osf.models import PageCounter, OSFGroup, UserActivityCounter
+from osf.models import analytics as analytics_models
 
 from tests.base import OsfTestCase
 from osf_tests.factories import UserFactory, ProjectFactory
@@ -174,3 +178,148 @@ class TestPageCounter:
         total_downloads = PageCounter.get_all_downloads_on_date(date)
 
         assert total_downloads == 45
+
+
+@pytest.fixture()
+def buffered():
+    with mock.patch.object(analytics_models.settings, 'PAGE_COUNTER_BUFFER_ENABLED', True), \
+            mock.patch.object(analytics_models.page_counter_buffer, 'cache_name', 'default'), \
+            mock.patch('framework.analytics.buffer.time.time') as mock_time:
+        caches['default'].clear()
+        mock_time.return_value = 1_000_000
+        yield mock_time
+        caches['default'].clear()
+
+
+@pytest.mark.django_db
+class TestBufferedPageCounter:
+
+    def flush_later(self, mock_time):
+        # move past the grace window, so the buffered window is closed
+        mock_time.return_value += analytics_models.page_counter_buffer.interval * 3
+        return PageCounter.flush_buffer()
+
+    def test_update_counter_is_buffered(self, buffered, project, file_node):
+        session = SessionStore()
+        session['auth_user_id'] = 'yeji'
+        session.create()
+        resource = project.guids.first()
+        for _ in range(3):
+            PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={}, session_key=session.session_key)
+
+        assert not PageCounter.objects.filter(resource=resource, file=file_node).exists()
+        assert PageCounter.get_basic_counters(resource, file_node, version=None, action='download') == (1, 3)
+
+        assert self.flush_later(buffered) == 1
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 3
+        assert page_counter.unique == 1
+        date_string = timezone.now().strftime('%Y/%m/%d')
+        assert page_counter.date[date_string] == {'total': 3, 'unique': 1}
+        assert PageCounter.get_basic_counters(resource, file_node, version=None, action='download') == (1, 3)
+
+    def test_flush_does_not_apply_twice(self, buffered, project, file_node):
+        resource = project.guids.first()
+        PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={}, session_key=None)
+        self.flush_later(buffered)
+        assert PageCounter.flush_buffer() == 0
+        assert PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download').total == 1
+
+    def test_open_window_is_not_flushed(self, buffered, project, file_node):
+        resource = project.guids.first()
+        PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={}, session_key=None)
+        assert PageCounter.flush_buffer() == 0
+        assert not PageCounter.objects.filter(resource=resource, file=file_node).exists()
+
+    def test_contributor_downloads_only_count_daily(self, buffered, user, project, file_node):
+        session = SessionStore()
+        session['auth_user_id'] = user._id
+        session.create()
+        resource = project.guids.first()
+        PageCounter.update_counter(resource, file_node, version=None, action='download', node_info={'contributors': project.contributors}, session_key=session.session_key)
+        self.flush_later(buffered)
+
+        page_counter = PageCounter.objects.get(resource=resource, file=file_node, version=None, action='download')
+        assert page_counter.total == 0
+        assert page_counter.unique == 0
+        assert page_counter.date[timezone.now().strftime('%Y/%m/%d')] == {'total': 1, 'unique': 1}
+
+
+@pytest.fixture()
+def buffered_activity():
+    with mock.patch.object(analytics_models.settings, 'USER_ACTIVITY_BUFFER_ENABLED', True), \
+            mock.patch.object(analytics_models.user_activity_buffer, 'cache_name', 'default'), \
+            mock.patch('framework.analytics.buffer.time.time') as mock_time:
+        caches['default'].clear()
+        mock_time.return_value = 1_000_000
+        yield mock_time
+        caches['default'].clear()
+
+
+@pytest.mark.django_db
+class TestBufferedUserActivityCounter:
+
+    def flush_later(self, mock_time):
+        mock_time.return_value += analytics_models.user_activity_buffer.interval * 3
+        return UserActivityCounter.flush_buffer()
+
+    def test_record_user_activity_is_buffered(self, buffered_activity, user):
+        date = timezone.now()
+        for _ in range(3):
+            analytics.record_user_activity(user._id, 'project_created', date.isoformat())
+        analytics.record_user_activity(user._id, 'file_added', date.isoformat())
+        assert user.get_activity_points() == 0
+
+        assert self.flush_later(buffered_activity) == 2
+        assert user.get_activity_points() == 4
+
+    def test_flush_matches_increment(self, buffered_activity, user):
+        other = UserFactory()
+        today = timezone.now()
+        yesterday = today - timedelta(days=1)
+        events = [
+            ('project_created', today),
+            ('project_created', today),
+            ('project_created', yesterday),
+            ('file_added', today),
+        ]
+        for action, date in events:
+            UserActivityCounter.increment(user._id, action, date.isoformat())
+        # merge into an existing row, and create a missing one
+        for action, date in events:
+            UserActivityCounter.buffer_increment(user._id, action, date.isoformat())
+            UserActivityCounter.buffer_increment(other._id, action, date.isoformat())
+        self.flush_later(buffered_activity)
+
+        counter = UserActivityCounter.objects.get(_id=user._id)
+        other_counter = UserActivityCounter.objects.get(_id=other._id)
+        assert counter.total == 8
+        assert counter.action['project_created']['total'] == 6
+        assert counter.action['project_created']['date'][today.strftime('%Y/%m/%d')] == 4
+        assert counter.action['file_added']['date'][today.strftime('%Y/%m/%d')] == 2
+        assert counter.date[yesterday.strftime('%Y/%m/%d')] == {'total': 2}
+        assert other_counter.total == 4
+        assert other_counter.action == {
+            'project_created': {
+                'total': 3,
+                'date': {today.strftime('%Y/%m/%d'): 2, yesterday.strftime('%Y/%m/%d'): 1},
+            },
+            'file_added': {'total': 1, 'date': {today.strftime('%Y/%m/%d'): 1}},
+        }
+        assert other_counter.date == {today.strftime('%Y/%m/%d'): {'total': 3}, yesterday.strftime('%Y/%m/%d'): {'total': 1}}
+
+    def test_flush_does_not_apply_twice(self, buffered_activity, user):
+        UserActivityCounter.buffer_increment(user._id, 'project_created', timezone.now().isoformat())
+        self.flush_later(buffered_activity)
+        assert UserActivityCounter.flush_buffer() == 0
+        assert user.get_activity_points() == 1
+
+    def test_flush_given_buffer(self, user):
+        now = [1_000_000]
+        buffer = CounterBuffer('useractivity_test', 'default', 60, clock=lambda: now[0])
+        UserActivityCounter.buffer_increment(user._id, 'project_created', timezone.now().isoformat(), buffer=buffer)
+        assert UserActivityCounter.flush_buffer(buffer=buffer) == 0
+        now[0] += buffer.interval * 3
+        assert UserActivityCounter.flush_buffer(buffer=buffer) == 1
+        assert user.get_activity_points() == 1
+        caches['default'].clear()
@@ -1,10 +1,12 @@
+import gzip
 import os
 
 import pytest
 from unittest import mock
 import shutil
 import tempfile
-import xml
+import xml.dom.minidom
+import xml.etree.ElementTree
 from urllib.parse import urljoin
 from django.utils import timezone
 
@@ -33,9 +35,50 @@ def get_all_sitemap_urls():
     return urls
 
 
+def minidom_urlset(urls):
+    # The document the script used to build for each sitemap file
+    doc = xml.dom.minidom.Document()
+    urlset = doc.createElement('urlset')
+    urlset.setAttribute('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
+    doc.appendChild(urlset)
+    for config in urls:
+        url = doc.createElement('url')
+        urlset.appendChild(url)
+        for name, text in config.items():
+            tag = doc.createElement(name)
+            url.appendChild(tag)
+            tag.appendChild(doc.createTextNode(text))
+    return doc.toprettyxml(indent='  ', encoding='utf-8')
+
+
+@pytest.mark.parametrize('urls', [
+    [],
+    [{'loc': 'https://osf.io/abcde/', 'changefreq': 'yearly', 'priority': '0.5'}],
+    [{'loc': 'https://osf.io/search/?q="a" & <b>', 'lastmod': ''}, {'loc': 'https://osf.io/ü/'}],
+])
+def test_sitemap_file_matches_minidom(urls):
+    path = os.path.join(tempfile.mkdtemp(), 'sitemap_0.xml')
+    sitemap_file = generate_sitemap.SitemapFile(path, 'urlset')
+    for config in urls:
+        sitemap_file.add('url', config)
+    sitemap_file.close()
+
+    with open(path, 'rb') as f:
+        assert f.read() == minidom_urlset(urls)
+    with gzip.open(path + '.gz') as f:
+        assert f.read() == minidom_urlset(urls)
+    shutil.rmtree(os.path.dirname(path))
+
+
 @pytest.mark.django_db
 class TestGenerateSitemap:
 
+    @pytest.fixture(autouse=True)
+    def read_sources_in_main_thread(self):
+        # Objects created by the tests are only visible to the test's own connection
+        with mock.patch.object(settings, 'SITEMAP_SOURCE_WORKERS', 1):
+            yield
+
     @pytest.fixture(autouse=True)
     def user_admin_project_public(self):
         return AuthUserFactory()
@@ -186,3 +229,46 @@ class TestGenerateSitemap:
             urls = get_all_sitemap_urls()
 
         assert urljoin(settings.DOMAIN, project_deleted.url) not in urls
+
+    def test_sitemap_files_roll_over(self, all_included_links, create_tmp_directory):
+        with mock.patch('website.settings.STATIC_FOLDER', create_tmp_directory), \
+                mock.patch.object(settings, 'SITEMAP_URL_MAX', 5), \
+                mock.patch.object(settings, 'SITEMAP_QUERY_CHUNK_SIZE', 2):
+            generate_sitemap.main()
+
+        sitemap_dir = os.path.join(create_tmp_directory, 'sitemaps')
+        namespace = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+        index = xml.etree.ElementTree.parse(os.path.join(sitemap_dir, 'sitemap_index.xml'))
+        locs = [element.text for element in index.iter(namespace + 'loc')]
+        assert locs == [
+            urljoin(settings.DOMAIN, f'sitemaps/sitemap_{i}.xml') for i in range(len(locs))
+        ]
+        assert len(locs) == -(-len(all_included_links) // 5)
+
+        urls = []
+        for i in range(len(locs)):
+            path = os.path.join(sitemap_dir, f'sitemap_{i}.xml')
+            with open(path, 'rb') as f, gzip.open(path + '.gz') as f_gz:
+                content = f.read()
+                assert f_gz.read() == content
+            urls.extend(element.text for element in xml.etree.ElementTree.fromstring(content).iter(namespace + 'loc'))
+        shutil.rmtree(create_tmp_directory)
+
+        assert len(urls) == len(all_included_links)
+        assert set(urls) == set(all_included_links)
+
+    def test_without_uncompressed_copy(self, all_included_links, create_tmp_directory):
+        with mock.patch('website.settings.STATIC_FOLDER', create_tmp_directory), \
+                mock.patch.object(settings, 'SITEMAP_WRITE_UNCOMPRESSED', False):
+            generate_sitemap.main()
+
+        sitemap_dir = os.path.join(create_tmp_directory, 'sitemaps')
+        assert sorted(os.listdir(sitemap_dir)) == ['sitemap_0.xml.gz', 'sitemap_index.xml']
+        with open(os.path.join(sitemap_dir, 'sitemap_index.xml')) as f:
+            assert urljoin(settings.DOMAIN, 'sitemaps/sitemap_0.xml.gz') in f.read()
+        with gzip.open(os.path.join(sitemap_dir, 'sitemap_0.xml.gz')) as f:
+            tree = xml.etree.ElementTree.parse(f)
+        shutil.rmtree(create_tmp_directory)
+
+        namespace = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+        assert {element.text for element in tree.iter(namespace + 'loc')} == set(all_included_links)
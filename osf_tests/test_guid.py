@@ -5,6 +5,14 @@ from django.utils import timezone
 from django.core.exceptions import MultipleObjectsReturned
 
 from osf.models import Guid, NodeLicenseRecord, OSFUser
+from osf.models.base import (
+    BlackListGuid,
+    InvalidGuid,
+    bulk_create_guids,
+    coerce_guids,
+    deferred_guid_creation,
+    generate_guids,
+)
 from osf_tests.factories import AuthUserFactory, UserFactory, NodeFactory, NodeLicenseRecordFactory, \
     RegistrationFactory, PreprintFactory, PreprintProviderFactory
 from osf.utils.permissions import ADMIN
@@ -129,6 +137,85 @@ class TestReferent:
             pytest.fail(f'Multiple objects returned for {Factory._meta.model} with multiple guids. {ex}')
 
 
+@pytest.mark.django_db
+class TestBatchedGuidResolution:
+
+    @pytest.mark.parametrize('Factory',
+    [
+        UserFactory,
+        NodeFactory,
+    ])
+    def test_with_primary_guid(self, Factory, django_assert_num_queries):
+        objs = [Factory() for _ in range(3)]
+        newest = Guid.objects.create(referent=objs[0])
+        Model = Factory._meta.model
+        with django_assert_num_queries(1):
+            loaded = list(Model.objects.filter(id__in=[obj.id for obj in objs]).with_primary_guid().order_by('id'))
+            assert [obj._id for obj in loaded] == [newest._id, objs[1]._id, objs[2]._id]
+
+    def test_with_primary_guid_survives_filtering(self, django_assert_num_queries):
+        node = NodeFactory()
+        queryset = NodeFactory._meta.model.objects.with_primary_guid().filter(id=node.id)
+        assert 'guids' not in queryset._prefetch_related_lookups
+        with django_assert_num_queries(1):
+            assert queryset.get()._id == node._id
+
+    def test_load_many(self, django_assert_max_num_queries):
+        nodes = [NodeFactory() for _ in range(3)]
+        node = nodes[0]
+        user = UserFactory()
+        with django_assert_max_num_queries(4):
+            # guids, then one query per content type
+            loaded = Guid.load_many([node._id, user._id.upper(), 'notaguid'])
+            assert loaded[node._id].referent == node
+            assert loaded[user._id].referent == user
+        assert 'notaguid' not in loaded
+
+    def test_coerce_guids(self):
+        node = NodeFactory()
+        user = UserFactory()
+        guid = node.guids.first()
+        assert coerce_guids([user, node._id, guid]) == [user.guids.first(), guid, guid]
+
+    def test_coerce_guids_invalid(self):
+        with pytest.raises(InvalidGuid):
+            coerce_guids([NodeFactory()._id, 'notaguid'])
+
+
+@pytest.mark.django_db
+class TestBulkGuidCreation:
+
+    def test_generate_guids(self):
+        existing = NodeFactory()._id
+        BlackListGuid.objects.create(guid='abcde')
+        with mock.patch('osf.models.base.random.sample', side_effect=[list(existing), list('abcde')] + [list(c * 5) for c in '23456789']):
+            guids = generate_guids(3)
+        assert len(set(guids)) == 3
+        assert existing not in guids
+        assert 'abcde' not in guids
+
+    def test_generate_guids_query_count(self, django_assert_num_queries):
+        with django_assert_num_queries(2):
+            guids = generate_guids(50)
+        assert len(set(guids)) == 50
+
+    def test_deferred_guid_creation(self):
+        with deferred_guid_creation():
+            users = [UserFactory() for _ in range(3)]
+            assert not Guid.objects.filter(object_id__in=[user.id for user in users]).exists()
+        for user in users:
+            assert user._id
+            assert len(user._id) == 5
+            assert OSFUser.load(user._id) == user
+
+    def test_bulk_create_guids_skips_objects_with_guids(self):
+        user = UserFactory()
+        original = user._id
+        assert bulk_create_guids([user]) == []
+        assert user.guids.count() == 1
+        assert user._id == original
+
+
 @pytest.mark.enable_bookmark_creation
 class TestResolveGuid(OsfTestCase):
 
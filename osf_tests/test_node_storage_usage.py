@@ -0,0 +1,84 @@
+import pytest
+
+from api.caching import settings as cache_settings
+from api.caching.tasks import add_storage_usage, update_storage_usage_cache, update_storage_usage_cache_many
+from api.caching.utils import storage_usage_cache
+from api_tests.utils import create_test_file
+from osf.management.commands.reconcile_storage_usage import reconcile_storage_usage
+from osf.models import NodeStorageUsage
+from osf_tests.factories import ProjectFactory
+
+
+@pytest.fixture()
+def node():
+    return ProjectFactory()
+
+
+@pytest.fixture()
+def node_with_files(node):
+    create_test_file(node, node.creator, filename='one', size=100)
+    create_test_file(node, node.creator, filename='two', size=250)
+    return node
+
+
+def cached_usage(node):
+    return storage_usage_cache.get(cache_settings.STORAGE_USAGE_KEY.format(target_id=node._id))
+
+
+@pytest.mark.django_db
+class TestNodeStorageUsage:
+
+    def test_compute_pages_through_files(self, node_with_files):
+        assert NodeStorageUsage.compute(node_with_files.id) == 350
+        assert NodeStorageUsage.compute(node_with_files.id, per_page=1) == 350
+
+    def test_compute_excludes_deleted_files(self, node_with_files):
+        create_test_file(node_with_files, node_with_files.creator, filename='three', size=50).delete()
+        assert NodeStorageUsage.compute(node_with_files.id) == 350
+
+    def test_update_storage_usage_cache_stores_counter(self, node_with_files):
+        update_storage_usage_cache(node_with_files.id, node_with_files._id)
+        assert NodeStorageUsage.get_total(node_with_files.id) == 350
+        assert cached_usage(node_with_files) == 350
+
+    def test_add_storage_usage(self, node_with_files):
+        update_storage_usage_cache(node_with_files.id, node_with_files._id)
+        add_storage_usage(node_with_files, 50)
+        assert NodeStorageUsage.get_total(node_with_files.id) == 400
+        assert cached_usage(node_with_files) == 400
+        add_storage_usage(node_with_files, -1000)
+        assert NodeStorageUsage.get_total(node_with_files.id) == 0
+
+    def test_add_storage_usage_without_counter_adjusts_cache(self, node):
+        storage_usage_cache.set(cache_settings.STORAGE_USAGE_KEY.format(target_id=node._id), 100)
+        add_storage_usage(node, 50)
+        assert cached_usage(node) == 150
+        assert NodeStorageUsage.get_total(node.id) is None
+
+    def test_storage_usage_reads_counter_on_cache_miss(self, node):
+        NodeStorageUsage.objects.create(node=node, total=123)
+        assert node.storage_usage == 123
+        assert cached_usage(node) == 123
+
+    def test_reconcile_many(self, node_with_files):
+        other = ProjectFactory()
+        create_test_file(other, other.creator, size=10)
+        NodeStorageUsage.objects.create(node=node_with_files, total=999)
+
+        totals, drifted = update_storage_usage_cache_many([node_with_files, other], dry_run=True)
+        assert totals == {node_with_files.id: 350, other.id: 10}
+        assert drifted == {node_with_files.id: (999, 350), other.id: (None, 10)}
+        assert NodeStorageUsage.get_total(node_with_files.id) == 999
+
+        update_storage_usage_cache_many([node_with_files, other])
+        assert NodeStorageUsage.get_total(node_with_files.id) == 350
+        assert NodeStorageUsage.get_total(other.id) == 10
+        assert cached_usage(other) == 10
+
+    def test_reconcile_storage_usage_repairs_drift(self, node_with_files):
+        NodeStorageUsage.objects.create(node=node_with_files, total=1)
+        assert reconcile_storage_usage(dry_run=True, batch_size=1) == 1
+        assert NodeStorageUsage.get_total(node_with_files.id) == 1
+        assert reconcile_storage_usage(batch_size=1) == 1
+        assert NodeStorageUsage.get_total(node_with_files.id) == 350
+        assert reconcile_storage_usage(batch_size=1) == 0
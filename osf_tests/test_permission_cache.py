@@ -0,0 +1,89 @@
+import pytest
+
+from osf.utils.permission_cache import (
+    get_cached_group_perms,
+    invalidate_group_perms,
+    prefetch_group_perms,
+)
+from osf.utils.permissions import ADMIN, READ, WRITE
+from osf_tests.factories import (
+    AuthUserFactory,
+    NodeFactory,
+    OSFGroupFactory,
+    PreprintFactory,
+)
+
+
+@pytest.fixture()
+def user():
+    return AuthUserFactory()
+
+
+@pytest.fixture()
+def nodes(user):
+    return [NodeFactory(creator=user) for _ in range(3)]
+
+
+@pytest.mark.django_db
+class TestPermissionCache:
+
+    def test_no_caching_outside_request(self, user, nodes):
+        node = nodes[0]
+        assert node.has_permission(user, ADMIN)
+        node.get_group(ADMIN).user_set.remove(user)
+        assert not node.has_permission(user, ADMIN)
+
+    def test_has_permission_is_memoized(self, request_context, user, nodes, django_assert_num_queries):
+        node = nodes[0]
+        assert node.has_permission(user, ADMIN)
+        with django_assert_num_queries(0):
+            assert node.has_permission(user, ADMIN)
+            assert node.has_permission(user, WRITE)
+            assert node.get_permissions(user) == [READ, WRITE, ADMIN]
+
+    def test_prefetch_uses_one_query(self, request_context, user, nodes, django_assert_num_queries):
+        other = NodeFactory()
+        with django_assert_num_queries(1):
+            prefetch_group_perms(user, nodes + [other])
+        with django_assert_num_queries(0):
+            for node in nodes:
+                assert node.get_permissions(user) == [READ, WRITE, ADMIN]
+            assert not other.has_permission(user, ADMIN)
+
+    def test_prefetch_matches_guardian(self, request_context, user):
+        preprint = PreprintFactory(creator=user)
+        node = NodeFactory()
+        node.add_contributor(user, permissions=WRITE)
+        prefetch_group_perms(user, [preprint, node])
+        assert preprint.get_permissions(user) == [READ, WRITE, ADMIN]
+        assert node.get_permissions(user) == [READ, WRITE]
+
+    def test_add_and_remove_permission_invalidate(self, request_context, user):
+        contrib = AuthUserFactory()
+        node = NodeFactory(creator=user)
+        assert not node.has_permission(contrib, READ, check_parent=False)
+        node.add_contributor(contrib, permissions=READ)
+        assert node.has_permission(contrib, READ, check_parent=False)
+        node.set_permissions(contrib, ADMIN)
+        assert node.has_permission(contrib, ADMIN)
+        node.remove_permission(contrib, ADMIN)
+        assert not node.has_permission(contrib, ADMIN)
+
+    def test_group_changes_invalidate(self, request_context, user, nodes):
+        member = AuthUserFactory()
+        group = OSFGroupFactory(creator=user)
+        node = nodes[0]
+        group.make_member(member)
+        assert not node.has_permission(member, READ)
+        node.add_osf_group(group, WRITE)
+        assert node.has_permission(member, WRITE)
+        group.remove_member(member)
+        assert not node.has_permission(member, READ)
+
+    def test_invalidate_all(self, request_context, user, nodes):
+        node = nodes[0]
+        get_cached_group_perms(user, node)
+        node.get_group(ADMIN).user_set.remove(user)
+        assert node.has_permission(user, ADMIN)
+        invalidate_group_perms()
+        assert not node.has_permission(user, ADMIN)
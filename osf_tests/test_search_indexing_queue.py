@@ -0,0 +1,116 @@
+import time
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from api_tests.utils import create_test_file
+from osf_tests.factories import ProjectFactory
+from website import settings
+from website.search import indexing_queue
+import website.search.search as search
+
+
+class StubElasticsearch:
+    """Stands in for the elasticsearch client, recording what is sent in bulk"""
+
+    def __init__(self):
+        self.actions = []
+        self.requests = 0
+        self.refresh = None
+
+    def bulk(self, client, actions, refresh=False, raise_on_error=True):
+        assert client is self
+        self.requests += 1
+        self.refresh = refresh
+        self.actions.extend(actions)
+        return len(actions), []
+
+    def documents(self, doc_id):
+        return [action for action in self.actions if action['_id'] == doc_id]
+
+
+@pytest.fixture()
+def project():
+    return ProjectFactory(is_public=True)
+
+
+@pytest.fixture()
+def stub_es():
+    stub = StubElasticsearch()
+    with mock.patch.object(indexing_queue.elastic_search, 'client', return_value=stub), \
+            mock.patch.object(indexing_queue.helpers, 'bulk', stub.bulk):
+        yield stub
+
+
+@pytest.fixture()
+def queue(stub_es):
+    with mock.patch.object(settings, 'SEARCH_INDEX_QUEUE_ENABLED', True), \
+            mock.patch.object(indexing_queue.index_queue, 'cache_name', 'default'), \
+            mock.patch('framework.analytics.buffer.time.time') as mock_time:
+        mock_time.return_value = time.time()
+        yield mock_time
+    caches['default'].clear()
+
+
+def flush_later(queue):
+    # move past the grace window, so the queued window is closed
+    queue.return_value += indexing_queue.index_queue.interval * 3
+    return indexing_queue.flush_index_queue()
+
+
+@pytest.mark.django_db
+class TestSearchIndexingQueue:
+
+    def test_updates_are_coalesced(self, project, queue, stub_es):
+        for _ in range(3):
+            search.update_node(project)
+        assert indexing_queue.get_metrics()['queue_depth'] == 1
+
+        assert flush_later(queue) == 1
+        assert stub_es.requests == 1
+        assert stub_es.refresh is False
+        [action] = stub_es.documents(project._id)
+        assert action['_op_type'] == 'index'
+        assert action['_type'] == 'project'
+        assert action['_source']['title'] == project.title
+
+        metrics = indexing_queue.get_metrics()
+        assert metrics['updates'] == 3
+        assert metrics['documents'] == 1
+        assert metrics['queue_depth'] == 0
+        assert metrics['last_flush'] is not None
+
+    def test_open_window_is_not_flushed(self, project, queue, stub_es):
+        search.update_node(project)
+        assert indexing_queue.flush_index_queue() == 0
+        assert not stub_es.actions
+
+    def test_private_node_is_deleted(self, project, queue, stub_es):
+        project.is_public = False
+        project.save()
+        search.update_node(project)
+        flush_later(queue)
+        [action] = stub_es.documents(project._id)
+        assert action['_op_type'] == 'delete'
+
+    def test_node_files_are_sent_once(self, project, queue, stub_es):
+        test_file = create_test_file(project, project.creator)
+        search.update_node(project)
+        search.update_file(test_file)
+        flush_later(queue)
+        assert len(stub_es.documents(test_file._id)) == 1
+        assert len(stub_es.documents(project._id)) == 1
+
+    def test_missing_file_is_deleted(self, queue, stub_es):
+        indexing_queue.enqueue('file', 0, 'gone')
+        flush_later(queue)
+        assert stub_es.documents('gone') == [
+            {'_op_type': 'delete', '_index': settings.ELASTIC_INDEX, '_type': 'file', '_id': 'gone'}
+        ]
+
+    def test_queue_disabled(self, project, stub_es):
+        with mock.patch.object(indexing_queue, 'enqueue') as mock_enqueue:
+            search.update_node(project)
+        assert not mock_enqueue.called
+        assert indexing_queue.flush_index_queue() == 0
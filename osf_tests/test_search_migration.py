@@ -0,0 +1,56 @@
+import json
+from unittest import mock
+
+import pytest
+
+from osf.models import OSFGroup
+from osf_tests.factories import OSFGroupFactory
+from website.search_migration import migrate
+
+
+def test_id_ranges_cover_new_objects():
+    assert migrate.id_ranges(25, 10) == [(0, 10), (10, 20), (20, 30), (30, 40)]
+    assert migrate.id_ranges(0, 10) == [(0, 10)]
+
+
+@pytest.mark.django_db
+def test_keyset_batches():
+    groups = sorted(OSFGroupFactory().id for _ in range(3))
+    batches = list(migrate.keyset_batches(OSFGroup.objects.all(), groups[0] - 1, groups[-1], 2))
+    assert [[group.id for group in batch] for batch in batches] == [groups[:2], groups[2:]]
+    assert not list(migrate.keyset_batches(OSFGroup.objects.all(), groups[-1], groups[-1] + 10, 2))
+
+
+class TestRunRangeMigrations:
+
+    @pytest.fixture()
+    def migrated(self):
+        migrated = []
+
+        def migrate_things(index, start, end, delete):
+            if start == 20 and not migrated.count('fail'):
+                migrated.append('fail')
+                raise Exception('Interrupted')
+            migrated.append((start, end))
+            return end - start
+
+        with mock.patch.dict(migrate.RANGE_MIGRATIONS, {'things': (None, migrate_things)}, clear=True):
+            yield migrated
+
+    def test_interrupted_migration_resumes(self, migrated, tmp_path):
+        checkpoint_path = str(tmp_path / 'checkpoint.json')
+        ranges = [('things', start, end) for start, end in migrate.id_ranges(35, 10)]
+        checkpoint = {'index': 'test_v2', 'completed': []}
+
+        with pytest.raises(Exception):
+            migrate.run_range_migrations('test_v2', False, ranges, checkpoint=checkpoint, checkpoint_path=checkpoint_path)
+        with open(checkpoint_path) as fp:
+            saved = json.load(fp)
+        assert saved == {'index': 'test_v2', 'completed': ['things:0:10', 'things:10:20']}
+
+        throughput = migrate.run_range_migrations(
+            'test_v2', False, ranges, checkpoint=migrate.load_checkpoint(checkpoint_path), checkpoint_path=checkpoint_path
+        )
+        assert migrated == [(0, 10), (10, 20), 'fail', (20, 30), (30, 40), (40, 50)]
+        assert throughput['things']['count'] == 30
+        assert len(migrate.load_checkpoint(checkpoint_path)['completed']) == 5
@@ -0,0 +1,61 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from addons.wiki.models import WikiPage
+from framework.auth.core import Auth
+from osf.models import AbstractNode
+from osf_tests.factories import (
+    AuthUserFactory,
+    InstitutionFactory,
+    NodeLicenseRecordFactory,
+    OSFGroupFactory,
+    ProjectFactory,
+)
+from website.search import elastic_search
+
+
+def make_project(user):
+    project = ProjectFactory(creator=user, is_public=True, node_license=NodeLicenseRecordFactory())
+    project.add_tag('searchable', auth=Auth(user), save=True)
+    project.affiliated_institutions.add(InstitutionFactory())
+    WikiPage.objects.create_for_node(project, 'home.page', 'Some wiki content', Auth(user))
+    OSFGroupFactory(creator=user).add_group_to_node(project)
+    child = ProjectFactory(creator=user, parent=project, is_public=True)
+    return project, child
+
+
+def load(nodes):
+    return list(AbstractNode.objects.filter(id__in=[node.id for node in nodes]).order_by('id'))
+
+
+@pytest.mark.django_db
+class TestSerializeNodes:
+
+    @pytest.fixture()
+    def user(self):
+        return AuthUserFactory()
+
+    def test_matches_serialize_node(self, user):
+        nodes = load(make_project(user))
+        documents = elastic_search.serialize_nodes(nodes)
+        for node in nodes:
+            category = elastic_search.get_doctype_from_node(node)
+            assert documents[node.id] == (category, elastic_search.serialize_node(node, category))
+
+        project, child = nodes
+        assert documents[child.id][1]['parent_id'] == project._id
+        # The child inherits its parent's license
+        assert documents[child.id][1]['license'] == documents[project.id][1]['license']
+        assert documents[project.id][1]['wikis'] == {'home page': 'Some wiki content'}
+        assert len(documents[project.id][1]['groups']) == 1
+
+    def test_query_count_does_not_grow_with_batch(self, user):
+        small = load(make_project(user))
+        large = load([*make_project(user), *make_project(user), *make_project(user)])
+
+        with CaptureQueriesContext(connection) as small_queries:
+            elastic_search.serialize_nodes(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            elastic_search.serialize_nodes(large)
+        assert len(large_queries) == len(small_queries)
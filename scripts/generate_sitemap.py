@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
-"""Generate a sitemap for osf.io"""
+"""Generate a sitemap for osf.io
+
+Sitemap files are written one url at a time, straight into a gzip stream and, with
+SITEMAP_WRITE_UNCOMPRESSED, an uncompressed copy. The output is the same, byte for byte, as the
+`xml.dom.minidom` documents the script used to build. Users, nodes and preprints are read in id
+order with keyset queries, each source in its own thread (SITEMAP_SOURCE_WORKERS), while the urls
+are written in the order static, users, nodes, preprints.
+"""
 import boto3
 import datetime
 import gzip
 import os
+import queue
 import shutil
-from urllib.parse import urlparse, urljoin
-import xml
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 
 import django
 django.setup()
@@ -15,9 +25,10 @@ import tempfile
 
 from framework import sentry
 from framework.celery_tasks import app as celery_app
-from django.db.models import Q
-from osf.models import OSFUser, AbstractNode, Preprint, PreprintProvider
-from osf.utils.workflows import DefaultStates
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from osf.models import Guid, OSFUser, AbstractNode, Preprint
+from osf.models.base import GuidMixinQuerySet
 from scripts import utils as script_utils
 from website import settings
 from website.app import init_app
@@ -25,12 +36,193 @@ from website.app import init_app
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# Chunks a source may read before the writer gets to them
+READ_AHEAD_CHUNKS = 4
+
+
+def escape(text):
+    """Escape text as `toprettyxml` does"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+
+class SitemapFile:
+    """An xml file written one element at a time, as `toprettyxml(indent='  ', encoding='utf-8')` would write it.
+
+    :param str path: Path of the uncompressed file; the gzipped file is written to `path + '.gz'`
+    :param str root: Tag of the root element
+    :param bool compressed: Write the gzipped file
+    :param bool uncompressed: Write the uncompressed file
+    """
+
+    def __init__(self, path, root, compressed=True, uncompressed=True):
+        assert compressed or uncompressed, 'SitemapFile must write at least one file'
+        self.path = path
+        self.root = root
+        self.count = 0
+        self.streams = []
+        if compressed:
+            self.streams.append(gzip.open(path + '.gz', 'wb'))
+        if uncompressed:
+            self.streams.append(open(path, 'wb'))
+        self.write(f'<?xml version="1.0" encoding="utf-8"?>\n<{self.root} xmlns="{XMLNS}"')
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        for stream in self.streams:
+            stream.write(data)
+
+    def add(self, tag, children):
+        """Adds an element whose children are text elements, `children` being {tag: text}"""
+        lines = [] if self.count else ['>\n']
+        lines.append(f'  <{tag}>\n')
+        for name, text in children.items():
+            lines.append(f'    <{name}>{escape(text)}</{name}>\n')
+        lines.append(f'  </{tag}>\n')
+        self.write(''.join(lines))
+        self.count += 1
+
+    def close(self):
+        self.write(f'</{self.root}>\n' if self.count else '/>\n')
+        for stream in self.streams:
+            stream.close()
+
+
+class ReadAhead:
+    """Reads the chunks of a source in an executor thread, at most READ_AHEAD_CHUNKS ahead of the consumer."""
+    END = object()
+
+    def __init__(self, executor, source):
+        self.chunks = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+        self.stopped = threading.Event()
+        executor.submit(self.produce, source)
+
+    def put(self, item):
+        # Give up once the consumer has stopped, rather than blocking the thread forever
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(self, source):
+        try:
+            for chunk in source():
+                if not self.put(chunk):
+                    return
+            self.put(self.END)
+        except Exception as e:
+            self.put(e)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+    def __iter__(self):
+        while True:
+            item = self.chunks.get()
+            if item is self.END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def iter_chunks(queryset, fields):
+    """Yield lists of the `fields` values of the queryset, read in id order with keyset pagination"""
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', *fields)[:settings.SITEMAP_QUERY_CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def load_guids(model, rows):
+    """Return [(guid, *row)] with a tuple for every guid of the objects of the rows, as a join on guids would"""
+    guids = defaultdict(list)
+    for object_id, guid in Guid.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        object_id__in=[row[0] for row in rows],
+    ).order_by('id').values_list('object_id', '_id'):
+        guids[object_id].append(guid)
+    return [(guid, *row) for row in rows for guid in guids[row[0]]]
+
+
+def user_rows():
+    users = OSFUser.objects.filter(is_active=True).exclude(date_confirmed__isnull=True)
+    for rows in iter_chunks(users, []):
+        yield load_guids(OSFUser, rows)
+
+
+def node_rows():
+    # Nodes and Registrations, no Collections
+    nodes = (AbstractNode.objects
+        .filter(is_public=True, is_deleted=False, retraction_id__isnull=True)
+        .exclude(type__in=['osf.collection', 'osf.quickfilesnode']))
+    for rows in iter_chunks(nodes, ['modified']):
+        yield load_guids(AbstractNode, rows)
+
+
+def preprint_rows():
+    preprints = Preprint.objects.can_view().with_primary_guid()
+    yield from iter_chunks(
+        preprints,
+        [GuidMixinQuerySet.PRIMARY_GUID_ANNOTATION, 'provider___id', 'modified', 'date_withdrawn'],
+    )
+
+
+def user_urls(row):
+    guid, _ = row
+    yield dict(settings.SITEMAP_USER_CONFIG, loc=urljoin(settings.DOMAIN, f'/{guid}/'))
+
+
+def node_urls(row):
+    guid, _, modified = row
+    yield dict(
+        settings.SITEMAP_NODE_CONFIG,
+        loc=urljoin(settings.DOMAIN, f'/{guid}/'),
+        lastmod=modified.strftime('%Y-%m-%d'),
+    )
+
+
+def preprint_urls(row):
+    _, guid, provider_id, modified, date_withdrawn = row
+    preprint_date = modified.strftime('%Y-%m-%d')
+    yield dict(
+        settings.SITEMAP_PREPRINT_CONFIG,
+        loc=urljoin(settings.DOMAIN, os.path.join('preprints', provider_id, guid)),
+        lastmod=preprint_date,
+    )
+    # Withdrawn preprints may be viewed but not downloaded
+    if date_withdrawn is None:
+        yield dict(
+            settings.SITEMAP_PREPRINT_FILE_CONFIG,
+            loc=urljoin(settings.DOMAIN, os.path.join(guid, 'download', '?format=pdf')),
+            lastmod=preprint_date,
+        )
+
+
+# (label, chunks of rows, urls of a row), in the order their urls are written
+SOURCES = [
+    ('USER', user_rows, user_urls),
+    ('NODE', node_rows, node_urls),
+    ('PREP', preprint_rows, preprint_urls),
+]
+
 
 class Sitemap:
     def __init__(self):
         self.sitemap_count = 0
+        self.url_count = 0
         self.errors = 0
-        self.new_doc()
+        self.doc = None
         if not settings.SITEMAP_TO_S3:
             self.sitemap_dir = os.path.join(settings.STATIC_FOLDER, 'sitemaps')
             if not os.path.exists(self.sitemap_dir):
@@ -52,51 +244,39 @@ class Sitemap:
         if settings.SITEMAP_TO_S3:
             shutil.rmtree(self.sitemap_dir)
 
+    def sitemap_file_name(self, index):
+        # The index points at the uncompressed files when they are written
+        return f'sitemap_{index}.xml' if settings.SITEMAP_WRITE_UNCOMPRESSED else f'sitemap_{index}.xml.gz'
+
     def new_doc(self):
-        """Creates new sitemap document and resets the url_count."""
-        self.doc = xml.dom.minidom.Document()
-        self.urlset = self.doc.createElement('urlset')
-        self.urlset.setAttribute('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
-        self.doc.appendChild(self.urlset)
+        """Starts a new sitemap file and resets the url_count."""
+        file_path = os.path.join(self.sitemap_dir, f'sitemap_{self.sitemap_count}.xml')
+        self.doc = SitemapFile(file_path, 'urlset', uncompressed=settings.SITEMAP_WRITE_UNCOMPRESSED)
         self.url_count = 0
 
-    def add_tag(self, name, text):
-        """Adds a tag to the current url"""
-        tag = self.doc.createElement(name)
-        self.url.appendChild(tag)
-        tag_text = self.doc.createTextNode(text)
-        tag.appendChild(tag_text)
-
     def add_url(self, config):
-        """Adds a url to the current urlset"""
-        if self.url_count >= settings.SITEMAP_URL_MAX:
+        """Adds a url to the current sitemap file"""
+        if self.doc is None:
+            self.new_doc()
+        elif self.url_count >= settings.SITEMAP_URL_MAX:
             self.write_doc()
             self.new_doc()
-        self.url = self.doc.createElement('url')
-        self.urlset.appendChild(self.url)
-
-        for k, v in config.items():
-            self.add_tag(k, v)
+        self.doc.add('url', config)
         self.url_count += 1
 
     def write_doc(self):
-        """Writes and gzips each sitemap xml file"""
-        file_name = f'sitemap_{str(self.sitemap_count)}.xml'
-        file_path = os.path.join(self.sitemap_dir, file_name)
-        zip_file_name = file_name + '.gz'
-        zip_file_path = file_path + '.gz'
+        """Finishes the current sitemap file and ships it to S3 if need be"""
+        if self.doc is None:
+            self.new_doc()
+        file_path = self.doc.path
         print(f'Writing and gzipping `{file_path}`: url_count = {str(self.url_count)}')
-
-        xml_str = self.doc.toprettyxml(indent='  ', encoding='utf-8')
-        with open(file_path, 'wb') as f:
-            f.write(xml_str)
-
-        # Write zipped file
-        with open(file_path, 'rb') as f_in, gzip.open(zip_file_path, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
+        self.doc.close()
+        self.doc = None
         if settings.SITEMAP_TO_S3:
-            self.ship_to_s3(file_name, file_path)
-            self.ship_to_s3(zip_file_name, zip_file_path)
+            file_name = os.path.basename(file_path)
+            if settings.SITEMAP_WRITE_UNCOMPRESSED:
+                self.ship_to_s3(file_name, file_path)
+            self.ship_to_s3(file_name + '.gz', file_path + '.gz')
         self.sitemap_count += 1
 
     def ship_to_s3(self, name, path):
@@ -111,31 +291,17 @@ class Sitemap:
 
     def write_sitemap_index(self):
         """Writes the index file for all of the sitemap files"""
-        doc = xml.dom.minidom.Document()
-        sitemap_index = self.doc.createElement('sitemapindex')
-        sitemap_index.setAttribute('xmlns', 'http://www.sitemaps.org/schemas/sitemap/0.9')
-        doc.appendChild(sitemap_index)
-
-        for f in range(self.sitemap_count):
-            sitemap = doc.createElement('sitemap')
-            sitemap_index.appendChild(sitemap)
-
-            loc = doc.createElement('loc')
-            sitemap.appendChild(loc)
-            loc_text = self.doc.createTextNode(urljoin(settings.DOMAIN, f'sitemaps/sitemap_{str(f)}.xml'))
-            loc.appendChild(loc_text)
-
-            datemod = doc.createElement('lastmod')
-            sitemap.appendChild(datemod)
-            datemod_text = self.doc.createTextNode(datetime.datetime.now().strftime('%Y-%m-%d'))
-            datemod.appendChild(datemod_text)
-
         print('Writing `sitemap_index.xml`')
         file_name = 'sitemap_index.xml'
         file_path = os.path.join(self.sitemap_dir, file_name)
-        xml_str = doc.toprettyxml(indent='  ', encoding='utf-8')
-        with open(file_path, 'wb') as f:
-            f.write(xml_str)
+        lastmod = datetime.datetime.now().strftime('%Y-%m-%d')
+        index = SitemapFile(file_path, 'sitemapindex', compressed=False)
+        for f in range(self.sitemap_count):
+            index.add('sitemap', {
+                'loc': urljoin(settings.DOMAIN, f'sitemaps/{self.sitemap_file_name(f)}'),
+                'lastmod': lastmod,
+            })
+        index.close()
         if settings.SITEMAP_TO_S3:
             self.ship_to_s3(file_name, file_path)
 
@@ -153,98 +319,49 @@ class Sitemap:
             sentry.log_message('ERROR: generate_sitemap stopped execution after reaching 1000 errors. See logs for details.')
             raise Exception('Too many errors generating sitemap.')
 
+    def add_source(self, label, chunks, urls):
+        count = 0
+        for rows in chunks:
+            for row in rows:
+                try:
+                    for config in urls(row):
+                        self.add_url(config)
+                        count += 1
+                except Exception as e:
+                    self.log_errors(label, row[0], e)
+        print(f'{label}: {count} urls')
+
     def generate(self):
         print('Generating Sitemap')
 
-        # Progress bar
-        progress = script_utils.Progress(precision=0)
-
         # Static urls
-        progress.start(len(settings.SITEMAP_STATIC_URLS), 'STAT: ')
         for config in settings.SITEMAP_STATIC_URLS:
-            config['loc'] = urljoin(settings.DOMAIN, config['loc'])
-            self.add_url(config)
-            progress.increment()
-        progress.stop()
-
-        # User urls
-        objs = OSFUser.objects.filter(is_active=True).exclude(date_confirmed__isnull=True).values_list('guids___id', flat=True)
-        progress.start(objs.count(), 'USER: ')
-        for obj in objs:
-            try:
-                config = settings.SITEMAP_USER_CONFIG
-                config['loc'] = urljoin(settings.DOMAIN, f'/{obj}/')
-                self.add_url(config)
-            except Exception as e:
-                self.log_errors('USER', obj, e)
-            progress.increment()
-        progress.stop()
-
-        # AbstractNode urls (Nodes and Registrations, no Collections)
-        objs = (AbstractNode.objects
-            .filter(is_public=True, is_deleted=False, retraction_id__isnull=True)
-            .exclude(type__in=['osf.collection', 'osf.quickfilesnode'])
-            .values('guids___id', 'modified'))
-        progress.start(objs.count(), 'NODE: ')
-        for obj in objs:
-            try:
-                config = settings.SITEMAP_NODE_CONFIG
-                config['loc'] = urljoin(settings.DOMAIN, '/{}/'.format(obj['guids___id']))
-                config['lastmod'] = obj['modified'].strftime('%Y-%m-%d')
-                self.add_url(config)
-            except Exception as e:
-                self.log_errors('NODE', obj['guids___id'], e)
-            progress.increment()
-        progress.stop()
-
-        # Preprint urls
-
-        objs = (Preprint.objects.can_view()
-                    .select_related('node', 'provider', 'primary_file'))
-        progress.start(objs.count() * 2, 'PREP: ')
-        for obj in objs:
-            try:
-                preprint_date = obj.modified.strftime('%Y-%m-%d')
-                config = settings.SITEMAP_PREPRINT_CONFIG
-                preprint_url = os.path.join('preprints', obj.provider._id, obj._id)
-                config['loc'] = urljoin(settings.DOMAIN, preprint_url)
-                config['lastmod'] = preprint_date
-                self.add_url(config)
-
-                # Preprint file urls
-                if not obj.is_retracted:
-                    # Withdrawn preprints may be viewed but not downloaded
-                    try:
-                        file_config = settings.SITEMAP_PREPRINT_FILE_CONFIG
-                        file_config['loc'] = urljoin(
-                            settings.DOMAIN,
-                            os.path.join(
-                                obj._id,
-                                'download',
-                                '?format=pdf'
-                            )
-                        )
-                        file_config['lastmod'] = preprint_date
-                        self.add_url(file_config)
-                    except Exception as e:
-                        self.log_errors(obj.primary_file, obj.primary_file._id, e)
-
-            except Exception as e:
-                self.log_errors(obj, obj._id, e)
-            progress.increment(2)
-        progress.stop()
+            self.add_url(dict(config, loc=urljoin(settings.DOMAIN, config['loc'])))
+
+        if settings.SITEMAP_SOURCE_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=settings.SITEMAP_SOURCE_WORKERS) as executor:
+                readers = [ReadAhead(executor, rows) for _, rows, _ in SOURCES]
+                try:
+                    for (label, _, urls), reader in zip(SOURCES, readers):
+                        self.add_source(label, reader, urls)
+                finally:
+                    for reader in readers:
+                        reader.stop()
+        else:
+            for label, rows, urls in SOURCES:
+                self.add_source(label, rows(), urls)
 
         # Final write
+        url_count = self.url_count
         self.write_doc()
         # Create index file
         self.write_sitemap_index()
 
         # TODO: once the sitemap is validated add a ping to google with sitemap index file location
-        # TODO: server side cursor query wrapper might be useful as the index gets larger.
         # Sitemap indexable limit check
         if self.sitemap_count > settings.SITEMAP_INDEX_MAX * .90:  # 10% of urls remaining
             sentry.log_message('WARNING: Max sitemaps nearly reached.')
-        print(f'Total url_count = {(self.sitemap_count - 1) * settings.SITEMAP_URL_MAX + self.url_count}')
+        print(f'Total url_count = {(self.sitemap_count - 1) * settings.SITEMAP_URL_MAX + url_count}')
         print(f'Total sitemap_count = {str(self.sitemap_count)}')
         if self.errors:
             sentry.log_message('WARNING: Generate sitemap encountered errors. See logs for details.')
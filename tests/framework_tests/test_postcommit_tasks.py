@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+import gevent
+
+from framework.postcommit_tasks import handlers
+from framework.postcommit_tasks.handlers import (
+    get_postcommit_pool,
+    postcommit_after_request,
+    postcommit_before_request,
+    postcommit_celery_queue,
+    postcommit_metrics,
+    postcommit_queue,
+)
+from website import settings
+
+
+def noop():
+    pass
+
+
+class TestPostcommitExecutor(unittest.TestCase):
+
+    def setUp(self):
+        postcommit_before_request()
+        postcommit_metrics.reset()
+        self.response = mock.Mock(status_code=200)
+
+    def tearDown(self):
+        postcommit_before_request()
+
+    def test_pool_is_reused_across_requests(self):
+        assert get_postcommit_pool() is get_postcommit_pool()
+        assert get_postcommit_pool().size == settings.POSTCOMMIT_POOL_SIZE
+
+    def test_pool_is_stored_on_the_hub(self):
+        assert gevent.get_hub().postcommit_pool is get_postcommit_pool()
+
+    def test_full_pool_does_not_block(self):
+        calls = []
+        postcommit_queue()['a'] = lambda: calls.append('a')
+        postcommit_queue()['b'] = lambda: calls.append('b')
+        pool = handlers.Pool(1)
+        busy = pool.spawn(gevent.sleep, 10)
+        with mock.patch.object(handlers, 'get_postcommit_pool', return_value=pool), \
+                mock.patch.object(handlers.logger, 'warning') as mock_warning:
+            postcommit_after_request(self.response)
+        busy.kill()
+
+        assert sorted(calls) == ['a', 'b']
+        mock_warning.assert_called_once()
+        assert postcommit_metrics.snapshot()['timeouts'] == 0
+
+    def test_tasks_run_and_are_timed(self):
+        calls = []
+        postcommit_queue()['a'] = lambda: calls.append('a')
+        postcommit_queue()['b'] = noop
+        postcommit_after_request(self.response)
+
+        assert calls == ['a']
+        metrics = postcommit_metrics.snapshot()
+        assert metrics['requests'] == 1
+        assert metrics['max_queue_depth'] == 2
+        assert metrics['timeouts'] == 0
+        assert metrics['tasks'][f'{__name__}.noop']['count'] == 1
+
+    def test_timeout_is_counted(self):
+        postcommit_queue()['slow'] = lambda: gevent.sleep(1)
+        with mock.patch.object(settings, 'POSTCOMMIT_TIMEOUT', 0.01):
+            postcommit_after_request(self.response)
+        assert postcommit_metrics.snapshot()['timeouts'] == 1
+
+    def test_celery_tasks_are_published_over_one_connection(self):
+        signatures = [mock.Mock(), mock.Mock()]
+        postcommit_celery_queue()['a'] = {}
+        postcommit_celery_queue()['b'] = {}
+        with mock.patch.object(settings, 'USE_CELERY', True), \
+                mock.patch.object(handlers.Signature, 'from_dict', side_effect=signatures), \
+                mock.patch('framework.celery_tasks.app.producer_or_acquire') as mock_producer:
+            postcommit_after_request(self.response)
+
+        assert mock_producer.call_count == 1
+        producer = mock_producer.return_value.__enter__.return_value
+        for signature in signatures:
+            signature.apply_async.assert_called_once_with(producer=producer)
+        assert postcommit_metrics.snapshot()['celery_published'] == 2
+
+    def test_error_response_drops_tasks(self):
+        postcommit_queue()['a'] = mock.Mock()
+        postcommit_after_request(mock.Mock(status_code=500))
+        assert not postcommit_queue()
+        assert postcommit_metrics.snapshot()['requests'] == 0
@@ -213,6 +213,82 @@ class TestCASClient(OsfTestCase):
         with pytest.raises(cas.CasHTTPError):
             res = self.client.revoke_application_tokens(client_id, client_secret)
 
+    def _add_profile_response(self, status=200, expires_in=None):
+        body = {'id': 'fakeuser', 'scope': ['osf.full_read']}
+        if expires_in is not None:
+            body['expires_in'] = expires_in
+        responses.add(
+            responses.Response(
+                responses.GET,
+                self.client.get_profile_url(),
+                json=body,
+                status=status,
+            )
+        )
+
+    @responses.activate
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_NAME', 'default')
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_ENABLED', True)
+    def test_cached_profile(self):
+        self._add_profile_response()
+        resp = self.client.cached_profile('valid-token')
+        assert resp.user == 'fakeuser'
+        assert resp.attributes['accessTokenScope'] == {'osf.full_read'}
+        assert resp.attributes['accessToken'] == 'valid-token'
+        cached = self.client.cached_profile('valid-token')
+        assert cached.user == 'fakeuser'
+        assert cached.attributes['accessToken'] == 'valid-token'
+        assert len(responses.calls) == 1
+        # The raw token is not stored in the cache
+        stored = cas._token_cache_call('get', cas.get_token_cache_key('valid-token'))
+        assert 'accessToken' not in stored.attributes
+
+        cas.invalidate_token_cache('valid-token')
+        self.client.cached_profile('valid-token')
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_NAME', 'default')
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_ENABLED', True)
+    def test_cached_profile_caches_invalid_tokens(self):
+        self._add_profile_response(status=401)
+        for _ in range(2):
+            with pytest.raises(cas.CasHTTPError):
+                self.client.cached_profile('invalid-token')
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_NAME', 'default')
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_ENABLED', True)
+    def test_cached_profile_does_not_cache_server_errors(self):
+        self._add_profile_response(status=500)
+        for _ in range(2):
+            with pytest.raises(cas.CasHTTPError):
+                self.client.cached_profile('some-token')
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_NAME', 'default')
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_ENABLED', True)
+    def test_cached_profile_respects_expiry(self):
+        self._add_profile_response(expires_in=0)
+        self.client.cached_profile('expired-token')
+        self.client.cached_profile('expired-token')
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_NAME', 'default')
+    @mock.patch('website.settings.CAS_TOKEN_CACHE_ENABLED', True)
+    def test_revoking_application_tokens_invalidates_cache(self):
+        self._add_profile_response()
+        responses.add(
+            responses.Response(responses.POST, self.client.get_auth_token_revocation_url(), status=204)
+        )
+        self.client.cached_profile('app-token')
+        self.client.revoke_application_tokens('fake_id', 'fake_secret')
+        self.client.cached_profile('app-token')
+        assert len([call for call in responses.calls if call.request.method == 'GET']) == 2
+
     @unittest.skip('finish me')
     def test_profile_valid_access_token_returns_cas_response(self):
         assert 0
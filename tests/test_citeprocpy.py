@@ -1,10 +1,12 @@
 import os
 import json
+from unittest import mock
 
 from django.utils import timezone
 import pytest
 
-from api.citations.utils import render_citation
+from api.citations import utils as citation_utils
+from api.citations.utils import render_citation, render_citations, render_citation_styles
 from osf.models import OSFUser
 from osf_tests.factories import UserFactory, PreprintFactory
 from tests.base import OsfTestCase
@@ -163,3 +165,39 @@ class TestCiteprocpyMLA(OsfTestCase):
                 self.preprint.title,
                 self.preprint.provider.name,
                 self.formated_date)
+
+
+class TestCitationStyleCache(OsfTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.preprint = PreprintFactory(creator=UserFactory(fullname='John Tordoff'), title='My Preprint')
+        citation_utils._parse_style.cache_clear()
+
+    def parse_count(self, render):
+        with mock.patch.object(citation_utils, 'CitationStylesStyle', wraps=citation_utils.CitationStylesStyle) as mock_style:
+            render()
+        return mock_style.call_count
+
+    def test_style_is_parsed_once(self):
+        assert self.parse_count(lambda: render_citation(self.preprint, 'apa')) == 1
+        assert self.parse_count(lambda: render_citation(self.preprint, 'apa')) == 0
+
+    def test_modified_style_is_parsed_again(self):
+        render_citation(self.preprint, 'apa')
+        with mock.patch.object(citation_utils, '_mtime', return_value=0):
+            assert self.parse_count(lambda: render_citation(self.preprint, 'apa')) == 1
+
+    def test_render_citations(self):
+        other_preprint = PreprintFactory(creator=UserFactory(fullname='Carson Wentz'), title='Other Preprint')
+        style = 'modern-language-association'
+        assert render_citations([self.preprint, other_preprint], style) == [
+            render_citation(self.preprint, style),
+            render_citation(other_preprint, style),
+        ]
+
+    def test_render_citation_styles(self):
+        styles = ['apa', 'chicago-author-date', 'modern-language-association']
+        assert render_citation_styles(self.preprint, styles) == {
+            style: render_citation(self.preprint, style) for style in styles
+        }
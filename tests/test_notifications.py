@@ -4,6 +4,8 @@ from unittest import mock
 import pytest
 from babel import dates, Locale
 from schema import Schema, And, Use, Or
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from framework.auth import Auth
@@ -13,6 +15,7 @@ from website.notifications.tasks import get_users_emails, send_users_email, grou
 from website.notifications.exceptions import InvalidSubscriptionError
 from website.notifications import constants
 from website.notifications import emails
+from website.notifications import tasks
 from website.notifications import utils
 from website import mails
 from website.profile.utils import get_profile_image_url
@@ -1272,6 +1275,44 @@ class TestCompileSubscriptions(NotificationTestCase):
         subs = emails.compile_subscriptions(node5, 'file_updated')
         assert subs == {'email_transactional': [], 'email_digest': [self.user_1._id], 'none': []}
 
+    def test_event_subscription_overrides_node(self):
+        self.shared_sub.email_transactional.add(self.user_1, self.user_2)
+        file_sub = factories.NotificationSubscriptionFactory(
+            _id=self.shared_node._id + '_xyz42_file_updated',
+            node=self.shared_node,
+            event_name='xyz42_file_updated'
+        )
+        file_sub.none.add(self.user_1)
+        subs = emails.compile_subscriptions(self.shared_node, 'file_updated', 'xyz42_file_updated')
+        assert subs == {'email_transactional': [self.user_2._id], 'email_digest': [], 'none': [self.user_1._id]}
+
+    def test_disabled_user_not_listed(self):
+        self.base_sub.email_transactional.add(self.user_1, self.user_2)
+        self.user_2.date_disabled = timezone.now()
+        self.user_2.save()
+        result = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert result == {'email_transactional': [self.user_1._id], 'none': [], 'email_digest': []}
+
+    def test_query_count_does_not_grow_with_depth_or_subscribers(self):
+        self.base_sub.email_transactional.add(self.user_1)
+        emails.compile_subscriptions(self.shared_node, 'file_updated')  # warm the content type cache
+        with CaptureQueriesContext(connection) as shallow_queries:
+            emails.compile_subscriptions(self.shared_node, 'file_updated')
+
+        node = self.shared_node
+        for _ in range(4):
+            node = factories.NodeFactory(parent=node, creator=self.user_1)
+        for _ in range(5):
+            user = factories.UserFactory()
+            self.base_project.add_contributor(user, permissions=permissions.READ)
+            self.base_sub.email_digest.add(user)
+        node._id  # load the guid outside of the count
+        with CaptureQueriesContext(connection) as deep_queries:
+            subs = emails.compile_subscriptions(node, 'file_updated')
+        assert len(deep_queries) == len(shallow_queries)
+        # Contributors of the project cannot read the components
+        assert subs == {'email_transactional': [self.user_1._id], 'email_digest': [], 'none': []}
+
 
 class TestMoveSubscription(NotificationTestCase):
     def setUp(self):
@@ -1857,6 +1898,44 @@ class TestSendDigest(OsfTestCase):
         send_users_email(send_type)
         assert not mock_send_mail.called
 
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_in_batches(self, mock_send_mail):
+        send_type = 'email_transactional'
+        project = factories.ProjectFactory()
+        digests = [
+            factories.NotificationDigestFactory(
+                send_type=send_type,
+                event='comment_replies',
+                timestamp=timezone.now(),
+                message='Hello',
+                node_lineage=[project._id]
+            ) for _ in range(3)
+        ]
+        stats = tasks._send_global_and_node_emails(send_type, batch_size=2)
+
+        assert mock_send_mail.call_count == 3
+        assert {call[1]['to_addr'] for call in mock_send_mail.call_args_list} == {digest.user.username for digest in digests}
+        assert all(call[1]['node_titles'] == {project._id: project.title} for call in mock_send_mail.call_args_list)
+        assert stats.summary()['emails'] == 3
+        assert stats.summary()['removed'] == 3
+        assert not NotificationDigest.objects.filter(id__in=[digest.id for digest in digests]).exists()
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_dry_run(self, mock_send_mail):
+        send_type = 'email_transactional'
+        digest = factories.NotificationDigestFactory(
+            send_type=send_type,
+            event='comment_replies',
+            timestamp=timezone.now(),
+            message='Hello',
+            node_lineage=[factories.ProjectFactory()._id]
+        )
+        stats = tasks._send_global_and_node_emails(send_type, dry_run=True)
+
+        assert not mock_send_mail.called
+        assert stats.summary()['emails'] == 1
+        assert NotificationDigest.objects.filter(id=digest.id).exists()
+
     def test_remove_sent_digest_notifications(self):
         d = factories.NotificationDigestFactory(
             event='comment_replies',
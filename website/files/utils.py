@@ -1,51 +1,203 @@
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.expressions import RawSQL
+
+from framework import sentry
+from osf.models.base import Guid, generate_guids
 from osf.models.metadata import GuidMetadataRecord
 
+logger = logging.getLogger(__name__)
+
+# Ids of a file node and all of its (untrashed) descendants
+SUBTREE_SQL = """
+    WITH RECURSIVE subtree AS (
+        SELECT id FROM osf_basefilenode WHERE id = %s
+      UNION ALL
+        SELECT F.id
+        FROM osf_basefilenode AS F
+        JOIN subtree ON F.parent_id = subtree.id
+        WHERE NOT F.type = ANY(%s)
+    )
+    SELECT id FROM subtree
+"""
+
 
 def copy_files(src, target_node, parent=None, name=None):
     """Copy the files from src to the target node
+
+    The source subtree is read with one query and cloned level by level, with one insert per level,
+    followed by batched inserts of the file versions and metadata records.
+
     :param Folder src: The source to copy children from
     :param Node target_node: The node to copy files to
     :param Folder parent: The parent of to attach the clone of src to, if applicable
     """
+    from addons.osfstorage.models import OsfStorageFile
+    from osf.models.files import BaseFileNode, TrashedFileNode
+
     assert not parent or not parent.is_file, 'Parent must be a folder'
-    renaming = src.name != name
-
-    cloned = src.clone()
-    cloned.parent = parent
-    cloned.target = target_node
-    cloned.name = name or cloned.name
-    cloned.copied_from = src
-
-    cloned.save()
-    if src.is_file and src.versions.exists():
-        fileversions = src.versions.select_related('region').order_by('-created')
-        most_recent_fileversion = fileversions.first()
-        if most_recent_fileversion.region and most_recent_fileversion.region != target_node.osfstorage_region:
-            # add all original version except the most recent
-            attach_versions(cloned, fileversions[1:], src)
-            # create a new most recent version and update the region before adding
-            new_fileversion = most_recent_fileversion.clone()
-            new_fileversion.region = target_node.osfstorage_region
-            new_fileversion.save()
-            attach_versions(cloned, [new_fileversion], src)
+
+    children = defaultdict(list)
+    if not src.is_file:
+        descendants = BaseFileNode.objects.filter(
+            id__in=RawSQL(SUBTREE_SQL, [src.id, list(TrashedFileNode._typedmodels_subtypes)])
+        ).exclude(id=src.id).order_by('id')
+        for descendant in descendants:
+            children[descendant.parent_id].append(descendant)
+
+    clones = {}
+    sources = []
+    level = [src]
+    while level:
+        cloned_level = []
+        for source in level:
+            cloned = source.clone(refetch=False)
+            if source is src:
+                cloned.parent = parent
+                cloned.name = name or cloned.name
+            else:
+                cloned.parent = clones[source.parent_id]
+            cloned.target = target_node
+            cloned.copied_from = source
+            if hasattr(cloned, '_build_materialized_path'):
+                # As OsfStorageFileNode.save would
+                cloned._path = ''
+                cloned._materialized_path = cloned._build_materialized_path()
+            clones[source.id] = cloned
+            cloned_level.append(cloned)
+        BaseFileNode.objects.bulk_create(cloned_level)
+        sources.extend(level)
+        level = [child for source in level for child in children[source.id]]
+
+    files = [source for source in sources if source.is_file]
+    # Children are copied without a name, so only src itself can keep the version names of its source
+    renamed = {file_.id for file_ in files if file_ is not src or src.name != name}
+    copied = copy_versions(files, clones, target_node, renamed)
+    copy_metadata_records(copied, clones)
+    # Saving each clone used to index it; bulk_create does not call save
+    update_copied_files_search([
+        clones[file_.id] for file_ in files if isinstance(clones[file_.id], OsfStorageFile)
+    ])
+    return clones[src.id]
+
+
+def update_copied_files_search(files):
+    """Send copied files to the search index and SHARE in bulk, as OsfStorageFile.save does file by file"""
+    from api.share.utils import update_share_many
+    from website import search
+
+    if not files:
+        return
+    update_share_many(files)
+    try:
+        search.search.update_files(files)
+    except search.exceptions.SearchUnavailableError as e:
+        logger.exception(e)
+        sentry.log_exception(e)
+
+
+def copy_versions(files, clones, target_node, renamed):
+    """Attach the versions of each file to its clone, as copy_files did one file at a time.
+
+    The most recent version of a file stored in another region than the target's is cloned into the
+    target's region.
+
+    :param list files: Source files
+    :param dict clones: {source id: saved clone}
+    :param set renamed: Ids of the source files whose first version is named after the clone
+    :return: Ids of the source files that have versions
+    """
+    from osf.models.files import BaseFileVersionsThrough, FileVersion
+
+    versions = defaultdict(list)
+    through_rows = BaseFileVersionsThrough.objects.filter(
+        basefilenode_id__in=[file_.id for file_ in files]
+    ).select_related('fileversion__region').order_by('id')
+    for through in through_rows:
+        versions[through.basefilenode_id].append(through)
+    if not versions:
+        return []
+
+    target_region = target_node.osfstorage_region
+    attached = {}
+    relocated = {}
+    for file_id, throughs in versions.items():
+        throughs = sorted(throughs, key=lambda through: through.fileversion.created, reverse=True)
+        most_recent = throughs[0].fileversion
+        if most_recent.region and most_recent.region != target_region:
+            # Create a new most recent version in the target's region, named after the clone
+            new_fileversion = most_recent.clone(refetch=False)
+            new_fileversion.region = target_region
+            relocated[file_id] = new_fileversion
+            throughs = throughs[1:]
         else:
-            attach_versions(cloned, src.versions.all(), src)
+            throughs = sorted(throughs, key=lambda through: through.fileversion_id)
+        attached[file_id] = [(through.fileversion, through.version_name) for through in throughs]
+    FileVersion.objects.bulk_create(relocated.values())
+    for file_id, new_fileversion in relocated.items():
+        attached[file_id].append((new_fileversion, None))
 
-        if renaming:
-            latest_version = cloned.versions.first()
-            node_file_version = latest_version.get_basefilenode_version(cloned)
-            # If this is a copy and a rename, update the name on the through table
-            node_file_version.version_name = cloned.name
-            node_file_version.save()
+    new_throughs = []
+    for file_id, file_versions in attached.items():
+        cloned = clones[file_id]
+        # copy_files used to rename `cloned.versions.first()`, the most recently created version
+        latest_version, _ = max(file_versions, key=lambda file_version: file_version[0].created)
+        for fileversion, version_name in file_versions:
+            if file_id not in renamed or fileversion != latest_version:
+                version_name = version_name or cloned.name
+            else:
+                version_name = cloned.name
+            new_throughs.append(
+                BaseFileVersionsThrough(basefilenode=cloned, fileversion=fileversion, version_name=version_name)
+            )
+    BaseFileVersionsThrough.objects.bulk_create(new_throughs)
+    version_fields = apps.get_model('osf.OsfStorageFile').update_version_fields(
+        [clones[file_id].id for file_id in attached]
+    )
+    for file_id in attached:
+        cloned = clones[file_id]
+        cloned.latest_version_id, cloned.version_count, cloned.earliest_version_created = version_fields[cloned.id]
+    return list(versions)
 
-        # copy over file metadata records
-        GuidMetadataRecord.objects.copy(from_=src, to_=cloned)
 
-    if not src.is_file:
-        for child in src.children:
-            copy_files(child, target_node, parent=cloned)
+def copy_metadata_records(file_ids, clones):
+    """Copy the GuidMetadataRecords of the given files to their clones, creating guids for the clones.
+
+    :param list file_ids: Ids of source files
+    :param dict clones: {source id: saved clone}
+    """
+    from osf.models.files import BaseFileNode
+
+    content_type = ContentType.objects.get_for_model(BaseFileNode)
+    records = {}
+    # GuidMetadataRecord.objects.copy reads the record of the first guid of a file
+    for record in GuidMetadataRecord.objects.filter(
+        guid__content_type=content_type,
+        guid__object_id__in=file_ids,
+    ).select_related('guid').order_by('-guid_id'):
+        records[record.guid.object_id] = record
+    if not records:
+        return
+
+    guids = Guid.objects.bulk_create([
+        Guid(_id=guid_id, content_type=content_type, object_id=clones[file_id].id)
+        for guid_id, file_id in zip(generate_guids(len(records)), records)
+    ])
+    GuidMetadataRecord.objects.bulk_create([
+        GuidMetadataRecord(
+            guid=guid,
+            title=record.title,
+            description=record.description,
+            language=record.language,
+            resource_type_general=record.resource_type_general,
+            funding_info=record.funding_info,
+        )
+        for guid, record in zip(guids, records.values())
+    ])
 
-    return cloned
 
 def attach_versions(file, versions_list, src=None):
     """
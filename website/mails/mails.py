@@ -17,6 +17,7 @@ Usage: ::
     mails.send_mail('foo@bar.com', mails.CONFIRM_EMAIL, user=user)
 
 """
+import functools
 import os
 import logging
 import waffle
@@ -66,7 +67,13 @@ class Mail:
         return render_message(tpl_name, **context)
 
     def subject(self, **context):
-        return Template(self._subject).render(**context)
+        return compile_template(self._subject).render(**context)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(text):
+    """Compile a template from a string, once per distinct string."""
+    return Template(text)
 
 
 def render_message(tpl_name, **context):
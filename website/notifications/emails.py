@@ -1,8 +1,14 @@
+from collections import defaultdict
+
 from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import CharField, Value
 
 from babel import dates, core, Locale
 
 from osf.models import AbstractNode, NotificationDigest, NotificationSubscription
+from osf.models.node import NodeGroupObjectPermission
 from osf.utils.permissions import ADMIN, READ
 from website import mails
 from website.notifications import constants
@@ -128,12 +134,16 @@ def store_emails(recipient_ids, notification_type, event, user, node, timestamp,
 def compile_subscriptions(node, event_type, event=None, level=0):
     """Recurse through node and parents for subscriptions.
 
+    Nodes are resolved with `resolve_subscriptions` instead, in a fixed number of queries.
+
     :param node: current node
     :param event_type: Generally node_subscriptions_available
     :param event: Particular event such a file_updated that has specific file subs
     :param level: How deep the recursion is
     :return: a dict of notification types with lists of users.
     """
+    if level == 0 and isinstance(node, AbstractNode):
+        return resolve_subscriptions(node, event_type, event)
     subscriptions = check_node(node, event_type)
     if event:
         subscriptions = check_node(node, event)  # Gets particular event subscriptions
@@ -155,6 +165,114 @@ def compile_subscriptions(node, event_type, event=None, level=0):
     return parent_subscriptions
 
 
+def resolve_subscriptions(node, event_type, event=None):
+    """Return the subscriptions of a node as compile_subscriptions does, with three queries
+    regardless of the depth of the node and the number of subscribers.
+
+    Subscriptions are merged from the root down to the node, then its subscription to `event`, so the
+    subscription closest to the node decides how a user is notified. Users who subscribed on a node
+    they cannot read are skipped, as are those who cannot read `node`.
+
+    :return: a dict of notification types with lists of user guids.
+    """
+    chain = [(node.id, node._id)] + get_ancestors(node)
+    levels = [(node_id, utils.to_subscription_key(guid, event_type)) for node_id, guid in reversed(chain)]
+    if event:
+        levels.append((node.id, utils.to_subscription_key(node._id, event)))
+
+    subscribers, user_guids = get_subscribers([key for _, key in levels])
+    readers = get_readers([node_id for node_id, _ in chain], user_guids.keys())
+
+    subscriptions = {notification_type: set() for notification_type in constants.NOTIFICATION_TYPES}
+    for node_id, key in levels:
+        level_subscribers = {
+            notification_type: users & readers[node_id]
+            for notification_type, users in subscribers[key].items()
+        }
+        for notification_type in subscriptions:
+            overridden = set().union(*(
+                users for other_type, users in level_subscribers.items() if other_type != notification_type
+            ))
+            subscriptions[notification_type] = (subscriptions[notification_type] | level_subscribers[notification_type]) - overridden
+    return {
+        notification_type: sorted(user_guids[user_id] for user_id in users & readers[node.id])
+        for notification_type, users in subscriptions.items()
+    }
+
+
+def get_ancestors(node):
+    """Return [(id, guid)] of the ancestors of a node, from its parent to the root, with one query."""
+    with connection.cursor() as cursor:
+        cursor.execute(ANCESTORS_QUERY, [node.id, ContentType.objects.get_for_model(AbstractNode).id])
+        return cursor.fetchall()
+
+
+ANCESTORS_QUERY = """
+    WITH RECURSIVE ancestors AS (
+            SELECT R.parent_id, 1 AS depth
+            FROM osf_noderelation AS R
+            WHERE R.child_id = %s AND R.is_node_link IS FALSE
+        UNION ALL
+            SELECT R.parent_id, A.depth + 1
+            FROM ancestors AS A
+            JOIN osf_noderelation AS R ON R.child_id = A.parent_id AND R.is_node_link IS FALSE
+    )
+    SELECT DISTINCT ON (A.depth) A.parent_id, G._id
+    FROM ancestors AS A
+    JOIN osf_guid AS G ON G.object_id = A.parent_id AND G.content_type_id = %s
+    ORDER BY A.depth, G.id
+"""
+
+
+def get_subscribers(keys):
+    """Return the enabled users of the given subscriptions, with one query.
+
+    :param list keys: Subscription keys, see utils.to_subscription_key
+    :return: ({key: {notification type: set of user ids}}, {user id: user guid})
+    """
+    queries = [
+        getattr(NotificationSubscription, notification_type).through.objects.filter(
+            notificationsubscription___id__in=keys,
+            osfuser__date_disabled__isnull=True,
+        ).annotate(
+            notification_type=Value(notification_type, output_field=CharField()),
+        ).values_list('notificationsubscription___id', 'osfuser_id', 'osfuser__guids___id', 'notification_type')
+        for notification_type in constants.NOTIFICATION_TYPES
+    ]
+    subscribers = {key: {notification_type: set() for notification_type in constants.NOTIFICATION_TYPES} for key in keys}
+    user_guids = {}
+    for key, user_id, guid, notification_type in queries[0].union(*queries[1:], all=True):
+        subscribers[key][notification_type].add(user_id)
+        user_guids.setdefault(user_id, guid)
+    return subscribers, user_guids
+
+
+def get_readers(chain, user_ids):
+    """Return which of the given users can read each node of an ancestor chain, with one query.
+
+    Users read a node through a read permission on it, or as admins of it or of one of its ancestors,
+    as with `node.has_permission(user, READ)`.
+
+    :param list chain: Node ids, from a node up to its root
+    :return: {node id: set of user ids}
+    """
+    read_perm, admin_perm = f'{READ}_node', f'{ADMIN}_node'
+    permitted = defaultdict(set)
+    for user_id, node_id, codename in NodeGroupObjectPermission.objects.filter(
+        content_object_id__in=chain,
+        permission__codename__in=[read_perm, admin_perm],
+        group__user__id__in=list(user_ids),
+    ).values_list('group__user__id', 'content_object_id', 'permission__codename'):
+        permitted[(node_id, codename)].add(user_id)
+
+    readers = {}
+    admins = set()
+    for node_id in reversed(chain):
+        admins |= permitted[(node_id, admin_perm)]
+        readers[node_id] = admins | permitted[(node_id, read_perm)]
+    return readers
+
+
 def check_node(node, event):
     """Return subscription for a particular node and event."""
     node_subscriptions = {key: [] for key in constants.NOTIFICATION_TYPES}
@@ -2,12 +2,16 @@
 Tasks for making even transactional emails consolidated.
 """
 import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.db import connection
 
 from framework.celery_tasks import app as celery_app
 from framework.sentry import log_message
 from osf.models import (
+    Guid,
     OSFUser,
     AbstractNode,
     AbstractProvider,
@@ -20,119 +24,245 @@ from osf.utils.permissions import ADMIN
 from website import mails, settings
 from website.notifications.utils import NotificationsDict
 
+logger = logging.getLogger(__name__)
+
 
 @celery_app.task(name='website.notifications.tasks.send_users_email', max_retries=0)
-def send_users_email(send_type):
+def send_users_email(send_type, dry_run=False):
     """Send pending emails.
 
     :param send_type
+    :param dry_run: Render the emails without sending them or removing the digests
     :return:
     """
-    _send_global_and_node_emails(send_type)
-    _send_reviews_moderator_emails(send_type)
+    for name, send in [('node', _send_global_and_node_emails), ('moderator', _send_reviews_moderator_emails)]:
+        stats = send(send_type, dry_run=dry_run)
+        logger.info(f'{"[DRY RUN] " if dry_run else ""}Sent {send_type} {name} digests: {stats.summary()}')
+
+
+class DigestStats:
+    """Throughput of a digest run"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.digests = 0
+        self.emails = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def summary(self):
+        seconds = time.monotonic() - self.start
+        return {
+            'digests': self.digests,
+            'emails': self.emails,
+            'skipped': self.skipped,
+            'removed': self.removed,
+            'seconds': round(seconds, 3),
+            'emails_per_second': round(self.emails / seconds, 1) if seconds else None,
+        }
+
+
+def iter_batches(sql, send_type, batch_size):
+    """Yield the grouped digests selected by `sql` in lists of `batch_size`, read with a server-side cursor"""
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, [send_type])
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+
+
+def load_referents(guids):
+    """Return {guid: referent} for the given guids, with one query per type of referent"""
+    return {guid: loaded.referent for guid, loaded in Guid.load_many(guids).items()}
+
+
+def deliver(mail_kwargs, dry_run=False):
+    if dry_run:
+        mail = mail_kwargs['mail']
+        mail.subject(**mail_kwargs)
+        mail.html(**mail_kwargs)
+    else:
+        mails.send_mail(**mail_kwargs)
+
+
+def deliver_all(emails, dry_run=False, workers=None):
+    """Render and send emails, with a pool of `workers` threads if there is more than one.
+
+    :param list emails: [(notification ids, send_mail kwargs)]
+    :return: Ids of the notifications of the emails that were sent, and the first error if any
+    """
+    workers = workers or settings.NOTIFICATION_DIGEST_WORKERS
+
+    def deliver_one(email):
+        notification_ids, mail_kwargs = email
+        try:
+            deliver(mail_kwargs, dry_run=dry_run)
+        except Exception as error:
+            return [], error
+        return notification_ids, None
+
+    if workers > 1 and len(emails) > 1:
+        def deliver_in_thread(email):
+            try:
+                return deliver_one(email)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(deliver_in_thread, emails))
+    else:
+        results = [deliver_one(email) for email in emails]
+
+    sent_ids = [notification_id for notification_ids, _ in results for notification_id in notification_ids]
+    errors = [error for _, error in results if error]
+    return sent_ids, errors[0] if errors else None
+
 
+def finish_batch(stats, removable_ids, emails, dry_run=False, workers=None):
+    """Deliver the emails of a batch and remove the digests they contained, and those in `removable_ids`"""
+    sent_ids, error = deliver_all(emails, dry_run=dry_run, workers=workers)
+    removable_ids = removable_ids + sent_ids
+    stats.emails += len(emails)
+    if not dry_run:
+        remove_notifications(email_notification_ids=removable_ids)
+        stats.removed += len(removable_ids)
+    if error:
+        # Digests of the emails that were sent are removed; the rest are sent by the next run
+        raise error
 
-def _send_global_and_node_emails(send_type):
+
+def _send_global_and_node_emails(send_type, dry_run=False, batch_size=None, workers=None):
     """
     Called by `send_users_email`. Send all global and node-related notification emails.
+
+    Digests are read in batches of users, whose users and nodes are loaded together. The digests
+    of a batch are removed at once after its emails are sent.
     """
-    grouped_emails = get_users_emails(send_type)
-    for group in grouped_emails:
-        user = OSFUser.load(group['user_id'])
-        if not user:
-            log_message(f"User with id={group['user_id']} not found")
-            continue
-        info = group['info']
-        notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_by_node(info)
-        if sorted_messages:
-            if not user.is_disabled:
-                # If there's only one node in digest we can show it's preferences link in the template.
-                notification_nodes = list(sorted_messages['children'].keys())
-                node = AbstractNode.load(notification_nodes[0]) if len(
-                    notification_nodes) == 1 else None
-                mails.send_mail(
-                    to_addr=user.username,
-                    can_change_node_preferences=bool(node),
-                    node=node,
-                    mail=mails.DIGEST,
-                    name=user.fullname,
-                    message=sorted_messages,
-                )
-            remove_notifications(email_notification_ids=notification_ids)
+    stats = DigestStats()
+    for batch in iter_batches(USERS_EMAILS_SQL, send_type, batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE):
+        users = load_referents(group['user_id'] for group in batch)
+        sorted_messages = [group_by_node(group['info']) for group in batch]
+        # The digest template shows the title of every node in the lineages
+        nodes = load_referents(
+            guid for group in batch for message in group['info'][:15] for guid in message['node_lineage']
+        )
+        node_titles = {guid: node.title for guid, node in nodes.items()}
+
+        emails = []
+        removable_ids = []
+        for group, messages in zip(batch, sorted_messages):
+            stats.digests += 1
+            user = users.get(group['user_id'])
+            if not isinstance(user, OSFUser):
+                log_message(f"User with id={group['user_id']} not found")
+                stats.skipped += 1
+                continue
+            notification_ids = [message['_id'] for message in group['info']]
+            if user.is_disabled:
+                stats.skipped += 1
+                removable_ids.extend(notification_ids)
+                continue
+            # If there's only one node in digest we can show it's preferences link in the template.
+            notification_nodes = list(messages['children'].keys())
+            node = nodes.get(notification_nodes[0]) if len(notification_nodes) == 1 else None
+            node = node if isinstance(node, AbstractNode) else None
+            emails.append((notification_ids, dict(
+                to_addr=user.username,
+                can_change_node_preferences=bool(node),
+                node=node,
+                mail=mails.DIGEST,
+                name=user.fullname,
+                message=messages,
+                node_titles=node_titles,
+            )))
+        finish_batch(stats, removable_ids, emails, dry_run=dry_run, workers=workers)
+    return stats
 
 
-def _send_reviews_moderator_emails(send_type):
+def get_provider_context(provider):
+    """Return the context of the moderator digests of a provider"""
+    additional_context = dict()
+    if isinstance(provider, RegistrationProvider):
+        provider_type = 'registration'
+        submissions_url = get_registration_provider_submissions_url(provider)
+        withdrawals_url = f'{submissions_url}?state=pending_withdraw'
+        notification_settings_url = f'{settings.DOMAIN}registries/{provider._id}/moderation/notifications'
+        if provider.brand:
+            additional_context = {
+                'logo_url': provider.brand.hero_logo_image,
+                'top_bar_color': provider.brand.primary_color
+            }
+    elif isinstance(provider, CollectionProvider):
+        provider_type = 'collection'
+        submissions_url = f'{settings.DOMAIN}collections/{provider._id}/moderation/'
+        notification_settings_url = f'{settings.DOMAIN}registries/{provider._id}/moderation/notifications'
+        if provider.brand:
+            additional_context = {
+                'logo_url': provider.brand.hero_logo_image,
+                'top_bar_color': provider.brand.primary_color
+            }
+        withdrawals_url = ''
+    else:
+        provider_type = 'preprint'
+        submissions_url = f'{settings.DOMAIN}reviews/preprints/{provider._id}',
+        withdrawals_url = ''
+        notification_settings_url = f'{settings.DOMAIN}reviews/{provider_type}s/{provider._id}/notifications'
+
+    return dict(
+        provider_name=provider.name,
+        reviews_submissions_url=submissions_url,
+        notification_settings_url=notification_settings_url,
+        reviews_withdrawal_url=withdrawals_url,
+        provider_type=provider_type,
+        **additional_context
+    )
+
+
+def _send_reviews_moderator_emails(send_type, dry_run=False, batch_size=None, workers=None):
     """
     Called by `send_users_email`. Send all reviews triggered emails.
+
+    Providers, their context and their admins are loaded once per run, users once per batch.
     """
-    grouped_emails = get_moderators_emails(send_type)
-    for group in grouped_emails:
-        user = OSFUser.load(group['user_id'])
-        info = group['info']
-        notification_ids = [message['_id'] for message in info]
-        provider = AbstractProvider.objects.get(id=group['provider_id'])
-        additional_context = dict()
-        if isinstance(provider, RegistrationProvider):
-            provider_type = 'registration'
-            submissions_url = get_registration_provider_submissions_url(provider)
-            withdrawals_url = f'{submissions_url}?state=pending_withdraw'
-            notification_settings_url = f'{settings.DOMAIN}registries/{provider._id}/moderation/notifications'
-            if provider.brand:
-                additional_context = {
-                    'logo_url': provider.brand.hero_logo_image,
-                    'top_bar_color': provider.brand.primary_color
-                }
-        elif isinstance(provider, CollectionProvider):
-            provider_type = 'collection'
-            submissions_url = f'{settings.DOMAIN}collections/{provider._id}/moderation/'
-            notification_settings_url = f'{settings.DOMAIN}registries/{provider._id}/moderation/notifications'
-            if provider.brand:
-                additional_context = {
-                    'logo_url': provider.brand.hero_logo_image,
-                    'top_bar_color': provider.brand.primary_color
-                }
-            withdrawals_url = ''
-        else:
-            provider_type = 'preprint'
-            submissions_url = f'{settings.DOMAIN}reviews/preprints/{provider._id}',
-            withdrawals_url = ''
-            notification_settings_url = f'{settings.DOMAIN}reviews/{provider_type}s/{provider._id}/notifications'
-
-        if not user.is_disabled:
-            mails.send_mail(
+    stats = DigestStats()
+    providers = {}
+    for batch in iter_batches(MODERATORS_EMAILS_SQL, send_type, batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE):
+        users = load_referents(group['user_id'] for group in batch)
+        missing_provider_ids = {group['provider_id'] for group in batch} - set(providers)
+        for provider in AbstractProvider.objects.filter(id__in=missing_provider_ids):
+            providers[provider.id] = (
+                get_provider_context(provider),
+                set(provider.get_group(ADMIN).user_set.values_list('id', flat=True)),
+            )
+
+        emails = []
+        removable_ids = []
+        for group in batch:
+            stats.digests += 1
+            user = users[group['user_id']]
+            info = group['info']
+            notification_ids = [message['_id'] for message in info]
+            if user.is_disabled:
+                stats.skipped += 1
+                removable_ids.extend(notification_ids)
+                continue
+            provider_context, admin_ids = providers[group['provider_id']]
+            emails.append((notification_ids, dict(
                 to_addr=user.username,
                 mail=mails.DIGEST_REVIEWS_MODERATORS,
                 name=user.fullname,
                 message=info,
-                provider_name=provider.name,
-                reviews_submissions_url=submissions_url,
-                notification_settings_url=notification_settings_url,
-                reviews_withdrawal_url=withdrawals_url,
                 is_reviews_moderator_notification=True,
-                is_admin=provider.get_group(ADMIN).user_set.filter(id=user.id).exists(),
-                provider_type=provider_type,
-                **additional_context
-            )
-        remove_notifications(email_notification_ids=notification_ids)
+                is_admin=user.id in admin_ids,
+                **provider_context
+            )))
+        finish_batch(stats, removable_ids, emails, dry_run=dry_run, workers=workers)
+    return stats
 
 
-def get_moderators_emails(send_type):
-    """Get all emails for reviews moderators that need to be sent, grouped by users AND providers.
-    :param send_type: from NOTIFICATION_TYPES, could be "email_digest" or "email_transactional"
-    :return Iterable of dicts of the form:
-        [
-            'user_id': 'se8ea',
-            'provider_id': '1',
-            'info': [
-                {
-                    'message': 'Hana Xie submitted Gravity',
-                    '_id': NotificationDigest._id,
-                }
-            ],
-        ]
-    """
-    sql = """
+MODERATORS_EMAILS_SQL = """
         SELECT json_build_object(
                 'user_id', osf_guid._id,
                 'provider_id', nd.provider_id,
@@ -151,8 +281,46 @@ def get_moderators_emails(send_type):
         ORDER BY osf_guid.id ASC
         """
 
+
+USERS_EMAILS_SQL = """
+    SELECT json_build_object(
+            'user_id', osf_guid._id,
+            'info', json_agg(
+                json_build_object(
+                    'message', nd.message,
+                    'node_lineage', nd.node_lineage,
+                    '_id', nd._id
+                )
+            )
+        )
+    FROM osf_notificationdigest AS nd
+      LEFT JOIN osf_guid ON nd.user_id = osf_guid.object_id
+    WHERE send_type = %s
+        AND event != 'new_pending_submissions'
+        AND event != 'new_pending_withdraw_requests'
+        AND osf_guid.content_type_id = (SELECT id FROM django_content_type WHERE model = 'osfuser')
+    GROUP BY osf_guid.id
+    ORDER BY osf_guid.id ASC
+    """
+
+
+def get_moderators_emails(send_type):
+    """Get all emails for reviews moderators that need to be sent, grouped by users AND providers.
+    :param send_type: from NOTIFICATION_TYPES, could be "email_digest" or "email_transactional"
+    :return Iterable of dicts of the form:
+        [
+            'user_id': 'se8ea',
+            'provider_id': '1',
+            'info': [
+                {
+                    'message': 'Hana Xie submitted Gravity',
+                    '_id': NotificationDigest._id,
+                }
+            ],
+        ]
+    """
     with connection.cursor() as cursor:
-        cursor.execute(sql, [send_type, ])
+        cursor.execute(MODERATORS_EMAILS_SQL, [send_type, ])
         return itertools.chain.from_iterable(cursor.fetchall())
 
 
@@ -179,29 +347,8 @@ def get_users_emails(send_type):
         }
     """
 
-    sql = """
-    SELECT json_build_object(
-            'user_id', osf_guid._id,
-            'info', json_agg(
-                json_build_object(
-                    'message', nd.message,
-                    'node_lineage', nd.node_lineage,
-                    '_id', nd._id
-                )
-            )
-        )
-    FROM osf_notificationdigest AS nd
-      LEFT JOIN osf_guid ON nd.user_id = osf_guid.object_id
-    WHERE send_type = %s
-        AND event != 'new_pending_submissions'
-        AND event != 'new_pending_withdraw_requests'
-        AND osf_guid.content_type_id = (SELECT id FROM django_content_type WHERE model = 'osfuser')
-    GROUP BY osf_guid.id
-    ORDER BY osf_guid.id ASC
-    """
-
     with connection.cursor() as cursor:
-        cursor.execute(sql, [send_type, ])
+        cursor.execute(USERS_EMAILS_SQL, [send_type, ])
         return itertools.chain.from_iterable(cursor.fetchall())
 
 
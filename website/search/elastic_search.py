@@ -4,17 +4,20 @@ import logging
 import math
 import re
 import unicodedata
+from collections import defaultdict
 from framework import sentry
 
 from django.apps import apps
 from django.core.paginator import Paginator
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db.models import F, Max, Q
 from elasticsearch2 import (ConnectionError, Elasticsearch, NotFoundError,
                             RequestError, TransportError, helpers)
 from framework.celery_tasks import app as celery_app
 from framework.database import paginated
 from osf.models import AbstractNode
+from osf.models import Contributor
+from osf.models import NodeRelation
 from osf.models import OSFUser
 from osf.models import BaseFileNode
 from osf.models import GuidMetadataRecord
@@ -23,7 +26,9 @@ from osf.models import OSFGroup
 from osf.models import QuickFilesNode
 from osf.models import Preprint
 from osf.models import SpamStatus
-from addons.wiki.models import WikiPage
+from osf.models.node import NodeGroupObjectPermission
+from osf.models.osf_group import OSFGroupGroupObjectPermission
+from addons.wiki.models import WikiPage, WikiVersion
 from osf.models import CollectionSubmission
 from osf.utils.sanitize import unescape_entities
 from osf.utils.workflows import CollectionSubmissionStates
@@ -334,14 +339,14 @@ def load_parent(parent_id):
 COMPONENT_CATEGORIES = set(settings.NODE_CATEGORY_MAP.keys())
 
 
-def get_doctype_from_node(node):
+def get_doctype_from_node(node, is_root=None):
     if isinstance(node, Preprint):
         return 'preprint'
     if isinstance(node, OSFGroup):
         return 'group'
     if node.is_registration:
         return 'registration'
-    elif node.parent_node is None:
+    elif (node.parent_node is None if is_root is None else is_root):
         # ElasticSearch categorizes top-level projects differently than children
         return 'project'
     elif node.category in COMPONENT_CATEGORIES:
@@ -436,6 +441,118 @@ def serialize_node(node, category):
 
     return elastic_document
 
+def serialize_nodes(nodes):
+    """Serialize `nodes` for the search index like serialize_node, reading each related table once
+    for the whole batch instead of once per node.
+
+    :return dict: node id -> (category, elastic document)
+    """
+    nodes = list(nodes)
+    node_ids = [node.id for node in nodes]
+    if not node_ids:
+        return {}
+
+    contributors = defaultdict(list)
+    for x in (Contributor.objects.filter(node_id__in=node_ids, visible=True).order_by('node_id', '_order')
+              .values('node_id', 'user__fullname', 'user__guids___id', 'user__is_active')):
+        contributors[x['node_id']].append({
+            'fullname': x['user__fullname'],
+            'url': '/{}/'.format(x['user__guids___id']) if x['user__is_active'] else None
+        })
+
+    # OSF groups reach a node through the django groups holding permissions on it, see AbstractNode.osf_groups
+    node_member_groups = defaultdict(set)
+    for node_id, group_id in (NodeGroupObjectPermission.objects
+                              .filter(content_object_id__in=node_ids, group__name__icontains='osfgroup')
+                              .values_list('content_object_id', 'group_id')):
+        node_member_groups[node_id].add(group_id)
+    osf_groups_of_member_group = defaultdict(set)
+    for group_id, osf_group_id in (OSFGroupGroupObjectPermission.objects
+                                   .filter(group_id__in=set().union(*node_member_groups.values()))
+                                   .values_list('group_id', 'content_object_id')):
+        osf_groups_of_member_group[group_id].add(osf_group_id)
+    osf_groups = {
+        x['id']: x
+        for x in OSFGroup.objects.filter(id__in=set().union(*osf_groups_of_member_group.values())).values('id', 'name', '_id')
+    }
+
+    tags = defaultdict(list)
+    for node_id, name in (AbstractNode.tags.through.objects
+                          .filter(abstractnode_id__in=node_ids, tag__system=False)
+                          .values_list('abstractnode_id', 'tag__name')):
+        tags[node_id].append(name)
+
+    institutions = defaultdict(list)
+    for node_id, name in (AbstractNode.affiliated_institutions.through.objects
+                          .filter(abstractnode_id__in=node_ids)
+                          .values_list('abstractnode_id', 'institution__name')):
+        institutions[node_id].append(name)
+
+    parent_ids = {}
+    for child_id, parent_guid in (NodeRelation.objects.filter(child_id__in=node_ids, is_node_link=False)
+                                  .order_by('id', 'parent__guids__id')
+                                  .values_list('child_id', 'parent__guids___id')):
+        parent_ids.setdefault(child_id, parent_guid)
+
+    licenses = AbstractNode.get_licenses(nodes)
+
+    guid_metadata = {
+        record.guid_str: serialize_guid_metadata_record(record)
+        for record in GuidMetadataRecord.objects.filter(guid___id__in=[node._id for node in nodes]).annotate(guid_str=F('guid___id'))
+    }
+
+    wikis = defaultdict(dict)
+    unretracted = {node.id: node for node in nodes if not node.is_retracted}
+    latest_wiki_versions = (
+        WikiVersion.objects.annotate(newest_version=Max('wiki_page__versions__identifier'))
+        .filter(identifier=F('newest_version'), wiki_page__node_id__in=list(unretracted), wiki_page__deleted__isnull=True)
+        .select_related('wiki_page')
+    )
+    for wiki in latest_wiki_versions:
+        node_id = wiki.wiki_page.node_id
+        # '.' is not allowed in field names in ES2
+        wikis[node_id][wiki.wiki_page.page_name.replace('.', ' ')] = wiki.raw_text(unretracted[node_id])
+
+    ret = {}
+    for node in nodes:
+        category = get_doctype_from_node(node, is_root=node.id not in parent_ids)
+        osf_group_ids = sorted(set().union(*(osf_groups_of_member_group[group_id] for group_id in node_member_groups[node.id])))
+        ret[node.id] = (category, {
+            **guid_metadata.get(node._id, {}),
+            'id': node._id,
+            'contributors': contributors[node.id],
+            'groups': [
+                {
+                    'name': osf_groups[osf_group_id]['name'],
+                    'url': '/{}/'.format(osf_groups[osf_group_id]['_id'])
+                }
+                for osf_group_id in osf_group_ids
+            ],
+            'title': node.title,
+            'normalized_title': unicodedata.normalize('NFKD', node.title),
+            'category': category,
+            'public': node.is_public,
+            'tags': tags[node.id],
+            'description': node.description,
+            'url': node.url,
+            'is_registration': node.is_registration,
+            'is_pending_registration': node.is_pending_registration,
+            'is_retracted': node.is_retracted,
+            'is_pending_retraction': node.is_pending_retraction,
+            'embargo_end_date': node.embargo_end_date.strftime('%A, %b. %d, %Y') if node.embargo_end_date else False,
+            'is_pending_embargo': node.is_pending_embargo,
+            'registered_date': node.registered_date,
+            'wikis': wikis[node.id],
+            'parent_id': parent_ids.get(node.id),
+            'date_created': node.created,
+            'license': serialize_node_license_record(licenses[node.id]),
+            'affiliated_institutions': institutions[node.id],
+            'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+            'extra_search_terms': clean_splitters(node.title),
+        })
+    return ret
+
+
 def serialize_preprint(preprint, category):
     normalized_title = unicodedata.normalize('NFKD', preprint.title)
     elastic_document = {
@@ -494,6 +611,21 @@ def serialize_group(group, category):
 
     return elastic_document
 
+def should_remove_node(node, tag_names=None):
+    """Whether `node` must be kept out of the search index
+
+    :param tag_names: Names of the node's tags, if already loaded
+    """
+    if tag_names is None:
+        tag_names = node.tags.all().values_list('name', flat=True)
+    is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(tag_names)) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+    return node.is_deleted or not node.is_public or node.archiving or node.is_spam or (node.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node
+
+def should_remove_preprint(preprint):
+    """Whether `preprint` must be kept out of the search index"""
+    is_qa_preprint = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(preprint.tags.all().values_list('name', flat=True))) or any(substring in preprint.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+    return not preprint.verified_publishable or preprint.is_spam or (preprint.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or is_qa_preprint
+
 @requires_search
 def update_node(node, index=None, bulk=False, async_update=False):
     from addons.osfstorage.models import OsfStorageFile
@@ -501,8 +633,7 @@ def update_node(node, index=None, bulk=False, async_update=False):
     for file_ in paginated(OsfStorageFile, Q(target_content_type=ContentType.objects.get_for_model(type(node)), target_object_id=node.id)):
         file_.update_search()
 
-    is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if node.is_deleted or not node.is_public or node.archiving or node.is_spam or (node.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
+    if should_remove_node(node):
         delete_doc(node._id, node, index=index)
     else:
         category = get_doctype_from_node(node)
@@ -519,8 +650,7 @@ def update_preprint(preprint, index=None, bulk=False, async_update=False):
     for file_ in paginated(OsfStorageFile, Q(target_content_type=ContentType.objects.get_for_model(type(preprint)), target_object_id=preprint.id)):
         file_.update_search()
 
-    is_qa_preprint = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(preprint.tags.all().values_list('name', flat=True))) or any(substring in preprint.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if not preprint.verified_publishable or preprint.is_spam or (preprint.spam_status == SpamStatus.FLAGGED and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or is_qa_preprint:
+    if should_remove_preprint(preprint):
         delete_doc(preprint._id, preprint, category='preprint', index=index)
     else:
         category = 'preprint'
@@ -544,6 +674,43 @@ def update_group(group, index=None, bulk=False, async_update=False, deleted_id=N
         else:
             client().index(index=index, doc_type=category, id=group._id, body=elastic_document, refresh=True)
 
+@requires_search
+def bulk_update_node_search(nodes, index=None):
+    """Index `nodes` with one bulk request, serializing them together with serialize_nodes
+
+    Does what bulk_update_nodes with update_node(bulk=True) does node by node.
+    """
+    from addons.osfstorage.models import OsfStorageFile
+    index = index or INDEX
+    nodes = list(nodes)
+    node_ids = [node.id for node in nodes]
+    for file_ in paginated(OsfStorageFile, Q(target_content_type=ContentType.objects.get_for_model(AbstractNode), target_object_id__in=node_ids)):
+        file_.update_search()
+
+    tag_names = defaultdict(list)
+    for node_id, name in AbstractNode.tags.through.objects.filter(abstractnode_id__in=node_ids, tag__system=False).values_list('abstractnode_id', 'tag__name'):
+        tag_names[node_id].append(name)
+    indexed = []
+    for node in nodes:
+        if should_remove_node(node, tag_names=tag_names[node.id]):
+            delete_doc(node._id, node, index=index)
+        else:
+            indexed.append(node)
+
+    actions = [
+        {
+            '_op_type': 'update',
+            '_index': index,
+            '_id': elastic_document['id'],
+            '_type': category,
+            'doc': elastic_document,
+            'doc_as_upsert': True,
+        }
+        for category, elastic_document in serialize_nodes(indexed).values()
+    ]
+    if actions:
+        return helpers.bulk(client(), actions, refresh=True)
+
 def bulk_update_nodes(serialize, nodes, index=None, category=None):
     """Updates the list of input projects
 
@@ -675,6 +842,10 @@ def update_user(user, index=None):
             pass
         return
 
+    user_doc = serialize_user(user)
+    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+
+def serialize_user(user):
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -704,13 +875,11 @@ def update_user(user, index=None):
         'social': user.social_links,
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
-
-    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+    return user_doc
 
 @requires_search
 def update_file(file_, index=None, delete=False):
     index = index or INDEX
-    target = file_.target
 
     if not file_.should_update_search or delete:
         client().delete(
@@ -722,6 +891,35 @@ def update_file(file_, index=None, delete=False):
         )
         return
 
+    file_doc = serialize_file(file_)
+    client().index(
+        index=index,
+        doc_type='file',
+        body=file_doc,
+        id=file_._id,
+        refresh=True
+    )
+
+@requires_search
+def bulk_update_files(files, index=None):
+    """Index or remove the documents of `files` with one bulk request, as update_file does file by file"""
+    index = index or INDEX
+    actions = []
+    for file_ in files:
+        if file_.should_update_search:
+            actions.append({'_op_type': 'index', '_index': index, '_type': 'file', '_id': file_._id, '_source': serialize_file(file_)})
+        else:
+            actions.append({'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_._id})
+    if not actions:
+        return
+    _, errors = helpers.bulk(client(), actions, refresh=True, raise_on_error=False)
+    for error in errors:
+        # Removing a document that was never indexed is expected
+        if error.get('delete', {}).get('status') != 404:
+            logger.error(f'Failed to index file: {error}')
+
+def serialize_file(file_):
+    target = file_.target
     # We build URLs manually here so that this function can be
     # run outside of a Flask request context (e.g. in a celery task)
     file_deep_url = '/{target_id}/files/{provider}{path}/'.format(
@@ -755,14 +953,7 @@ def update_file(file_, index=None, delete=False):
         'is_retracted': getattr(target, 'is_retracted', False),
         'extra_search_terms': clean_splitters(file_.name),
     }
-
-    client().index(
-        index=index,
-        doc_type='file',
-        body=file_doc,
-        id=file_._id,
-        refresh=True
-    )
+    return file_doc
 
 @requires_search
 def update_institution(institution, index=None):
@@ -1007,20 +1198,24 @@ def serialize_guid_metadata(guid):
     if guid:
         guid_metadata_record = GuidMetadataRecord.objects.for_guid(guid)
         if guid_metadata_record.id:
-            serialized_guid_metadata = {
-                'title': guid_metadata_record.title or None,
-                'description': guid_metadata_record.description or None,
-                'language': guid_metadata_record.language or None,
-                'resource_type_general': guid_metadata_record.resource_type_general or None,
-                'funder_name': _funding_values(guid_metadata_record, 'funder_name'),
-                'funder_identifier': _funding_values(guid_metadata_record, 'funder_identifier'),
-                'award_number': _funding_values(guid_metadata_record, 'award_number'),
-                'award_uri': _funding_values(guid_metadata_record, 'award_uri'),
-                'award_title': _funding_values(guid_metadata_record, 'award_title'),
-            }
+            serialized_guid_metadata = serialize_guid_metadata_record(guid_metadata_record)
     return serialized_guid_metadata
 
 
+def serialize_guid_metadata_record(guid_metadata_record):
+    return {
+        'title': guid_metadata_record.title or None,
+        'description': guid_metadata_record.description or None,
+        'language': guid_metadata_record.language or None,
+        'resource_type_general': guid_metadata_record.resource_type_general or None,
+        'funder_name': _funding_values(guid_metadata_record, 'funder_name'),
+        'funder_identifier': _funding_values(guid_metadata_record, 'funder_identifier'),
+        'award_number': _funding_values(guid_metadata_record, 'award_number'),
+        'award_uri': _funding_values(guid_metadata_record, 'award_uri'),
+        'award_title': _funding_values(guid_metadata_record, 'award_title'),
+    }
+
+
 def _funding_values(guid_metadata_record, funding_field):
     return [
         funding_info[funding_field]
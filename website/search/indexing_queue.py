@@ -0,0 +1,201 @@
+"""Coalescing queue for search index updates.
+
+With SEARCH_INDEX_QUEUE_ENABLED, update_node, update_preprint, update_user and update_file only
+record which document changed. Records are buffered in a django cache by time window (see
+framework.analytics.buffer), so repeated updates of a document within a window collapse into one
+entry. A periodic task indexes each closed window with one `helpers.bulk` request and without
+forcing a refresh; the documents become searchable at the index's own refresh interval.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from elasticsearch2 import helpers
+
+from framework.analytics.buffer import CounterBuffer
+from framework.celery_tasks import app as celery_app
+from framework.postcommit_tasks.handlers import run_postcommit
+from website import settings
+from website.search import elastic_search
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ['updates']
+METRICS_KEY = 'search_index_queue:metrics'
+
+index_queue = CounterBuffer(
+    'search_index_queue',
+    settings.SEARCH_INDEX_QUEUE_CACHE_NAME,
+    settings.SEARCH_INDEX_QUEUE_INTERVAL,
+)
+
+
+@run_postcommit(once_per_request=False, celery=False)
+def enqueue(kind, pk, guid, index=None):
+    """Queue the search document of an object for reindexing.
+
+    :param str kind: One of 'node', 'preprint', 'user' or 'file'
+    :param int pk: Primary key of the object
+    :param str guid: `_id` of the object, used to remove the document if the object is gone
+    """
+    index = index or settings.ELASTIC_INDEX
+    index_queue.incr(f'{kind}:{pk}:{index}', {'updates': 1}, (kind, pk, guid, index, time.time()))
+
+
+def index_action(index, doc_type, doc_id, doc):
+    return {'_op_type': 'index', '_index': index, '_type': doc_type, '_id': doc_id, '_source': doc}
+
+
+def delete_action(index, doc_type, doc_id):
+    return {'_op_type': 'delete', '_index': index, '_type': doc_type, '_id': doc_id}
+
+
+def file_actions(files, index):
+    for file_ in files:
+        if file_.should_update_search:
+            yield index_action(index, 'file', file_._id, elastic_search.serialize_file(file_))
+        else:
+            yield delete_action(index, 'file', file_._id)
+
+
+def target_file_actions(model, target_ids, index):
+    """Reindex the OsfStorageFiles of the given targets, as update_node and update_preprint do"""
+    OsfStorageFile = apps.get_model('osf.OsfStorageFile')
+    files = OsfStorageFile.objects.filter(
+        target_content_type=ContentType.objects.get_for_model(model),
+        target_object_id__in=target_ids,
+    ).order_by('id')
+    return file_actions(files.iterator(), index)
+
+
+def node_actions(guids, index):
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    yield from target_file_actions(AbstractNode, list(guids), index)
+    indexed = []
+    for node in AbstractNode.objects.filter(id__in=guids):
+        if elastic_search.should_remove_node(node):
+            doc_type = 'registration' if node.is_registration else node.project_or_component
+            yield delete_action(index, doc_type, node._id)
+        else:
+            indexed.append(node)
+    for category, elastic_document in elastic_search.serialize_nodes(indexed).values():
+        yield index_action(index, category, elastic_document['id'], elastic_document)
+
+
+def preprint_actions(guids, index):
+    Preprint = apps.get_model('osf.Preprint')
+    yield from target_file_actions(Preprint, list(guids), index)
+    for preprint in Preprint.objects.filter(id__in=guids):
+        if elastic_search.should_remove_preprint(preprint):
+            yield delete_action(index, 'preprint', preprint._id)
+        else:
+            yield index_action(index, 'preprint', preprint._id, elastic_search.serialize_preprint(preprint, 'preprint'))
+
+
+def user_actions(guids, index):
+    OSFUser = apps.get_model('osf.OSFUser')
+    QuickFilesNode = apps.get_model('osf.QuickFilesNode')
+    for user in OSFUser.objects.filter(id__in=guids):
+        if user.is_active:
+            yield index_action(index, 'user', user._id, elastic_search.serialize_user(user))
+            continue
+        yield delete_action(index, 'user', user._id)
+        # Remove the files of their quickfiles node if the user has been marked as spam
+        if user.spam_status == elastic_search.SpamStatus.SPAM:
+            quickfiles = QuickFilesNode.objects.get_for_user(user)
+            if quickfiles:
+                for quickfile_id in quickfiles.files.values_list('_id', flat=True):
+                    yield delete_action(index, 'file', quickfile_id)
+
+
+def file_kind_actions(guids, index):
+    BaseFileNode = apps.get_model('osf.BaseFileNode')
+    files = list(BaseFileNode.objects.filter(id__in=guids))
+    yield from file_actions(files, index)
+    # Files removed from the database entirely
+    for pk in set(guids) - {file_.id for file_ in files}:
+        yield delete_action(index, 'file', guids[pk])
+
+
+ACTIONS = {
+    'node': node_actions,
+    'preprint': preprint_actions,
+    'user': user_actions,
+    'file': file_kind_actions,
+}
+
+
+def apply_updates(buffered):
+    """Index everything buffered in one window with a single bulk request.
+
+    :param dict buffered: {member: ((kind, pk, guid, index, enqueued_at), {'updates': count})}
+    """
+    by_kind = defaultdict(dict)
+    updates = 0
+    oldest = time.time()
+    for descriptor, fields in buffered.values():
+        if descriptor is None:
+            continue
+        kind, pk, guid, index, enqueued_at = descriptor
+        by_kind[(kind, index)][pk] = guid
+        updates += fields['updates']
+        oldest = min(oldest, enqueued_at)
+
+    # A node update also reindexes its files, which may have been queued themselves; keep one action per document
+    actions = {}
+    for (kind, index), guids in by_kind.items():
+        for action in ACTIONS[kind](guids, index):
+            actions[(action['_index'], action['_type'], action['_id'])] = action
+
+    errors = []
+    if actions:
+        _, errors = helpers.bulk(elastic_search.client(), list(actions.values()), refresh=False, raise_on_error=False)
+    for error in errors:
+        # Deleting a document that was never indexed is expected
+        if error.get('delete', {}).get('status') != 404:
+            logger.error(f'Failed to index search document: {error}')
+
+    record_flush(updates=updates, documents=len(actions), lag=time.time() - oldest)
+
+
+def record_flush(updates, documents, lag):
+    metrics = get_metrics()
+    index_queue.cache.set(METRICS_KEY, {
+        'last_flush': time.time(),
+        'updates': metrics['updates'] + updates,
+        'documents': metrics['documents'] + documents,
+        'last_lag': lag,
+        'max_lag': max(metrics['max_lag'], lag),
+    }, None)
+
+
+def get_metrics():
+    """Return the indexing queue metrics.
+
+    `queue_depth` counts the entries waiting in unflushed windows, `updates` the updates queued and
+    `documents` the documents sent to the index by all flushes, and `last_lag` and `max_lag` the
+    seconds between the first queued update of a window and its indexing.
+    """
+    metrics = {
+        'last_flush': None,
+        'updates': 0,
+        'documents': 0,
+        'last_lag': 0,
+        'max_lag': 0,
+    }
+    metrics.update(index_queue.cache.get(METRICS_KEY) or {})
+    metrics['queue_depth'] = index_queue.pending_count()
+    return metrics
+
+
+@celery_app.task(ignore_results=True)
+def flush_index_queue():
+    """Index the documents queued by `enqueue`, see SEARCH_INDEX_QUEUE_ENABLED"""
+    if not settings.SEARCH_INDEX_QUEUE_ENABLED:
+        return 0
+    flushed = index_queue.flush(FIELDS, apply_updates)
+    if flushed:
+        logger.info(f'Flushed {flushed} queued search documents: {get_metrics()}')
+    return flushed
@@ -8,8 +8,10 @@ logger = logging.getLogger(__name__)
 
 if settings.SEARCH_ENGINE == 'elastic':
     import website.search.elastic_search as search_engine
+    import website.search.indexing_queue as indexing_queue
 else:
     search_engine = None
+    indexing_queue = None
     logger.warning('Elastic search is not set to load')
 
 def requires_search(func):
@@ -30,6 +32,8 @@ def update_node(node, index=None, bulk=False, async_update=True, saved_fields=No
         'index': index,
         'bulk': bulk
     }
+    if async_update and not bulk and settings.SEARCH_INDEX_QUEUE_ENABLED:
+        return indexing_queue.enqueue('node', node.id, node._id, index=index)
     if async_update:
         node_id = node._id
         # We need the transaction to be committed before trying to run celery tasks.
@@ -50,6 +54,8 @@ def update_preprint(preprint, index=None, bulk=False, async_update=True, saved_f
         'index': index,
         'bulk': bulk
     }
+    if async_update and not bulk and settings.SEARCH_INDEX_QUEUE_ENABLED:
+        return indexing_queue.enqueue('preprint', preprint.id, preprint._id, index=index)
     if async_update:
         preprint_id = preprint._id
         # We need the transaction to be committed before trying to run celery tasks.
@@ -83,6 +89,11 @@ def bulk_update_nodes(serialize, nodes, index=None, category=None):
     index = index or settings.ELASTIC_INDEX
     search_engine.bulk_update_nodes(serialize, nodes, index=index, category=category)
 
+@requires_search
+def bulk_update_node_search(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    search_engine.bulk_update_node_search(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -102,6 +113,8 @@ def update_contributors_async(user_id):
 @requires_search
 def update_user(user, index=None, async_update=True):
     index = index or settings.ELASTIC_INDEX
+    if async_update and settings.SEARCH_INDEX_QUEUE_ENABLED:
+        return indexing_queue.enqueue('user', user.id, user._id, index=index)
     if async_update:
         user_id = user.id
         if settings.USE_CELERY:
@@ -114,8 +127,20 @@ def update_user(user, index=None, async_update=True):
 @requires_search
 def update_file(file_, index=None, delete=False):
     index = index or settings.ELASTIC_INDEX
+    if not delete and settings.SEARCH_INDEX_QUEUE_ENABLED:
+        return indexing_queue.enqueue('file', file_.id, file_._id, index=index)
     search_engine.update_file(file_, index=index, delete=delete)
 
+@requires_search
+def update_files(files, index=None):
+    """Reindex `files`, queued if SEARCH_INDEX_QUEUE_ENABLED or else with one bulk request"""
+    index = index or settings.ELASTIC_INDEX
+    if settings.SEARCH_INDEX_QUEUE_ENABLED:
+        for file_ in files:
+            indexing_queue.enqueue('file', file_.id, file_._id, index=index)
+        return
+    search_engine.bulk_update_files(files, index=index)
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or settings.ELASTIC_INDEX
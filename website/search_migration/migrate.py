@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
-"""Migration script for Search-enabled Models."""
-from math import ceil
+"""Migration script for Search-enabled Models.
+
+Each model's id space is split into ranges of ids, which are migrated independently, in
+parallel when `workers` > 1. Objects within a range are read with keyset pagination. With
+a checkpoint file, every completed range is recorded, and an interrupted migration started
+again with the same checkpoint continues with the same new index, skipping those ranges.
+"""
+from collections import defaultdict
 import functools
+import json
 import logging
+import multiprocessing
+import os
+import time
 
-from django.db import connection
-from django.core.paginator import Paginator
+from django.db import connection, connections
 from elasticsearch2 import helpers
 
 import website.search.search as search
+from website.search import elastic_search
 from website.search.elastic_search import client
 from website.search_migration import (
     JSON_UPDATE_NODES_SQL, JSON_DELETE_NODES_SQL,
@@ -25,140 +35,232 @@ from website.search.search import update_institution, bulk_update_collection_sub
 
 logger = logging.getLogger(__name__)
 
+# Size of the id ranges handed to workers
+DEFAULT_INCREMENT = 10000
 
-def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
-    """ Run provided SQL and send output to elastic.
+
+def sql_migrate_range(index, sql, page_start, page_end, es_args=None, **kwargs):
+    """ Run provided SQL for the ids in (page_start, page_end] and send output to elastic.
 
     :param str index: Elastic index to update (formatted into `sql`)
     :param str sql: SQL to format and run. See __init__.py in this module
-    :param int max_id: Last known object id. Indicates when to stop paging
-    :param int increment: Page size
     :param  dict es_args:  Dict or None, to pass to `helpers.bulk`
     :kwargs: Additional format arguments for `sql` arg
 
     :return int: Number of migrated objects
     """
-    if es_args is None:
-        es_args = {}
-    total_pages = int(ceil(max_id / float(increment)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            index=index,
+            page_start=page_start,
+            page_end=page_end,
+            **kwargs))
+        ser_objs = cursor.fetchone()[0]
+    if ser_objs:
+        helpers.bulk(client(), ser_objs, **(es_args or {}))
+        return len(ser_objs)
+    return 0
+
+
+def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
+    """ Run provided SQL and send output to elastic, one page of ids at a time.
+
+    :param int max_id: Last known object id. Indicates when to stop paging
+    :param int increment: Page size
+
+    :return int: Number of migrated objects
+    """
     total_objs = 0
-    page_start = 0
-    page_end = 0
-    page = 0
-    while page_end <= (max_id + increment):
-        page += 1
-        page_end += increment
-        if page <= total_pages:
-            logger.info(f'Updating page {page_end / increment} / {total_pages}')
-        else:
-            # An extra page is included to cover the edge case where:
-            #       max_id == (total_pages * increment) - 1
-            # and two additional objects are created during runtime.
-            logger.info('Cleaning up...')
-        with connection.cursor() as cursor:
-            cursor.execute(sql.format(
-                index=index,
-                page_start=page_start,
-                page_end=page_end,
-                **kwargs))
-            ser_objs = cursor.fetchone()[0]
-            if ser_objs:
-                total_objs += len(ser_objs)
-                helpers.bulk(client(), ser_objs, **es_args)
-        page_start = page_end
+    ranges = id_ranges(max_id, increment)
+    for page, (page_start, page_end) in enumerate(ranges, 1):
+        logger.info(f'Updating page {page} / {len(ranges)}')
+        total_objs += sql_migrate_range(index, sql, page_start, page_end, es_args=es_args, **kwargs)
     return total_objs
 
-def migrate_nodes(index, delete, increment=10000):
-    logger.info(f'Migrating nodes to index: {index}')
-    max_nid = AbstractNode.objects.last().id
-    total_nodes = sql_migrate(
-        index,
-        JSON_UPDATE_NODES_SQL,
-        max_nid,
-        increment,
+
+def id_ranges(max_id, increment):
+    """Split ids up to `max_id` into (start, end] ranges of `increment` ids.
+
+    An extra range is included to cover objects created while migrating.
+    """
+    return [(start, start + increment) for start in range(0, max_id + increment, increment)]
+
+
+def max_id(model):
+    return model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def keyset_batches(queryset, start, end, batch_size):
+    """Yield the objects of `queryset` with ids in (start, end], `batch_size` at a time, paging on id"""
+    last_id = start
+    while True:
+        batch = list(queryset.filter(id__gt=last_id, id__lte=end).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def migrate_node_range(index, start, end, delete):
+    count = sql_migrate_range(
+        index, JSON_UPDATE_NODES_SQL, start, end,
         spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-    logger.info(f'{total_nodes} nodes migrated')
     if delete:
-        logger.info('Preparing to delete old node documents')
-        max_nid = AbstractNode.objects.last().id
-        total_nodes = sql_migrate(
-            index,
-            JSON_DELETE_NODES_SQL,
-            max_nid,
-            increment,
+        sql_migrate_range(
+            index, JSON_DELETE_NODES_SQL, start, end,
             es_args={'raise_on_error': False},  # ignore 404s
             spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-        logger.info(f'{total_nodes} nodes marked deleted')
-
-def migrate_preprints(index, delete):
-    logger.info(f'Migrating preprints to index: {index}')
-    preprints = Preprint.objects.all()
-    increment = 100
-    paginator = Paginator(preprints, increment)
-    for page_number in paginator.page_range:
-        logger.info(f'Updating page {page_number} / {paginator.num_pages}')
-        Preprint.bulk_update_search(paginator.page(page_number).object_list, index=index)
-
-def migrate_preprint_files(index, delete):
-    logger.info(f'Migrating preprint files to index: {index}')
-    valid_preprints = Preprint.objects.all()
-    valid_preprint_files = BaseFileNode.objects.filter(preprint__in=valid_preprints)
-    paginator = Paginator(valid_preprint_files, 500)
-    serialize = functools.partial(search.update_file, index=index)
-    for page_number in paginator.page_range:
-        logger.info(f'Updating page {page_number} / {paginator.num_pages}')
-        search.bulk_update_nodes(serialize, paginator.page(page_number).object_list, index=index, category='file')
-
-def migrate_groups(index, delete):
-    logger.info(f'Migrating groups to index: {index}')
-    groups = OSFGroup.objects.all()
-    increment = 100
-    paginator = Paginator(groups, increment)
-    for page_number in paginator.page_range:
-        logger.info(f'Updating page {page_number} / {paginator.num_pages}')
-        OSFGroup.bulk_update_search(paginator.page(page_number).object_list, index=index)
-
-def migrate_files(index, delete, increment=10000):
-    logger.info(f'Migrating files to index: {index}')
-    max_fid = BaseFileNode.objects.last().id
-    total_files = sql_migrate(
-        index,
-        JSON_UPDATE_FILES_SQL,
-        max_fid,
-        increment,
+    return count
+
+
+def migrate_file_range(index, start, end, delete):
+    count = sql_migrate_range(
+        index, JSON_UPDATE_FILES_SQL, start, end,
         spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-    logger.info(f'{total_files} files migrated')
     if delete:
-        logger.info('Preparing to delete old file documents')
-        max_fid = BaseFileNode.objects.last().id
-        total_files = sql_migrate(
-            index,
-            JSON_DELETE_FILES_SQL,
-            max_fid,
-            increment,
+        sql_migrate_range(
+            index, JSON_DELETE_FILES_SQL, start, end,
             es_args={'raise_on_error': False},  # ignore 404s
             spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-        logger.info(f'{total_files} files marked deleted')
-
-def migrate_users(index, delete, increment=10000):
-    logger.info(f'Migrating users to index: {index}')
-    max_uid = OSFUser.objects.last().id
-    total_users = sql_migrate(
-        index,
-        JSON_UPDATE_USERS_SQL,
-        max_uid,
-        increment)
-    logger.info(f'{total_users} users migrated')
+    return count
+
+
+def migrate_user_range(index, start, end, delete):
+    count = sql_migrate_range(index, JSON_UPDATE_USERS_SQL, start, end)
     if delete:
-        logger.info('Preparing to delete old user documents')
-        max_uid = OSFUser.objects.last().id
-        total_users = sql_migrate(
-            index,
-            JSON_DELETE_USERS_SQL,
-            max_uid,
-            increment,
+        sql_migrate_range(
+            index, JSON_DELETE_USERS_SQL, start, end,
             es_args={'raise_on_error': False})  # ignore 404s
-        logger.info(f'{total_users} users marked deleted')
+    return count
+
+
+def migrate_preprint_range(index, start, end, delete):
+    count = 0
+    for preprints in keyset_batches(Preprint.objects.all(), start, end, 100):
+        Preprint.bulk_update_search(preprints, index=index)
+        count += len(preprints)
+    return count
+
+
+def migrate_preprint_file_range(index, start, end, delete):
+    valid_preprint_files = BaseFileNode.objects.filter(preprint__in=Preprint.objects.all())
+    serialize = functools.partial(search.update_file, index=index)
+    count = 0
+    for files in keyset_batches(valid_preprint_files, start, end, 500):
+        search.bulk_update_nodes(serialize, files, index=index, category='file')
+        count += len(files)
+    return count
+
+
+def migrate_group_range(index, start, end, delete):
+    count = 0
+    for groups in keyset_batches(OSFGroup.objects.all(), start, end, 100):
+        OSFGroup.bulk_update_search(groups, index=index)
+        count += len(groups)
+    return count
+
+
+# Migrations run over id ranges, in this order: name -> (model whose ids are split, range function)
+RANGE_MIGRATIONS = {
+    'nodes': (AbstractNode, migrate_node_range),
+    'files': (BaseFileNode, migrate_file_range),
+    'users': (OSFUser, migrate_user_range),
+    'preprints': (Preprint, migrate_preprint_range),
+    'preprint_files': (BaseFileNode, migrate_preprint_file_range),
+    'groups': (OSFGroup, migrate_group_range),
+}
+
+
+def plan_ranges(increment=DEFAULT_INCREMENT):
+    """Return the [(name, start, end)] ranges of a full migration"""
+    return [
+        (name, start, end)
+        for name, (model, _) in RANGE_MIGRATIONS.items()
+        for start, end in id_ranges(max_id(model), increment)
+    ]
+
+
+def range_key(name, start, end):
+    return f'{name}:{start}:{end}'
+
+
+def migrate_range(job):
+    """Migrate one id range; run in worker processes, so it takes and returns plain tuples"""
+    name, index, start, end, delete = job
+    started = time.time()
+    count = RANGE_MIGRATIONS[name][1](index, start, end, delete)
+    return name, start, end, count, started, time.time()
+
+
+def init_worker():
+    # Connections and the elasticsearch client inherited from the parent process must not be shared
+    connections.close_all()
+    elastic_search.CLIENT = None
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as fp:
+            return json.load(fp)
+    return {'index': None, 'completed': []}
+
+
+def save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as fp:
+        json.dump(checkpoint, fp)
+    os.replace(tmp_path, path)
+
+
+def run_range_migrations(index, delete, ranges, workers=1, checkpoint=None, checkpoint_path=None):
+    """Migrate `ranges` that are not completed in `checkpoint`, across `workers` processes.
+
+    :return dict: name -> {'count', 'seconds', 'per_second'} for the ranges migrated by this run
+    """
+    checkpoint = checkpoint if checkpoint is not None else {'index': index, 'completed': []}
+    completed = set(checkpoint['completed'])
+    jobs = [
+        (name, index, start, end, delete)
+        for name, start, end in ranges
+        if range_key(name, start, end) not in completed
+    ]
+    logger.info(f'Migrating {len(jobs)} id ranges ({len(ranges) - len(jobs)} already completed) with {workers} workers')
+
+    counts = defaultdict(int)
+    spans = {}
+    if workers > 1:
+        # Forked workers must open their own database connections
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(workers, initializer=init_worker)
+        results = pool.imap_unordered(migrate_range, jobs)
+    else:
+        pool = None
+        results = map(migrate_range, jobs)
+    try:
+        for name, start, end, count, started, finished in results:
+            counts[name] += count
+            first, last = spans.get(name, (started, finished))
+            spans[name] = (min(first, started), max(last, finished))
+            checkpoint['completed'].append(range_key(name, start, end))
+            save_checkpoint(checkpoint_path, checkpoint)
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    throughput = {}
+    for name, (first, last) in spans.items():
+        seconds = last - first
+        throughput[name] = {
+            'count': counts[name],
+            'seconds': seconds,
+            'per_second': counts[name] / seconds if seconds else None,
+        }
+        logger.info(f'{counts[name]} {name} migrated in {seconds:.1f}s ({counts[name] / max(seconds, 0.001):.0f}/s)')
+    return throughput
+
 
 def migrate_collected_metadata(index, delete):
     collection_submissions = CollectionSubmission.objects.filter(
@@ -189,13 +291,17 @@ def migrate_institutions(index):
     for inst in Institution.objects.filter(is_deleted=False):
         update_institution(inst, index)
 
-def migrate(delete, remove=False, index=None, app=None):
+def migrate(delete, remove=False, index=None, app=None, workers=1, checkpoint_path=None, increment=DEFAULT_INCREMENT):
     """Reindexes relevant documents in ES
 
     :param bool delete: Delete documents that should not be indexed
     :param bool remove: Removes old index after migrating
     :param str index: index alias to version and migrate
     :param App app: Flask app for context
+    :param int workers: Number of processes migrating id ranges
+    :param str checkpoint_path: File recording completed ranges; an existing checkpoint resumes its migration
+    :param int increment: Number of ids per range
+    :return dict: Throughput per migrated model, see run_range_migrations
     """
     index = index or settings.ELASTIC_INDEX
     app = app or init_app('website.settings', set_backends=True, routes=True)
@@ -207,24 +313,39 @@ def migrate(delete, remove=False, index=None, app=None):
     ctx = app.test_request_context()
     ctx.push()
 
-    new_index = set_up_index(index)
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint['index']:
+        new_index = checkpoint['index']
+        logger.info(f'Resuming migration to {new_index} from {checkpoint_path}')
+    else:
+        new_index = set_up_index(index)
+        checkpoint = {'index': new_index, 'completed': []}
+        save_checkpoint(checkpoint_path, checkpoint)
 
-    if settings.ENABLE_INSTITUTIONS:
+    if settings.ENABLE_INSTITUTIONS and 'institutions' not in checkpoint['completed']:
         migrate_institutions(new_index)
-    migrate_nodes(new_index, delete=delete)
-    migrate_files(new_index, delete=delete)
-    migrate_users(new_index, delete=delete)
-    migrate_preprints(new_index, delete=delete)
-    migrate_preprint_files(new_index, delete=delete)
+        checkpoint['completed'].append('institutions')
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    throughput = run_range_migrations(
+        new_index,
+        delete,
+        plan_ranges(increment),
+        workers=workers,
+        checkpoint=checkpoint,
+        checkpoint_path=checkpoint_path,
+    )
     migrate_collected_metadata(new_index, delete=delete)
-    migrate_groups(new_index, delete=delete)
 
     set_up_alias(index, new_index)
 
     if remove:
         remove_old_index(new_index)
 
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
     ctx.pop()
+    return throughput
 
 def set_up_index(idx):
     alias = es_client().indices.get_aliases(index=idx)
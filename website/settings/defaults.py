@@ -42,6 +42,8 @@ EXPIRATION_TIME_DICT = {
 }
 
 CITATION_STYLES_PATH = os.path.join(BASE_PATH, 'static', 'vendor', 'bower_components', 'styles')
+# Parsed CSL styles kept in memory by each process
+CITATION_STYLE_CACHE_SIZE = 64
 
 # Minimum seconds between forgot password email attempts
 SEND_EMAIL_THROTTLE = 30
@@ -115,6 +117,12 @@ ELASTIC_KWARGS = {
     # 'client_key': None
 }
 
+# Queue search index updates in a django cache and index them in bulk, without forcing a refresh,
+# every SEARCH_INDEX_QUEUE_INTERVAL seconds (see website.search.indexing_queue)
+SEARCH_INDEX_QUEUE_ENABLED = False
+SEARCH_INDEX_QUEUE_CACHE_NAME = 'redis'
+SEARCH_INDEX_QUEUE_INTERVAL = 10  # seconds
+
 # Sessions
 COOKIE_NAME = 'osf'
 # TODO: Override OSF_COOKIE_DOMAIN in local.py in production
@@ -137,6 +145,11 @@ USE_CDN_FOR_CLIENT_LIBS = True
 USE_EMAIL = True
 FROM_EMAIL = 'openscienceframework-noreply@osf.io'
 
+# Notification digests are sent in batches of NOTIFICATION_DIGEST_BATCH_SIZE users, rendered and
+# handed to the mailer by NOTIFICATION_DIGEST_WORKERS threads (see website.notifications.tasks)
+NOTIFICATION_DIGEST_BATCH_SIZE = 500
+NOTIFICATION_DIGEST_WORKERS = 1
+
 # support email
 OSF_SUPPORT_EMAIL = 'support@osf.io'
 # contact email
@@ -188,6 +201,11 @@ MAILGUN_API_KEY = None
 # Use Celery for file rendering
 USE_CELERY = True
 
+# Postcommit tasks run in a greenlet pool shared across requests; the size bounds db connections
+POSTCOMMIT_POOL_SIZE = 30
+# Seconds a response waits for its postcommit tasks
+POSTCOMMIT_TIMEOUT = 5.0
+
 # Trashed File Retention
 PURGE_DELTA = timedelta(days=30)
 
@@ -372,6 +390,18 @@ SHARE_URL = 'https://share.osf.io/'
 SHARE_API_TOKEN = None  # Required to send project updates to SHARE
 
 CAS_SERVER_URL = 'http://localhost:8080'
+# Connections kept open to CAS per process
+CAS_CONNECTION_POOL_SIZE = 10
+# Cache OAuth2 bearer token introspection (CAS profile responses), keyed by a hash of the token
+CAS_TOKEN_CACHE_ENABLED = True
+CAS_TOKEN_CACHE_NAME = 'redis'
+CAS_TOKEN_CACHE_TIMEOUT = 60  # seconds, shortened to the token's own expiry if CAS reports one
+CAS_TOKEN_NEGATIVE_CACHE_TIMEOUT = 10  # seconds to remember tokens that CAS rejected
+# Cache metadata files built by osf.metadata.tools.pls_gather_metadata_file. Entries are keyed by a version
+# stamp of the item; the timeout bounds staleness from changes to related records the stamp cannot see
+METADATA_CACHE_ENABLED = True
+METADATA_CACHE_NAME = 'redis'
+METADATA_CACHE_TIMEOUT = 60 * 60  # seconds
 MFR_SERVER_URL = 'http://localhost:7778'
 
 ###### ARCHIVER ###########
@@ -425,6 +455,7 @@ class CeleryConfig:
         'scripts.populate_new_and_noteworthy_projects',
         'scripts.populate_popular_projects_and_registrations',
         'website.search.elastic_search',
+        'website.search.indexing_queue',
         'scripts.generate_sitemap',
         'osf.management.commands.clear_expired_sessions',
         'osf.management.commands.delete_withdrawn_or_failed_registration_files',
@@ -445,6 +476,7 @@ class CeleryConfig:
         'osf.management.commands.daily_reporters_go',
         'osf.management.commands.monthly_reporters_go',
         'osf.management.commands.ingest_cedar_metadata_templates',
+        'osf.management.commands.reconcile_storage_usage',
     }
 
     med_pri_modules = {
@@ -507,6 +539,7 @@ class CeleryConfig:
 
     # Modules to import when celery launches
     imports = (
+        'framework.analytics',
         'framework.celery_tasks',
         'framework.email.tasks',
         'osf.external.chronos.tasks',
@@ -517,6 +550,7 @@ class CeleryConfig:
         'website.archiver.tasks',
         'website.identifiers.tasks',
         'website.search.search',
+        'website.search.indexing_queue',
         'website.project.tasks',
         'scripts.populate_new_and_noteworthy_projects',
         'scripts.populate_popular_projects_and_registrations',
@@ -550,6 +584,7 @@ class CeleryConfig:
         'osf.management.commands.monthly_reporters_go',
         'osf.external.spam.tasks',
         'api.share.utils',
+        'osf.management.commands.reconcile_storage_usage',
     )
 
     # Modules that need metrics and release requirements
@@ -569,6 +604,18 @@ class CeleryConfig:
         #  Setting up a scheduler, essentially replaces an independent cron job
         # Note: these times must be in UTC
         beat_schedule = {
+            'flush_page_counters': {
+                'task': 'framework.analytics.flush_page_counters',
+                'schedule': crontab(minute='*'),  # Every minute, a no-op unless PAGE_COUNTER_BUFFER_ENABLED
+            },
+            'flush_user_activity_counters': {
+                'task': 'framework.analytics.flush_user_activity_counters',
+                'schedule': crontab(minute='*'),  # Every minute, a no-op unless USER_ACTIVITY_BUFFER_ENABLED
+            },
+            'flush_search_index_queue': {
+                'task': 'website.search.indexing_queue.flush_index_queue',
+                'schedule': SEARCH_INDEX_QUEUE_INTERVAL,  # A no-op unless SEARCH_INDEX_QUEUE_ENABLED
+            },
             '5-minute-emails': {
                 'task': 'website.notifications.tasks.send_users_email',
                 'schedule': crontab(minute='*/5'),
@@ -652,6 +699,11 @@ class CeleryConfig:
                 'task': 'management.commands.monthly_reporters_go',
                 'schedule': crontab(minute=30, hour=6, day_of_month=2),     # Second day of month 1:30 a.m.
             },
+            'reconcile_storage_usage': {
+                'task': 'management.commands.reconcile_storage_usage',
+                'schedule': crontab(minute=0, hour=8, day_of_week=0),  # Sunday 3:00 a.m.
+                'kwargs': {'dry_run': False},
+            },
             # 'data_storage_usage': {
             #   'task': 'management.commands.data_storage_usage',
             #   'schedule': crontab(day_of_month=1, minute=30, hour=4),  # Last of the month at 11:30 p.m.
@@ -2009,6 +2061,11 @@ SITEMAP_TO_S3 = False
 SITEMAP_AWS_BUCKET = None
 SITEMAP_URL_MAX = 25000
 SITEMAP_INDEX_MAX = 50000
+# Also write an uncompressed copy of each sitemap file, which the sitemap index points to
+SITEMAP_WRITE_UNCOMPRESSED = True
+# Threads reading the user, node and preprint urls; 1 reads them one after the other
+SITEMAP_SOURCE_WORKERS = 3
+SITEMAP_QUERY_CHUNK_SIZE = 2000
 SITEMAP_STATIC_URLS = [
     OrderedDict([('loc', ''), ('changefreq', 'yearly'), ('priority', '0.5')]),
     OrderedDict([('loc', 'preprints'), ('changefreq', 'yearly'), ('priority', '0.5')]),
@@ -9,9 +9,10 @@
             <th colspan="2" style="padding: 0px 15px 0px 15px;">
                 <h3 style="padding: 0 15px 5px 15px; margin: 30px 0 0 0;border: none;list-style: none;font-weight: 300; border-bottom: 1px solid #eee; text-align: left;">
                   <% from osf.models import Guid %>
-                ${Guid.objects.get(_id=key).referent.title}
+                  <% node_titles = context.get('node_titles', {}) %>
+                ${node_titles[key] if key in node_titles else Guid.objects.get(_id=key).referent.title}
                 %if parent :
-                  <small style="font-size: 14px;color: #999;"> in ${Guid.objects.get(_id=parent).referent.title}</small>
+                  <small style="font-size: 14px;color: #999;"> in ${node_titles[parent] if parent in node_titles else Guid.objects.get(_id=parent).referent.title}</small>
                 %endif
                 </h3>
             </th>